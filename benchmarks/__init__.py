@@ -0,0 +1,8 @@
+"""Performance benchmarks.
+
+Benchmarks are plain scripts, run them as modules from the repository root:
+
+    python -m benchmarks.middleware
+
+They need the same environment variables as the application itself.
+"""
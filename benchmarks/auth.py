@@ -0,0 +1,66 @@
+"""JWT verification benchmark.
+
+Compares verification with `jose.jwt.decode` and the secret on every call,
+as `utils.auth.decode` did before, with the shared `JWTVerifier`:
+
+    python -m benchmarks.auth [calls]
+
+Invalid tokens are measured too: before they were logged with a stack
+trace on every call.
+"""
+import logging
+import os
+import sys
+from time import perf_counter
+from typing import Callable
+
+from jose import JWTError, jwt
+
+from lxdapi.core.exceptions.jwt import TokenInvalidException
+from lxdapi.utils.auth import ALGORITHM, JWTVerifier, timegm_delta
+
+SECRET = "benchmark secret"
+
+logger = logging.getLogger("benchmark")
+
+
+def legacy_decode(token: str) -> None:
+    """Verify token the way `utils.auth.decode` did before."""
+    try:
+        jwt.decode(token, SECRET, algorithms=[ALGORITHM], options={"verify_jti": False})
+    except JWTError:
+        logger.exception("JWT exception")
+
+
+def measure(function: Callable[[str], object], token: str, calls: int) -> float:
+    """Return calls per second."""
+    start = perf_counter()
+    for _ in range(calls):
+        try:
+            function(token)
+        except TokenInvalidException:
+            pass
+    return calls / (perf_counter() - start)
+
+
+def main(calls: int) -> None:
+    """Run benchmark for valid and invalid tokens."""
+    # Logs go nowhere, but are still formatted
+    logging.basicConfig(stream=open(os.devnull, "w"), level=logging.INFO)
+    token = jwt.encode({"sub": "1", "exp": timegm_delta(minutes=15)}, SECRET, algorithm=ALGORITHM)
+    invalid = jwt.encode({"sub": "1", "exp": timegm_delta(minutes=15)}, "other", algorithm=ALGORITHM)
+    uncached = JWTVerifier(SECRET, cache_size=0)
+    cached = JWTVerifier(SECRET)
+    results = [
+        ("valid, jose.jwt.decode", measure(legacy_decode, token, calls)),
+        ("valid, verifier", measure(uncached.verify, token, calls)),
+        ("valid, cached verifier", measure(cached.verify, token, calls)),
+        ("invalid, jose.jwt.decode", measure(legacy_decode, invalid, calls)),
+        ("invalid, verifier", measure(cached.verify, invalid, calls)),
+    ]
+    for name, rate in results:
+        print(f"{name:<26} {rate:>10.0f} calls/s  ({calls} calls)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
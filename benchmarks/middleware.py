@@ -0,0 +1,92 @@
+"""Middleware stack throughput benchmark.
+
+Drives the ASGI application directly (no network, no HTTP client) with a
+stubbed LXD transport, so the numbers reflect the per-request cost of the
+middleware stack and routing:
+
+    python -m benchmarks.middleware [requests] [concurrency]
+"""
+import asyncio
+import sys
+from time import perf_counter
+from typing import Any
+
+from lxdapi.app import App
+from lxdapi.core.config import Config
+from lxdapi.core.database import dispose_engines
+
+from .stubs import StubLXDClient
+
+
+async def call(app: Any, path: str) -> int:
+    """Perform a single GET request against the ASGI app and return status."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 10000),
+        "server": ("benchmark", 80),
+    }
+    done = asyncio.Event()
+    status = 0
+    request_sent = False
+
+    async def receive() -> dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app: Any, path: str, requests: int, concurrency: int) -> float:
+    """Return requests per second for `path`."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited() -> None:
+        async with semaphore:
+            status = await call(app, path)
+            if status != 200:
+                raise RuntimeError(f"{path} returned {status}")
+
+    # Warm up: builds the middleware stack.
+    await asyncio.gather(*(limited() for _ in range(concurrency)))
+    start = perf_counter()
+    await asyncio.gather(*(limited() for _ in range(requests)))
+    return requests / (perf_counter() - start)
+
+
+async def main(requests: int, concurrency: int) -> None:
+    """Run benchmark for all measured endpoints."""
+    config = Config.from_env()
+    app = App(config).app
+    app.state.lxd_client = StubLXDClient(config)
+    await app.state.lxd_client.start()
+    for path in ("/api/v1/ping", "/api/v1/server/"):
+        rps = await measure(app, path, requests, concurrency)
+        print(f"{path:<20} {rps:>10.0f} req/s  ({requests} requests, concurrency {concurrency})")
+    await app.state.lxd_client.close()
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [5000, 50][len(args) :])))
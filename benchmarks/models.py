@@ -0,0 +1,109 @@
+"""Indexed lookups benchmark.
+
+Fills a temporary SQLite database and compares lookups with and without the
+indexes of users and servers:
+
+    python -m benchmarks.models [users] [queries]
+
+Users in a permission group are found through the indexed memberships
+table, compared with scanning a comma-separated column of all users, as it
+was stored before. Non-deleted servers are found by name with and without
+the partial index.
+"""
+import asyncio
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Awaitable, Callable
+
+from sqlalchemy import false, insert, select, text
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from lxdapi.core.database import Base
+from lxdapi.models import ServerModel, UserModel, UserPermissionGroupModel
+
+
+async def fill(db: AsyncSession, users: int) -> None:
+    """Create users, 1% of them admins, with 10 servers each, half of them deleted."""
+    await db.execute(
+        insert(UserModel),
+        [{"id": i, "email": f"{i}@example.com", "is_banned": False, "is_admin": i % 100 == 0} for i in range(users)],
+    )
+    await db.execute(
+        insert(UserPermissionGroupModel),
+        [{"user_id": i, "name": "admin" if i % 100 == 0 else "user"} for i in range(users)],
+    )
+    await db.execute(text("CREATE TABLE legacy_users (id INTEGER PRIMARY KEY, permission_groups VARCHAR(255))"))
+    await db.execute(
+        text("INSERT INTO legacy_users VALUES (:id, :groups)"),
+        [{"id": i, "groups": "user,admin" if i % 100 == 0 else "user"} for i in range(users)],
+    )
+    await db.execute(
+        insert(ServerModel),
+        [
+            {
+                "user_id": i // 10,
+                "name": f"server-{i // 2}",
+                "cpu": 1,
+                "memory": 512,
+                "disk": 1024,
+                "system": "",
+                "ip": "",
+                "is_deleted": i % 2 == 0,
+                "is_active": False,
+            }
+            for i in range(users * 10)
+        ],
+    )
+    await db.commit()
+
+
+async def measure(function: Callable[[], Awaitable[object]], queries: int) -> float:
+    """Return queries per second."""
+    await function()
+    start = perf_counter()
+    for _ in range(queries):
+        await function()
+    return queries / (perf_counter() - start)
+
+
+async def main(users: int, queries: int) -> None:
+    """Run benchmark for all measured lookups."""
+    with TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/benchmark.db")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            await fill(db, users)
+
+            async def admins_scan() -> object:
+                rows = await db.execute(text("SELECT id, permission_groups FROM legacy_users"))
+                return [row.id for row in rows if "admin" in row.permission_groups.split(",")]
+
+            async def admins_index() -> object:
+                members = select(UserPermissionGroupModel.user_id).where(UserPermissionGroupModel.name == "admin")
+                return (await db.scalars(select(UserModel.id).where(UserModel.id.in_(members)))).all()
+
+            async def server_by_name() -> object:
+                query = select(ServerModel.id).where(ServerModel.name == "server-42", ServerModel.is_deleted == false())
+                return (await db.scalars(query)).all()
+
+            results = [
+                ("admins, column scan", await measure(admins_scan, queries)),
+                ("admins, group index", await measure(admins_index, queries)),
+                ("server by name, indexed", await measure(server_by_name, queries)),
+            ]
+            await db.execute(text("DROP INDEX ix_servers_active_name"))
+            results.append(("server by name, no index", await measure(server_by_name, queries)))
+        await engine.dispose()
+    for name, qps in results:
+        print(f"{name:<26} {qps:>10.0f} queries/s  ({users} users, {queries} queries)")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*(args + [10000, 200][len(args) :])))
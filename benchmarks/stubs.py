@@ -0,0 +1,120 @@
+"""In-memory LXD stand-ins for benchmarks.
+
+A trimmed copy of the test suite stubs, kept here so benchmarks do not import
+from `tests`: it answers only the read-only requests the benchmarks make.
+"""
+from asyncio import Event
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Sequence
+from urllib.parse import parse_qsl, urlsplit
+
+from aiolxd import AbstractTransport
+from aiolxd.entities.response import BaseResponse, StatusCode, SyncResponse
+from aiolxd.transport import RequestMethod
+
+from lxdapi.core.config import Config
+from lxdapi.core.lxd import LXDClient
+
+
+def instance_document(name: str, recursion: int = 1) -> dict[str, Any]:
+    """Return a minimal but valid LXD instance document."""
+    document: dict[str, Any] = {
+        "architecture": "x86_64",
+        "created_at": "2023-01-01T00:00:00Z",
+        "last_used_at": "2023-01-01T00:00:00Z",
+        "location": "none",
+        "name": name,
+        "profiles": ["default"],
+        "project": "default",
+        "restore": None,
+        "stateful": False,
+        "status": "Running",
+        "status_code": 103,
+        "type": "virtual-machine",
+        "description": "",
+        "devices": {},
+        "ephemeral": False,
+        "config": {},
+        "expanded_config": {"limits.cpu": "2", "limits.memory": "2GiB"},
+        "expanded_devices": {"root": {"path": "/", "pool": "default", "type": "disk", "size": "10GiB"}},
+    }
+    if recursion > 1:
+        document["state"] = {
+            "status": "Running",
+            "cpu": {"usage": 1000},
+            "memory": {"usage": 2048},
+            "disk": {"root": {"usage": 4096}},
+            "processes": 10,
+            "network": {
+                "eth0": {
+                    "addresses": [
+                        {"family": "inet", "address": "10.0.0.2", "scope": "global"},
+                        {"family": "inet6", "address": "fe80::1", "scope": "link"},
+                    ]
+                }
+            },
+        }
+    return document
+
+
+class StubTransport(AbstractTransport):  # type: ignore[misc]
+    """In-memory LXD transport answering server and instance listing requests."""
+
+    def __init__(self, instances: int = 50) -> None:
+        """Create transport with given number of instances."""
+        self.names = [f"instance-{i}" for i in range(instances)]
+
+    async def request(
+        self,
+        method: RequestMethod,
+        path: str,
+        data: dict[str, Any] | None = None,
+        *,
+        recursion: bool | None = None,
+        filter: str | None = None,
+    ) -> BaseResponse:
+        """Answer server and instance listing requests."""
+        url = urlsplit(path)
+        query = dict(parse_qsl(url.query))
+        if recursion is not None:
+            query["recursion"] = "1" if recursion else "0"
+        metadata: Any
+        if method != RequestMethod.GET:
+            raise NotImplementedError(f"{method.value} {path}")
+        if url.path == "/1.0":
+            metadata = {
+                "api_extensions": [],
+                "api_status": "stable",
+                "api_version": "1.0",
+                "auth": "trusted",
+                "public": False,
+                "auth_methods": ["tls"],
+            }
+        elif url.path == "/1.0/instances" and int(query.get("recursion", "0")):
+            metadata = [instance_document(name, int(query["recursion"])) for name in self.names]
+        elif url.path == "/1.0/instances":
+            metadata = [f"/1.0/instances/{name}" for name in self.names]
+        else:
+            raise NotImplementedError(f"{method.value} {path}")
+        return SyncResponse(type_="sync", metadata=metadata, status="Success", status_code=StatusCode.SUCCESS)
+
+    async def websocket(self) -> None:
+        """Do not open an event stream."""
+
+
+class StubLXDClient(LXDClient):
+    """LXD client using `StubTransport` and an events stream that stays silent."""
+
+    def __init__(self, config: Config, instances: int = 50) -> None:
+        """Create client with given number of instances."""
+        super().__init__(config, transport=StubTransport(instances))
+
+    @asynccontextmanager
+    async def subscribe_events(self, types: Sequence[str]) -> AsyncIterator[AsyncIterator[dict[str, Any]]]:
+        """Yield an events stream that never delivers anything."""
+
+        async def iterate() -> AsyncIterator[dict[str, Any]]:
+            await Event().wait()
+            yield {}
+
+        yield iterate()
@@ -1,19 +1,21 @@
 """Module containing main FastAPI application."""
 import logging
+from asyncio import create_task
+from contextlib import asynccontextmanager
 from os.path import isfile
+from typing import AsyncIterator
 
-from aiolxd import LXD
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
 
 from .core.config import Config
+from .core.database import dispose_engines
 from .core.exceptions.handler import register_exception_handler
-from .core.middlewares import (
-    AioLXDMiddleware,
-    ConfigMiddleware,
-    DBAsyncSessionMiddleware,
-)
+from .core.lxd import LXDClient
+from .core.middlewares import ConfigMiddleware, DBAsyncSessionMiddleware
+from .core.ratelimit import RateLimiter
 from .routes import router
+from .utils.auth import get_verifier
 
 log = logging.getLogger(__name__)
 
@@ -57,8 +59,10 @@ class App:
         """Add middlewares and routers to FastAPI application."""
         self.app.include_router(router)
 
-        # lxd
-        self.lxd = LXD.with_async(self.config.LXD_URL, cert=(self.config.LXD_CERT, self.config.LXD_KEY))
+        # lxd, started in lifespan
+        self.app.state.lxd_client = LXDClient(self.config)
+        # quotas of LXD-mutating routes
+        self.app.state.rate_limiter = RateLimiter.from_config(self.config)
 
         # cors middleware
         self.app.add_middleware(
@@ -71,6 +75,28 @@ class App:
         # middlewares
         self.app.add_middleware(DBAsyncSessionMiddleware, config=self.config)
         self.app.add_middleware(ConfigMiddleware, config=self.config)
-        self.app.add_middleware(AioLXDMiddleware, lxd=self.lxd)
         # exception handler
         register_exception_handler(self.app)
+        # shared resources
+        self.app.router.lifespan_context = self.lifespan
+
+    @asynccontextmanager
+    async def lifespan(self, app: FastAPI) -> AsyncIterator[None]:
+        """Start shared resources on startup and release them on shutdown.
+
+        LXD client connects in background, the readiness endpoint reports
+        when it is done. JWT key set, if configured, is loaded now and
+        reloaded in background.
+        """
+        key_set = get_verifier(self.config).key_set
+        refresh = None if key_set is None else create_task(key_set.run(self.config.JWT_KEYS_REFRESH_INTERVAL))
+        lxd_client: LXDClient = app.state.lxd_client
+        lxd_client.start_in_background()
+        try:
+            yield
+        finally:
+            if refresh is not None:
+                refresh.cancel()
+            await app.state.rate_limiter.close()
+            await lxd_client.close()
+            await dispose_engines()
@@ -1,7 +1,8 @@
 """Global application configuration."""
 import logging
 from dataclasses import dataclass
-from os import environ
+from os import environ, getpid
+from socket import gethostname
 
 log = logging.getLogger(__name__)
 
@@ -16,6 +17,48 @@ class Config:
     LXD_CERT: str
     LXD_KEY: str
     ORIGINS: tuple[str, ...] = ("*",)
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    LXD_POOL_SIZE: int = 100
+    LXD_WARM_CONNECTIONS: int = 2
+    LXD_KEEPALIVE: float = 30
+    LXD_CONNECT_TIMEOUT: float = 5
+    LXD_READ_TIMEOUT: float = 60
+    LXD_INVENTORY_TTL: float = 10
+    LXD_BULK_CONCURRENCY: int = 10
+    LXD_MAX_CONCURRENCY: int = 50
+    LXD_MAX_QUEUE: int = 1000
+    LXD_QUEUE_TIMEOUT: float = 10
+    LXD_EVENTS_QUEUE_SIZE: int = 100
+    LXD_EVENTS_MAX_DROPPED: int = 100
+    LXD_EVENTS_MAX_SUBSCRIBERS: int = 1000
+    WORKER_DISTRIBUTED: bool = False
+    WORKER_ID: str = ""
+    WORKER_LEASE_TTL: float = 60
+    QUEUE_BATCH_SIZE: int = 10
+    QUEUE_POLL_INTERVAL: float = 1
+    QUEUE_LOCK_TIMEOUT: float = 600
+    QUEUE_JOB_TIMEOUT: float = 3600
+    QUEUE_BACKOFF: float = 2
+    QUEUE_MAX_BACKOFF: float = 300
+    RECONCILE_INTERVAL: float = 300
+    RECONCILE_DIRTY_INTERVAL: float = 5
+    RECONCILE_BATCH_SIZE: int = 500
+    JWT_KEYS_PATH: str = ""
+    JWT_SIGNING_KEY_ID: str = ""
+    JWT_KEYS_REFRESH_INTERVAL: float = 60
+    JWT_KEYS_ROTATION_WINDOW: float = 3600
+    # Reject tokens without a key ID, signed with SECRET. If not set, they are
+    # rejected when JWT_KEYS_PATH is set.
+    JWT_REQUIRE_KEY_ID: bool | None = None
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_RATE: float = 1
+    RATE_LIMIT_BURST: float = 10
+    RATE_LIMIT_MAX_IN_FLIGHT: int = 5
+    RATE_LIMIT_SLOT_TTL: float = 600
 
     @staticmethod
     def _get_env(name: str, default: str | None = None) -> str:
@@ -38,6 +81,22 @@ class Config:
             return default
         return val
 
+    @classmethod
+    def _get_env_bool(cls, name: str, default: bool) -> bool:
+        """Get boolean environment variable.
+
+        Values "1", "true", "yes" and "on" (case-insensitive) are treated as true,
+        everything else as false.
+
+        Args:
+            name (str): Name of the environment variable.
+            default (bool): Default value if environment variable is not set.
+
+        Returns:
+            bool: Value of the environment variable.
+        """
+        return cls._get_env(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
     @classmethod
     def from_env(cls) -> "Config":
         """Create application from environment variables."""
@@ -55,4 +114,46 @@ class Config:
             LXD_CERT=cls._get_env("LXD_CERT"),
             LXD_KEY=cls._get_env("LXD_KEY"),
             ORIGINS=ORIGINS,
+            DATABASE_POOL_SIZE=int(cls._get_env("DATABASE_POOL_SIZE", "5")),
+            DATABASE_MAX_OVERFLOW=int(cls._get_env("DATABASE_MAX_OVERFLOW", "10")),
+            DATABASE_POOL_TIMEOUT=float(cls._get_env("DATABASE_POOL_TIMEOUT", "30")),
+            DATABASE_POOL_RECYCLE=int(cls._get_env("DATABASE_POOL_RECYCLE", "1800")),
+            DATABASE_POOL_PRE_PING=cls._get_env_bool("DATABASE_POOL_PRE_PING", True),
+            LXD_POOL_SIZE=int(cls._get_env("LXD_POOL_SIZE", "100")),
+            LXD_WARM_CONNECTIONS=int(cls._get_env("LXD_WARM_CONNECTIONS", "2")),
+            LXD_KEEPALIVE=float(cls._get_env("LXD_KEEPALIVE", "30")),
+            LXD_CONNECT_TIMEOUT=float(cls._get_env("LXD_CONNECT_TIMEOUT", "5")),
+            LXD_READ_TIMEOUT=float(cls._get_env("LXD_READ_TIMEOUT", "60")),
+            LXD_INVENTORY_TTL=float(cls._get_env("LXD_INVENTORY_TTL", "10")),
+            LXD_BULK_CONCURRENCY=int(cls._get_env("LXD_BULK_CONCURRENCY", "10")),
+            LXD_MAX_CONCURRENCY=int(cls._get_env("LXD_MAX_CONCURRENCY", "50")),
+            LXD_MAX_QUEUE=int(cls._get_env("LXD_MAX_QUEUE", "1000")),
+            LXD_QUEUE_TIMEOUT=float(cls._get_env("LXD_QUEUE_TIMEOUT", "10")),
+            LXD_EVENTS_QUEUE_SIZE=int(cls._get_env("LXD_EVENTS_QUEUE_SIZE", "100")),
+            LXD_EVENTS_MAX_DROPPED=int(cls._get_env("LXD_EVENTS_MAX_DROPPED", "100")),
+            LXD_EVENTS_MAX_SUBSCRIBERS=int(cls._get_env("LXD_EVENTS_MAX_SUBSCRIBERS", "1000")),
+            WORKER_DISTRIBUTED=cls._get_env_bool("WORKER_DISTRIBUTED", False),
+            WORKER_ID=cls._get_env("WORKER_ID", f"{gethostname()}:{getpid()}"),
+            WORKER_LEASE_TTL=float(cls._get_env("WORKER_LEASE_TTL", "60")),
+            QUEUE_BATCH_SIZE=int(cls._get_env("QUEUE_BATCH_SIZE", "10")),
+            QUEUE_POLL_INTERVAL=float(cls._get_env("QUEUE_POLL_INTERVAL", "1")),
+            QUEUE_LOCK_TIMEOUT=float(cls._get_env("QUEUE_LOCK_TIMEOUT", "600")),
+            QUEUE_JOB_TIMEOUT=float(cls._get_env("QUEUE_JOB_TIMEOUT", "3600")),
+            QUEUE_BACKOFF=float(cls._get_env("QUEUE_BACKOFF", "2")),
+            QUEUE_MAX_BACKOFF=float(cls._get_env("QUEUE_MAX_BACKOFF", "300")),
+            RECONCILE_INTERVAL=float(cls._get_env("RECONCILE_INTERVAL", "300")),
+            RECONCILE_DIRTY_INTERVAL=float(cls._get_env("RECONCILE_DIRTY_INTERVAL", "5")),
+            RECONCILE_BATCH_SIZE=int(cls._get_env("RECONCILE_BATCH_SIZE", "500")),
+            JWT_KEYS_PATH=cls._get_env("JWT_KEYS_PATH", ""),
+            JWT_SIGNING_KEY_ID=cls._get_env("JWT_SIGNING_KEY_ID", ""),
+            JWT_KEYS_REFRESH_INTERVAL=float(cls._get_env("JWT_KEYS_REFRESH_INTERVAL", "60")),
+            JWT_KEYS_ROTATION_WINDOW=float(cls._get_env("JWT_KEYS_ROTATION_WINDOW", "3600")),
+            JWT_REQUIRE_KEY_ID=(
+                cls._get_env_bool("JWT_REQUIRE_KEY_ID", False) if cls._get_env("JWT_REQUIRE_KEY_ID", "") else None
+            ),
+            RATE_LIMIT_BACKEND=cls._get_env("RATE_LIMIT_BACKEND", "memory"),
+            RATE_LIMIT_RATE=float(cls._get_env("RATE_LIMIT_RATE", "1")),
+            RATE_LIMIT_BURST=float(cls._get_env("RATE_LIMIT_BURST", "10")),
+            RATE_LIMIT_MAX_IN_FLIGHT=int(cls._get_env("RATE_LIMIT_MAX_IN_FLIGHT", "5")),
+            RATE_LIMIT_SLOT_TTL=float(cls._get_env("RATE_LIMIT_SLOT_TTL", "600")),
         )
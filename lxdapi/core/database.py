@@ -1,4 +1,110 @@
-"""Alchemy database."""
+"""Alchemy database.
+
+Engines are process-wide: every consumer (HTTP middleware, worker, CLI) asks
+for the engine of its `Config` and gets the same pooled instance back, instead
+of creating a fresh connection pool per request or per job.
+"""
+import logging
+from typing import Any
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool
+
+from .config import Config
+
+log = logging.getLogger(__name__)
 
 Base = declarative_base()
+
+_engines: dict[str, AsyncEngine] = {}
+_session_makers: dict[str, async_sessionmaker[AsyncSession]] = {}
+
+
+def _engine_options(config: Config) -> dict[str, Any]:
+    """Build `create_async_engine` keyword arguments from config.
+
+    SQLite drivers use pools without size limits, so sizing options are
+    passed only to server-based databases.
+    """
+    options: dict[str, Any] = {
+        "future": True,
+        "pool_pre_ping": config.DATABASE_POOL_PRE_PING,
+        "pool_recycle": config.DATABASE_POOL_RECYCLE,
+    }
+    if make_url(config.DATABASE_URL).get_backend_name() != "sqlite":
+        options["pool_size"] = config.DATABASE_POOL_SIZE
+        options["max_overflow"] = config.DATABASE_MAX_OVERFLOW
+        options["pool_timeout"] = config.DATABASE_POOL_TIMEOUT
+    return options
+
+
+def get_engine(config: Config) -> AsyncEngine:
+    """Get the shared async engine for the configured database.
+
+    The engine is created on first call and reused afterwards.
+
+    Returns:
+        AsyncEngine: Process-wide engine.
+    """
+    engine = _engines.get(config.DATABASE_URL)
+    if engine is None:
+        engine = create_async_engine(config.DATABASE_URL, **_engine_options(config))
+        _engines[config.DATABASE_URL] = engine
+        log.debug("Created database engine with pool %s", engine.pool.__class__.__name__)
+    return engine
+
+
+def get_session_maker(config: Config) -> async_sessionmaker[AsyncSession]:
+    """Get the shared session factory bound to the shared engine.
+
+    Returns:
+        async_sessionmaker: Factory producing `AsyncSession` objects.
+    """
+    session_maker = _session_makers.get(config.DATABASE_URL)
+    if session_maker is None:
+        session_maker = async_sessionmaker(get_engine(config), expire_on_commit=False)
+        _session_makers[config.DATABASE_URL] = session_maker
+    return session_maker
+
+
+async def dispose_engines() -> None:
+    """Close all pooled connections and forget the shared engines.
+
+    Should be called on process shutdown. Engines will be recreated on next use.
+    """
+    engines = list(_engines.values())
+    _engines.clear()
+    _session_makers.clear()
+    for engine in engines:
+        await engine.dispose()
+    if engines:
+        log.debug("Disposed %s database engine(s)", len(engines))
+
+
+def get_pool_status(config: Config) -> dict[str, Any]:
+    """Return connection pool statistics for monitoring.
+
+    Returns:
+        dict: Pool class name and, for queue pools, size, checked in/out
+        connections and current overflow.
+    """
+    engine = _engines.get(config.DATABASE_URL)
+    if engine is None:
+        return {"initialized": False}
+    pool = engine.pool
+    status: dict[str, Any] = {"initialized": True, "pool": pool.__class__.__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    return status
@@ -1,6 +1,6 @@
 """Abstract base classes for exceptions."""
 from abc import ABCMeta
-from typing import Type, TypeVar
+from typing import TypeVar
 
 from fastapi import status
 
@@ -82,14 +82,19 @@ class AbstractException(Exception, metaclass=ABCMeta):
         #
         # Order is important here, because we want to show the most specific
         # exception first.
+        #
+        # The chain is assigned to the instance: appending to the list declared on
+        # the class would share one chain between all exception classes.
         if not self.exception_chain:
+            exception_chain = []
             for class_type in self.__class__.__mro__:
                 # Stop when we reach AbstractException.
                 # This is needed because we don't want to include AbstractException and its
                 # parents in the exception chain.
                 if class_type.__name__ == AbstractException.__name__:
                     break
-                self.exception_chain.append(class_type.__name__)
+                exception_chain.append(class_type.__name__)
+            self.exception_chain = exception_chain
 
 
 # Define base exceptions for specific HTTP status codes.
@@ -139,6 +144,12 @@ class UnprocessableEntityException(AbstractException):
     status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
+class TooManyRequestsException(AbstractException):
+    """429 Too Many Requests."""
+
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+
+
 class InternalServerErrorException(AbstractException):
     """500 Internal Server Error."""
 
@@ -0,0 +1,16 @@
+"""Authentication exceptions."""
+
+from .abc import ForbiddenException, UnauthorizedException
+
+
+class NotAuthenticatedException(UnauthorizedException):
+    """Request has no valid credentials."""
+
+    detail = "Not authenticated"
+    headers = {"WWW-Authenticate": "Bearer"}
+
+
+class UserBannedException(ForbiddenException):
+    """User is banned."""
+
+    detail = "User is banned"
@@ -1,7 +1,36 @@
 """Common exceptions for the LXD API."""
 
-from .abc import InternalServerErrorException
+from .abc import (
+    BadRequestException,
+    ConflictException,
+    InternalServerErrorException,
+    NotFoundException,
+)
 
 
 class DatabaseException(InternalServerErrorException):
     """Exception raises when a database error occurs."""
+
+
+class InvalidCursorException(BadRequestException):
+    """Pagination cursor is malformed."""
+
+    detail = "Invalid pagination cursor"
+
+
+class InvalidFieldsException(BadRequestException):
+    """Requested fields are unknown."""
+
+    detail = "Unknown fields requested"
+
+
+class JobNotFoundException(NotFoundException):
+    """Background job doesn't exist."""
+
+    detail = "Job not found"
+
+
+class JobNotDeadException(ConflictException):
+    """Only dead jobs can be requeued."""
+
+    detail = "Job is not dead"
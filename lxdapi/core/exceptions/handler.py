@@ -17,6 +17,24 @@ class ErrorSchema(BaseModel):
     exception_chain: list[str] = ["Exception"]
 
 
+def exception_response(exc: AbstractException) -> JSONResponse:
+    """Build response of AbstractException.
+
+    Returns:
+        JSON serialized ErrorModel.
+    """
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=ErrorSchema(
+            error_code=exc.__class__.__name__,
+            detail=exc.detail,
+            status_code=exc.status_code,
+            exception_chain=exc.exception_chain,
+        ).dict(),
+        headers=exc.headers,
+    )
+
+
 def register_exception_handler(app: FastAPI) -> None:
     """Register exception handlers."""
 
@@ -27,16 +45,7 @@ def register_exception_handler(app: FastAPI) -> None:
         Returns:
             JSON serialized ErrorModel.
         """
-        return JSONResponse(
-            status_code=exc.status_code,
-            content=ErrorSchema(
-                error_code=exc.__class__.__name__,
-                detail=exc.detail,
-                status_code=exc.status_code,
-                exception_chain=exc.exception_chain,
-            ).dict(),
-            headers=exc.headers,
-        )
+        return exception_response(exc)
 
     @app.exception_handler(lxd_exceptions.AioLXDException)
     async def lxd_exception_handler(request: Request, exc: lxd_exceptions.AioLXDException) -> JSONResponse:
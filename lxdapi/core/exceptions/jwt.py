@@ -11,3 +11,9 @@ class TokenInvalidException(JWTException, UnprocessableEntityException):
     """JWT token is invalid."""
 
     detail = "JWT token is invalid"
+
+
+class TokenRevokedException(TokenInvalidException):
+    """JWT token is revoked."""
+
+    detail = "JWT token is revoked"
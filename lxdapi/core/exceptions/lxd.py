@@ -0,0 +1,51 @@
+"""LXD-related exceptions."""
+
+from .abc import (
+    AbstractException,
+    BadRequestException,
+    NotFoundException,
+    ServiceUnavailableException,
+)
+
+
+class LXDException(AbstractException):
+    """Base LXD exception."""
+
+
+class LXDNotReadyException(LXDException, ServiceUnavailableException):
+    """LXD client is not connected yet."""
+
+    detail = "LXD client is not ready"
+    headers = {"Retry-After": "1"}
+
+
+class LXDOverloadedException(LXDException, ServiceUnavailableException):
+    """Too many requests to LXD are waiting."""
+
+    detail = "LXD is overloaded"
+    headers = {"Retry-After": "1"}
+
+
+class LXDQueueTimeoutException(LXDOverloadedException):
+    """Request to LXD waited too long to be sent."""
+
+    detail = "Timed out waiting for LXD"
+
+
+class OperationNotFoundException(LXDException, NotFoundException):
+    """LXD operation doesn't exist or has expired."""
+
+    detail = "Operation not found"
+
+
+class TooManySubscribersException(LXDException, ServiceUnavailableException):
+    """Events subscribers limit is reached."""
+
+    detail = "Too many events subscribers"
+    headers = {"Retry-After": "10"}
+
+
+class InvalidEventTypeException(LXDException, BadRequestException):
+    """Requested event type isn't received from LXD."""
+
+    detail = "Unknown event type requested"
@@ -0,0 +1,25 @@
+"""Rate limiting exceptions."""
+from math import ceil
+
+from .abc import TooManyRequestsException
+
+
+class RateLimitExceededException(TooManyRequestsException):
+    """Too many requests to a route in a short time."""
+
+    detail = "Rate limit exceeded"
+
+    def __init__(self, retry_after: float) -> None:
+        """Create exception.
+
+        Args:
+            retry_after: Seconds until the request is allowed, returned in the Retry-After header.
+        """
+        super().__init__(headers={"Retry-After": str(max(1, ceil(retry_after)))})
+
+
+class TooManyOperationsException(TooManyRequestsException):
+    """Too many operations of the user are in progress."""
+
+    detail = "Too many operations in progress"
+    headers = {"Retry-After": "1"}
@@ -0,0 +1,18 @@
+"""Shared LXD client and its helpers."""
+from .admission import AdmissionController, AdmissionTransport
+from .client import LXDClient
+from .events import EventStream, Subscription
+from .inventory import InstanceInventory
+from .operations import OperationTracker
+from .singleflight import SingleFlight
+
+__all__ = [
+    "AdmissionController",
+    "AdmissionTransport",
+    "LXDClient",
+    "EventStream",
+    "InstanceInventory",
+    "OperationTracker",
+    "SingleFlight",
+    "Subscription",
+]
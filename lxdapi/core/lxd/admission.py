@@ -0,0 +1,152 @@
+"""Admission control of requests to LXD."""
+from asyncio import Future, TimeoutError, get_running_loop, wait_for
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+from aiolxd import AbstractTransport
+from aiolxd.entities.response import BaseResponse
+from aiolxd.transport import RequestMethod
+
+from lxdapi.core.exceptions.lxd import (
+    LXDOverloadedException,
+    LXDQueueTimeoutException,
+)
+
+
+class AdmissionController:
+    """Limit concurrent requests to LXD, with a bounded wait queue.
+
+    At most `max_concurrency` requests run at once. Others wait in a FIFO
+    queue of at most `max_queue` requests for `queue_timeout` seconds. When
+    the queue is full, requests are rejected right away, so a slow LXD
+    returns fast 503 errors instead of piling up waiting coroutines.
+
+    Example:
+    ```
+        admission = AdmissionController(max_concurrency=50, max_queue=1000, queue_timeout=10)
+        async with admission.slot():
+            await transport.get("/1.0/instances")
+    ```
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float) -> None:
+        """Initialize controller.
+
+        Args:
+            max_concurrency: Requests running at once, unlimited if 0.
+            max_queue: Requests waiting at once, requests are never queued if 0.
+            queue_timeout: Seconds a request waits in the queue before it is rejected.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque[Future[None]] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queued(self) -> int:
+        """Return number of requests waiting in the queue."""
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot while a request runs.
+
+        Raises:
+            LXDOverloadedException: If the queue is full.
+            LXDQueueTimeoutException: If no slot was free within the queue timeout.
+        """
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self) -> None:
+        """Take a free slot, or wait until one is handed over by `_release`."""
+        if self.max_concurrency <= 0 or (self.in_flight < self.max_concurrency and not self._waiters):
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise LXDOverloadedException()
+        waiter: Future[None] = get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over while the waiter was cancelled
+                self._release()
+            elif waiter in self._waiters:
+                # `_release` may already have dropped the cancelled waiter
+                self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                self.timed_out += 1
+                raise LXDQueueTimeoutException() from None
+            raise
+        self.admitted += 1
+
+    def _release(self) -> None:
+        """Hand the slot over to the first waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+def is_operation_wait(path: str) -> bool:
+    """Check if request path waits for an LXD operation to finish."""
+    path = urlsplit(path).path
+    return path.startswith("/1.0/operations/") and path.endswith("/wait")
+
+
+class AdmissionTransport(AbstractTransport):  # type: ignore[misc]
+    """Transport admitting requests of another transport through a controller.
+
+    Waiting for an operation doesn't hold a slot: operations returned by LXD
+    keep the wrapped transport, and `/1.0/operations/{id}/wait` requests,
+    which LXD holds until the operation finishes, are sent without admission.
+    """
+
+    def __init__(self, transport: AbstractTransport, admission: AdmissionController) -> None:
+        """Wrap transport.
+
+        Args:
+            transport: Transport sending requests.
+            admission: Controller admitting them.
+        """
+        self.transport = transport
+        self.admission = admission
+
+    async def request(
+        self,
+        method: RequestMethod,
+        path: str,
+        data: Optional[Dict[str, Any]] = None,
+        *,
+        recursion: Optional[bool] = None,
+        filter: Optional[str] = None,
+    ) -> BaseResponse:
+        """Send request once it is admitted, or right away if it waits for an operation."""
+        if is_operation_wait(path):
+            return await self.transport.request(method, path, data, recursion=recursion, filter=filter)
+        async with self.admission.slot():
+            return await self.transport.request(method, path, data, recursion=recursion, filter=filter)
+
+    async def websocket(self) -> None:
+        """Run events websocket of the wrapped transport."""
+        await self.transport.websocket()
+
+    async def close(self) -> None:
+        """Close the wrapped transport."""
+        await super().close()
+        await self.transport.close()
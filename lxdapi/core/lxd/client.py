@@ -0,0 +1,208 @@
+"""LXD client lifecycle."""
+import json
+import logging
+import ssl
+from asyncio import CancelledError, Event, Task, create_task, gather, sleep
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Sequence
+
+import aiohttp
+from aiolxd import LXD, AbstractTransport, AsyncTransport
+
+from lxdapi.core.config import Config
+from lxdapi.core.exceptions.lxd import LXDNotReadyException
+
+from .admission import AdmissionController, AdmissionTransport
+from .events import EventStream
+from .inventory import InstanceInventory
+from .operations import OperationTracker
+from .singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+
+class LXDClient:
+    """Application-wide LXD client.
+
+    Owns the `aiolxd.LXD` instance and its HTTP connection pool. The client is
+    started once, from the application lifespan, and is only handed out to
+    routes after the connection check succeeded and the pool was warmed up.
+
+    The client also owns the process-wide LXD events stream, which is started
+    together with the client, and the caches kept up to date by it: instance
+    inventory and operations. Identical concurrent reads can share one upstream
+    request through `reads`. All requests are admitted by `admission`, which
+    limits concurrent requests and sheds load when LXD is slow.
+
+    Example:
+    ```
+        client = LXDClient(config)
+        await client.start()
+        instances = await client.lxd.instance.list()
+        await client.close()
+    ```
+    """
+
+    def __init__(self, config: Config, transport: AbstractTransport | None = None) -> None:
+        """Initialize client.
+
+        Args:
+            config: Application config.
+            transport: Transport to use instead of the HTTPS one built from config.
+        """
+        self.config = config
+        self._transport = transport
+        self._session: aiohttp.ClientSession | None = None
+        self._lxd: LXD | None = None
+        self._is_ready = False
+        self._ready_event = Event()
+        self._start_task: Task[None] | None = None
+        self.reads = SingleFlight()
+        self.admission = AdmissionController(
+            max_concurrency=config.LXD_MAX_CONCURRENCY,
+            max_queue=config.LXD_MAX_QUEUE,
+            queue_timeout=config.LXD_QUEUE_TIMEOUT,
+        )
+        self.events = EventStream(
+            self,
+            max_subscribers=config.LXD_EVENTS_MAX_SUBSCRIBERS,
+            queue_size=config.LXD_EVENTS_QUEUE_SIZE,
+            max_dropped=config.LXD_EVENTS_MAX_DROPPED,
+        )
+        self.inventory = InstanceInventory(self, ttl=config.LXD_INVENTORY_TTL)
+        self.operations = OperationTracker(self)
+
+    @property
+    def is_ready(self) -> bool:
+        """Return True if the client is connected and warmed up."""
+        return self._is_ready
+
+    async def wait_ready(self) -> None:
+        """Wait until the client is started."""
+        await self._ready_event.wait()
+
+    @property
+    def lxd(self) -> LXD:
+        """Return the started LXD client.
+
+        Raises:
+            LXDNotReadyException: If the client is not started yet.
+        """
+        if not self._is_ready:
+            raise LXDNotReadyException()
+        return self._lxd
+
+    def _create_transport(self) -> AbstractTransport:
+        """Create HTTPS transport with connection pool configured from config."""
+        # Same behaviour as aiolxd's own context: authenticate with the client
+        # certificate, don't verify the (usually self-signed) server one.
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+        ssl_context.load_cert_chain(self.config.LXD_CERT, self.config.LXD_KEY)
+        connector = aiohttp.TCPConnector(
+            ssl=ssl_context,
+            limit=self.config.LXD_POOL_SIZE,
+            keepalive_timeout=self.config.LXD_KEEPALIVE,
+        )
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=self.config.LXD_CONNECT_TIMEOUT,
+            sock_read=self.config.LXD_READ_TIMEOUT,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return AsyncTransport(self.config.LXD_URL, session=self._session)
+
+    async def start(self) -> None:
+        """Connect to LXD and warm up the connection pool.
+
+        Raises:
+            Exception: Any connection or authentication error from aiolxd.
+        """
+        if self._is_ready:
+            return
+        if self._lxd is None:
+            self._lxd = LXD(AdmissionTransport(self._transport or self._create_transport(), self.admission))
+        try:
+            await self._lxd.start()
+        finally:
+            # aiolxd spawns its own events websocket which only logs events
+            await self._lxd.transport.close_ws()
+            self._lxd.transport.ws_task = None
+        # GET /1.0 is cheap, concurrent calls open keep-alive connections
+        warm = min(self.config.LXD_WARM_CONNECTIONS, self.config.LXD_POOL_SIZE) - 1
+        if warm > 0:
+            await gather(*(self._lxd.transport.get("/1.0") for _ in range(warm)))
+        self._is_ready = True
+        self._ready_event.set()
+        self.events.start()
+        log.info("LXD client connected to %s", self.config.LXD_URL)
+
+    @asynccontextmanager
+    async def subscribe_events(self, types: Sequence[str]) -> AsyncIterator[AsyncIterator[dict[str, Any]]]:
+        """Open a websocket to the LXD events endpoint.
+
+        Prefer `events`, the shared stream, over opening new subscriptions.
+
+        Args:
+            types: LXD event types, e.g. "lifecycle" or "operation".
+
+        Yields:
+            Async iterator over decoded events, ending when the websocket closes.
+        """
+        if self._session is None:
+            raise RuntimeError("Events are available only with the HTTPS transport")
+        url = f"{self.config.LXD_URL}/1.0/events?type={','.join(types)}"
+        async with self._session.ws_connect(url, heartbeat=self.config.LXD_KEEPALIVE) as ws:
+
+            async def iterate() -> AsyncIterator[dict[str, Any]]:
+                async for message in ws:
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        continue
+                    try:
+                        yield json.loads(message.data)
+                    except json.JSONDecodeError as e:
+                        log.error(f"Failed to decode LXD event: {e}")
+
+            yield iterate()
+
+    def start_in_background(self, max_delay: float = 30) -> None:
+        """Start the client in a task, retrying with exponential backoff.
+
+        Args:
+            max_delay: Maximum delay between attempts in seconds.
+        """
+
+        async def start_with_retry() -> None:
+            delay = 1.0
+            while True:
+                try:
+                    await self.start()
+                    return
+                except CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning("Can't connect to LXD: %r. Retrying in %s seconds...", e, delay)
+                await sleep(delay)
+                delay = min(delay * 2, max_delay)
+
+        if self._start_task is None:
+            self._start_task = create_task(start_with_retry())
+
+    async def close(self) -> None:
+        """Stop the start task and close the connection pool."""
+        if self._start_task is not None:
+            self._start_task.cancel()
+            try:
+                await self._start_task
+            except CancelledError:
+                pass
+            self._start_task = None
+        await self.events.close()
+        self._is_ready = False
+        self._ready_event.clear()
+        if self._lxd is not None:
+            await self._lxd.transport.close()
+            self._lxd = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
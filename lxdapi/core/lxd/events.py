@@ -0,0 +1,271 @@
+"""LXD events stream."""
+import asyncio
+import logging
+from asyncio import CancelledError, Event, Task, create_task, sleep, wait_for
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Sequence
+
+from lxdapi.core.exceptions.lxd import (
+    InvalidEventTypeException,
+    TooManySubscribersException,
+)
+
+from .inventory import instance_name
+
+if TYPE_CHECKING:
+    from .client import LXDClient
+
+log = logging.getLogger(__name__)
+
+EventListener = Callable[[dict[str, Any]], None]
+
+
+def event_instances(event: dict[str, Any]) -> set[str]:
+    """Return names of instances the event is about."""
+    metadata = event.get("metadata") or {}
+    if event.get("type") == "operation":
+        urls = (metadata.get("resources") or {}).get("instances") or []
+    else:
+        urls = [metadata.get("source", "")]
+    return {name for name in (instance_name(url) for url in urls) if name}
+
+
+class Subscription:
+    """Bounded queue of events for one downstream client.
+
+    When the queue is full the oldest event is dropped. A subscriber which
+    didn't read anything while `max_dropped` events were dropped is
+    considered stuck and the subscription is closed.
+    """
+
+    def __init__(
+        self,
+        types: Iterable[str] | None = None,
+        instances: Iterable[str] | None = None,
+        max_size: int = 100,
+        max_dropped: int = 100,
+    ) -> None:
+        """Initialize subscription.
+
+        Args:
+            types: Event types to receive, all if not set.
+            instances: Instance names to receive events about, all if not set.
+            max_size: Maximum number of queued events.
+            max_dropped: Number of events dropped in a row after which the
+                subscription is closed.
+        """
+        self.types = frozenset(types) if types else None
+        self.instances = frozenset(instances) if instances else None
+        self.max_dropped = max_dropped
+        self.dropped = 0
+        self.closed = False
+        self._queue: deque[dict[str, Any]] = deque(maxlen=max_size)
+        self._dropped_in_row = 0
+        self._changed = Event()
+
+    def matches(self, event: dict[str, Any]) -> bool:
+        """Return True if event passes the subscription filters."""
+        if self.types is not None and event.get("type") not in self.types:
+            return False
+        if self.instances is not None and not self.instances & event_instances(event):
+            return False
+        return True
+
+    def put(self, event: dict[str, Any]) -> None:
+        """Queue event, dropping the oldest one if the queue is full."""
+        if self.closed:
+            return
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+            self._dropped_in_row += 1
+            if self._dropped_in_row > self.max_dropped:
+                log.info("Closing events subscription of a slow consumer")
+                self.close()
+                return
+        self._queue.append(event)
+        self._changed.set()
+
+    async def get(self, timeout: float | None = None) -> dict[str, Any] | None:
+        """Return next event.
+
+        Returns:
+            dict | None: Event, or None on timeout or if subscription is closed.
+        """
+        if not self._queue and not self.closed:
+            self._changed.clear()
+            try:
+                await wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if not self._queue:
+            return None
+        self._dropped_in_row = 0
+        return self._queue.popleft()
+
+    def close(self) -> None:
+        """Close subscription, waking up the reader."""
+        self.closed = True
+        self._queue.clear()
+        self._changed.set()
+
+
+class EventStream:
+    """Single upstream subscription to the LXD `/1.0/events` endpoint.
+
+    The stream reconnects with exponential backoff and passes every event to
+    the registered listeners. Listeners are plain functions called from the
+    stream task, so they must be fast and must not block.
+
+    Downstream clients use `subscribe` instead, which gives them a bounded
+    queue of filtered events, so a slow client can't hold up the stream.
+
+    `epoch` is increased on every successful (re)connect. Consumers that keep
+    state in sync with events can compare it with the epoch they saw when the
+    state was loaded: if it changed, some events might have been missed.
+    """
+
+    def __init__(
+        self,
+        client: "LXDClient",
+        types: Sequence[str] = ("lifecycle", "operation"),
+        max_delay: float = 30,
+        max_subscribers: int = 1000,
+        queue_size: int = 100,
+        max_dropped: int = 100,
+    ) -> None:
+        """Initialize stream.
+
+        Args:
+            client: LXD client used to open the websocket.
+            types: LXD event types to subscribe to.
+            max_delay: Maximum delay between reconnects in seconds.
+            max_subscribers: Maximum number of downstream subscriptions.
+            queue_size: Maximum number of events queued per subscription.
+            max_dropped: Events dropped in a row before a subscription is closed.
+        """
+        self._client = client
+        self.types = tuple(types)
+        self.max_delay = max_delay
+        self.connected = False
+        self.epoch = 0
+        self.received = 0
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.max_dropped = max_dropped
+        self._listeners: list[EventListener] = []
+        self._subscriptions: set[Subscription] = set()
+        self._task: Task[None] | None = None
+
+    @property
+    def subscribers(self) -> int:
+        """Return number of downstream subscriptions."""
+        return len(self._subscriptions)
+
+    @property
+    def dropped(self) -> int:
+        """Return number of events dropped by current subscriptions."""
+        return sum(subscription.dropped for subscription in self._subscriptions)
+
+    def subscribe(
+        self,
+        types: Iterable[str] | None = None,
+        instances: Iterable[str] | None = None,
+    ) -> Subscription:
+        """Create downstream subscription.
+
+        The subscription must be passed to `unsubscribe` when it is no longer
+        used.
+
+        Args:
+            types: Event types to receive, all if not set.
+            instances: Instance names to receive events about, all if not set.
+
+        Raises:
+            InvalidEventTypeException: If a type isn't received by the stream.
+            TooManySubscribersException: If `max_subscribers` is reached.
+        """
+        self.check_subscribe(types)
+        subscription = Subscription(types, instances, self.queue_size, self.max_dropped)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def check_subscribe(self, types: Iterable[str] | None = None) -> None:
+        """Check a subscription to types can be created now, without creating it.
+
+        Raises:
+            InvalidEventTypeException: If a type isn't received by the stream.
+            TooManySubscribersException: If `max_subscribers` is reached.
+        """
+        if types and not set(types) <= set(self.types):
+            raise InvalidEventTypeException()
+        if len(self._subscriptions) >= self.max_subscribers:
+            raise TooManySubscribersException()
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Unregister and close downstream subscription."""
+        self._subscriptions.discard(subscription)
+        subscription.close()
+
+    def add_listener(self, listener: EventListener) -> None:
+        """Register a function called with every received event."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: EventListener) -> None:
+        """Unregister a listener."""
+        self._listeners.remove(listener)
+
+    def dispatch(self, event: dict[str, Any]) -> None:
+        """Pass event to all listeners."""
+        self.received += 1
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                log.exception("Error in LXD event listener %r", listener)
+        for subscription in list(self._subscriptions):
+            if subscription.matches(event):
+                subscription.put(event)
+            if subscription.closed:
+                self._subscriptions.discard(subscription)
+
+    def start(self) -> None:
+        """Start the stream task."""
+        if self._task is None:
+            self._task = create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the stream task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+        for subscription in self._subscriptions:
+            subscription.close()
+        self._subscriptions.clear()
+
+    async def _run(self) -> None:
+        """Receive events, reconnecting on errors."""
+        delay = 1.0
+        while True:
+            await self._client.wait_ready()
+            try:
+                async with self._client.subscribe_events(self.types) as events:
+                    self.connected = True
+                    self.epoch += 1
+                    delay = 1.0
+                    log.debug("Subscribed to LXD events %s", ",".join(self.types))
+                    async for event in events:
+                        self.dispatch(event)
+                log.warning("LXD events stream closed. Reconnecting in %s seconds...", delay)
+            except CancelledError:
+                raise
+            except Exception as e:
+                log.warning("LXD events stream failed: %r. Reconnecting in %s seconds...", e, delay)
+            finally:
+                self.connected = False
+            await sleep(delay)
+            delay = min(delay * 2, self.max_delay)
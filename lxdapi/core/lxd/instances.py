@@ -0,0 +1,117 @@
+"""Instance queries not covered by aiolxd.
+
+Names are quoted in request paths, aiolxd inserts them as is.
+"""
+from asyncio import gather
+from typing import Any
+from urllib.parse import quote, urlencode
+
+from aiolxd import LXD
+from aiolxd.entities.response import StatusCode
+from aiolxd.exceptions import AioLXDResponseTypeError
+
+from .inventory import instance_name
+
+
+async def list_instances(lxd: LXD, recursion: int, project: str | None = None) -> list[dict[str, Any]]:
+    """List instances with given LXD recursion level.
+
+    aiolxd only switches recursion on and off, while level 2 is needed to get
+    instance state in the same request.
+
+    Args:
+        lxd: Started LXD client.
+        recursion: 0 for names only, 1 for documents, 2 for documents with state.
+        project: LXD project, default project if not set.
+
+    Returns:
+        list: Instance documents, `{"name": ...}` dicts for recursion level 0.
+    """
+    params = {"recursion": str(recursion)}
+    if project is not None:
+        params["project"] = project
+    response = await lxd.transport.get(f"/1.0/instances?{urlencode(params)}")
+    if not isinstance(response.metadata, list):
+        raise TypeError(f"Expected list, got {response.metadata!r}")
+    if recursion == 0:
+        names = (instance_name(url) for url in response.metadata)
+        return [{"name": name} for name in names if name]
+    return response.metadata
+
+
+async def get_instance(lxd: LXD, name: str) -> dict[str, Any] | None:
+    """Get instance document with state, like in a recursion level 2 listing.
+
+    Returns:
+        dict | None: Instance document, None if the instance doesn't exist.
+    """
+    path = f"/1.0/instances/{quote(name, safe='')}"
+    try:
+        document, state = await gather(lxd.transport.get(path), lxd.transport.get(f"{path}/state"))
+    except AioLXDResponseTypeError as e:
+        if e.error.error_code == StatusCode.NOT_FOUND:
+            return None
+        raise
+    return {**document.metadata, "state": state.metadata}
+
+
+async def instance_exists(lxd: LXD, name: str) -> bool:
+    """Check if instance exists."""
+    try:
+        await lxd.transport.get(f"/1.0/instances/{quote(name, safe='')}")
+    except AioLXDResponseTypeError as e:
+        if e.error.error_code == StatusCode.NOT_FOUND:
+            return False
+        raise
+    return True
+
+
+async def find_operation(lxd: LXD, name: str, description: str) -> str | None:
+    """Find operation on an instance which is not finished yet.
+
+    Args:
+        lxd: Started LXD client.
+        name: Instance name.
+        description: LXD operation description, e.g. "Creating instance".
+
+    Returns:
+        str | None: LXD operation ID, None if there is no such operation.
+    """
+    response = await lxd.transport.get("/1.0/operations?recursion=1")
+    resource = f"/1.0/instances/{quote(name)}"
+    # Operations are grouped by status, finished ones are not needed
+    for status, operations in (response.metadata or {}).items():
+        if status in ("success", "failure", "cancelled"):
+            continue
+        for operation in operations or ():
+            resources = operation.get("resources") or {}
+            if operation.get("description") == description and resource in (resources.get("instances") or ()):
+                return str(operation["id"])
+    return None
+
+
+async def change_state(lxd: LXD, name: str, action: str, force: bool = False) -> str:
+    """Request instance state change.
+
+    Args:
+        lxd: Started LXD client.
+        name: Instance name.
+        action: One of start, stop, restart, freeze, unfreeze.
+        force: Force the action, e.g. kill instead of graceful shutdown.
+
+    Returns:
+        str: LXD operation ID.
+    """
+    path = f"/1.0/instances/{quote(name, safe='')}/state"
+    response = await lxd.transport.put(path, data={"action": action, "force": force})
+    return response.metadata["id"]
+
+
+async def delete_instance(lxd: LXD, name: str) -> str:
+    """Request instance deletion.
+
+    Returns:
+        str: LXD operation ID.
+    """
+    response = await lxd.transport.delete(f"/1.0/instances/{quote(name, safe='')}")
+    return response.metadata["id"]
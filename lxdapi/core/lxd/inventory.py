@@ -0,0 +1,137 @@
+"""Cached instance inventory."""
+import logging
+from asyncio import Lock
+from time import monotonic
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .client import LXDClient
+
+log = logging.getLogger(__name__)
+
+INSTANCES_PREFIX = "/1.0/instances/"
+
+
+def instance_name(url: str) -> str | None:
+    """Return instance name from LXD instance URL.
+
+    Example:
+    ```
+        instance_name("/1.0/instances/web?project=default")  # "web"
+        instance_name("/1.0/images/abc")  # None
+    ```
+    """
+    if not url.startswith(INSTANCES_PREFIX):
+        return None
+    name = url[len(INSTANCES_PREFIX) :].split("?", 1)[0]
+    if not name or "/" in name:
+        return None
+    return name
+
+
+class InstanceInventory:
+    """In-process cache of instance names.
+
+    The list is fetched once and then kept up to date by lifecycle events
+    from the shared events stream. While the stream is down, or it has
+    reconnected since the last fetch, events might have been missed and the
+    cache is trusted only for `ttl` seconds after the last fetch.
+    """
+
+    project = "default"
+
+    def __init__(self, client: "LXDClient", ttl: float) -> None:
+        """Initialize inventory.
+
+        Args:
+            client: LXD client, its events stream is used for invalidation.
+            ttl: Cache lifetime in seconds while events can't be trusted.
+        """
+        self._client = client
+        self.ttl = ttl
+        self._names: set[str] | None = None
+        self._fetched_at = 0.0
+        self._epoch = -1
+        self._lock = Lock()
+        self._pending: list[dict[str, Any]] | None = None
+        self.hits = 0
+        self.misses = 0
+        client.events.add_listener(self._on_event)
+
+    @property
+    def is_fresh(self) -> bool:
+        """Return True if cached names can be returned without a fetch."""
+        if self._names is None:
+            return False
+        events = self._client.events
+        if events.connected and events.epoch == self._epoch:
+            return True
+        return monotonic() - self._fetched_at < self.ttl
+
+    async def names(self, fresh: bool = False) -> list[str]:
+        """Return sorted instance names.
+
+        Args:
+            fresh: Bypass the cache and fetch names from LXD.
+        """
+        if fresh or not self.is_fresh:
+            self.misses += 1
+            await self.refresh(force=fresh)
+        else:
+            self.hits += 1
+        return sorted(self._names or ())
+
+    async def refresh(self, force: bool = False) -> None:
+        """Fetch instance names from LXD.
+
+        Concurrent callers wait for a single fetch.
+
+        Args:
+            force: Fetch even if another caller has just refreshed the cache.
+        """
+        started_at = monotonic()
+        async with self._lock:
+            if not force and self._fetched_at >= started_at and self._names is not None:
+                return
+            epoch = self._client.events.epoch if self._client.events.connected else -1
+            self._pending = []
+            try:
+                instances = await self._client.lxd.instance.list(recursion=False)
+                names = {name for name in (instance_name(i.operation) for i in instances) if name}
+                # Events received during the fetch might not be reflected in it
+                for event in self._pending:
+                    self._apply(names, event)
+            finally:
+                self._pending = None
+            self._names = names
+            self._fetched_at = monotonic()
+            self._epoch = epoch
+
+    def invalidate(self) -> None:
+        """Drop cached names."""
+        self._names = None
+
+    def _on_event(self, event: dict[str, Any]) -> None:
+        """Update cached names from a lifecycle event."""
+        if event.get("type") != "lifecycle" or event.get("project", self.project) != self.project:
+            return
+        if self._pending is not None:
+            self._pending.append(event)
+        if self._names is not None:
+            self._apply(self._names, event)
+
+    @staticmethod
+    def _apply(names: set[str], event: dict[str, Any]) -> None:
+        """Apply lifecycle event to a set of names."""
+        metadata = event.get("metadata") or {}
+        name = instance_name(metadata.get("source", ""))
+        if name is None:
+            return
+        action = metadata.get("action")
+        if action == "instance-created":
+            names.add(name)
+        elif action == "instance-deleted":
+            names.discard(name)
+        elif action == "instance-renamed":
+            names.discard((metadata.get("context") or {}).get("old_name", ""))
+            names.add(name)
@@ -0,0 +1,193 @@
+"""LXD operations tracking."""
+import asyncio
+import logging
+from asyncio import Event, wait_for
+from collections import OrderedDict
+from time import monotonic
+from typing import TYPE_CHECKING, Any, AsyncIterator
+from urllib.parse import quote
+
+from aiolxd.entities.response import StatusCode
+from aiolxd.exceptions import AioLXDResponseTypeError
+
+from lxdapi.core.exceptions.lxd import OperationNotFoundException
+
+if TYPE_CHECKING:
+    from .client import LXDClient
+
+log = logging.getLogger(__name__)
+
+TERMINAL_STATUS_CODES = frozenset(code.value for code in (StatusCode.SUCCESS, StatusCode.FAILURE, StatusCode.CANCELED))
+
+
+def is_terminal(operation: dict[str, Any]) -> bool:
+    """Return True if operation is finished."""
+    return operation.get("status_code") in TERMINAL_STATUS_CODES
+
+
+class OperationTracker:
+    """In-memory cache of LXD operations.
+
+    Operations are updated from the shared events stream, so any number of
+    clients waiting for an operation cost no upstream requests. An operation
+    is fetched from LXD only when it isn't cached, or when the events stream
+    was down and the cached copy might be outdated. Concurrent fetches of the
+    same operation share one request.
+    """
+
+    def __init__(self, client: "LXDClient", max_size: int = 10000) -> None:
+        """Initialize tracker.
+
+        Args:
+            client: LXD client, its events stream is used for updates.
+            max_size: Maximum number of cached operations.
+        """
+        self._client = client
+        self.max_size = max_size
+        # operation ID -> (operation, events epoch it was received in)
+        self._operations: OrderedDict[str, tuple[dict[str, Any], int]] = OrderedDict()
+        self._changed: dict[str, Event] = {}
+        # operation ID -> number of coroutines waiting for its update
+        self._waiters: dict[str, int] = {}
+        self.fetched = 0
+        client.events.add_listener(self._on_event)
+
+    @property
+    def size(self) -> int:
+        """Return number of cached operations."""
+        return len(self._operations)
+
+    @property
+    def waiting(self) -> int:
+        """Return number of operations somebody is waiting for."""
+        return len(self._changed)
+
+    def get_cached(self, operation_id: str) -> dict[str, Any] | None:
+        """Return cached operation, if it is known to be up to date."""
+        cached = self._operations.get(operation_id)
+        if cached is None:
+            return None
+        operation, epoch = cached
+        events = self._client.events
+        if is_terminal(operation) or (events.connected and events.epoch == epoch):
+            return operation
+        return None
+
+    async def get(self, operation_id: str) -> dict[str, Any]:
+        """Return operation, fetching it from LXD if needed.
+
+        Raises:
+            OperationNotFoundException: If LXD doesn't know the operation.
+        """
+        operation = self.get_cached(operation_id)
+        if operation is None:
+            operation = await self._fetch(operation_id)
+        return operation
+
+    async def wait(self, operation_id: str, timeout: float) -> dict[str, Any]:
+        """Wait until operation is finished or timeout expires.
+
+        Without events, the operation is polled with LXD waits shorter than
+        LXD_READ_TIMEOUT, until it finishes or the timeout expires.
+
+        Returns:
+            dict: The latest known state of the operation.
+        """
+        deadline = monotonic() + timeout
+        operation = await self.get(operation_id)
+        while not is_terminal(operation):
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                break
+            if not self._client.events.connected:
+                # No events to wait for: let LXD hold one request for all waiters.
+                # LXD sends nothing until the operation finishes, so the request
+                # must end before the read timeout.
+                read_timeout = self._client.config.LXD_READ_TIMEOUT
+                try:
+                    operation = await self._fetch(operation_id, wait=min(remaining, max(read_timeout - 1, 1)))
+                except asyncio.TimeoutError:
+                    # Still running, the latest known state is returned at the deadline
+                    pass
+                continue
+            await self._wait_changed(operation_id, remaining)
+            operation = await self.get(operation_id)
+        return operation
+
+    async def watch(self, operation_id: str, timeout: float) -> AsyncIterator[dict[str, Any]]:
+        """Yield operation state on every change until it is finished.
+
+        Args:
+            operation_id: LXD operation ID.
+            timeout: Maximum time between two changes in seconds.
+        """
+        operation = await self.get(operation_id)
+        yield operation
+        while not is_terminal(operation):
+            previous = operation
+            operation = await self.wait(operation_id, timeout)
+            if operation == previous:
+                return
+            yield operation
+
+    async def _wait_changed(self, operation_id: str, timeout: float) -> None:
+        """Wait for the next update of an operation."""
+        changed = self._changed.get(operation_id)
+        if changed is None:
+            changed = self._changed[operation_id] = Event()
+        self._waiters[operation_id] = self._waiters.get(operation_id, 0) + 1
+        try:
+            await wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.pop(operation_id) - 1
+            if waiters:
+                self._waiters[operation_id] = waiters
+            else:
+                # Nobody waits for the operation anymore, e.g. all waiters timed out
+                self._changed.pop(operation_id, None)
+
+    async def _fetch(self, operation_id: str, wait: float | None = None) -> dict[str, Any]:
+        """Fetch operation from LXD, sharing the request with concurrent callers."""
+        key = ("operation", operation_id, wait is not None)
+        return await self._client.reads.do(key, lambda: self._request(operation_id, wait))
+
+    async def _request(self, operation_id: str, wait: float | None) -> dict[str, Any]:
+        """Request operation from LXD and cache it."""
+        if operation_id in (".", ".."):
+            # Not quoted, and would be a path to another resource
+            raise OperationNotFoundException()
+        self.fetched += 1
+        epoch = self._client.events.epoch if self._client.events.connected else -1
+        # Operation IDs come from clients, they must not change the rest of the URL
+        path = f"/1.0/operations/{quote(operation_id, safe='')}"
+        if wait is not None:
+            path += f"/wait?timeout={max(int(wait), 1)}"
+        try:
+            response = await self._client.lxd.transport.get(path)
+        except AioLXDResponseTypeError as e:
+            if e.error.error_code == StatusCode.NOT_FOUND:
+                raise OperationNotFoundException()
+            raise
+        operation: dict[str, Any] = response.metadata
+        self._store(operation, epoch)
+        return operation
+
+    def _on_event(self, event: dict[str, Any]) -> None:
+        """Update cached operation from an operation event."""
+        if event.get("type") == "operation" and isinstance(event.get("metadata"), dict):
+            self._store(event["metadata"], self._client.events.epoch)
+
+    def _store(self, operation: dict[str, Any], epoch: int) -> None:
+        """Cache operation and wake up its waiters."""
+        operation_id = operation.get("id")
+        if not operation_id:
+            return
+        self._operations[operation_id] = (operation, epoch)
+        self._operations.move_to_end(operation_id)
+        while len(self._operations) > self.max_size:
+            self._operations.popitem(last=False)
+        changed = self._changed.pop(operation_id, None)
+        if changed is not None:
+            changed.set()
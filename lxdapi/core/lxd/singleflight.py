@@ -0,0 +1,67 @@
+"""Coalescing of identical concurrent calls."""
+from asyncio import Task, create_task, shield
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key starts the call, callers arriving before it
+    completes wait for the same result or exception. Once the call completes
+    the key is forgotten, so results are never cached.
+
+    Results are shared objects: callers must not modify them in place.
+
+    Example:
+    ```
+        flight = SingleFlight()
+        instances = await flight.do(("instances", 1), lambda: list_instances(lxd, 1))
+    ```
+    """
+
+    def __init__(self) -> None:
+        """Initialize with no calls in flight."""
+        self._calls: dict[Hashable, Task[Any]] = {}
+        self.issued = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Return number of calls currently in flight."""
+        return len(self._calls)
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[T]]) -> T:
+        """Call function, or join the call in flight for the same key.
+
+        Args:
+            key: Identifies the call, e.g. a tuple of method and arguments.
+            function: Starts the call, invoked only if none is in flight.
+
+        Returns:
+            Result of the shared call.
+        """
+        task: Task[T] | None = self._calls.get(key)
+        if task is None:
+            self.issued += 1
+            task = create_task(self._call(function))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the call shared with others
+        return await shield(task)
+
+    @staticmethod
+    async def _call(function: Callable[[], Awaitable[T]]) -> T:
+        """Await the function result inside a task."""
+        return await function()
+
+    def _forget(self, key: Hashable, task: "Task[Any]") -> None:
+        """Remove completed call, unless the key was reused already."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Retrieve the exception so it isn't logged when no caller is left
+            task.exception()
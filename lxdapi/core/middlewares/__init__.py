@@ -1,6 +1,5 @@
 """FastAPI middlewares."""
 from .config import ConfigMiddleware
-from .db import DBAsyncSessionMiddleware
-from .lxd import AioLXDMiddleware
+from .db import DBAsyncSessionMiddleware, LazyAsyncSession
 
-__all__ = ["DBAsyncSessionMiddleware", "ConfigMiddleware", "AioLXDMiddleware"]
+__all__ = ["DBAsyncSessionMiddleware", "ConfigMiddleware", "LazyAsyncSession"]
@@ -1,16 +1,11 @@
-"""Database middleware."""
+"""Config middleware."""
 
-from fastapi import Request, Response
-from starlette.middleware.base import (
-    BaseHTTPMiddleware,
-    RequestResponseEndpoint,
-)
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from lxdapi.core.config import Config
 
 
-class ConfigMiddleware(BaseHTTPMiddleware):
+class ConfigMiddleware:
     """Config middleware.
 
     Sets the config object in the request state.
@@ -18,10 +13,11 @@ class ConfigMiddleware(BaseHTTPMiddleware):
 
     def __init__(self, app: ASGIApp, config: Config) -> None:
         """Initialize."""
-        super().__init__(app)
+        self.app = app
         self.config = config
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        """Dispatch."""
-        request.state.config = self.config
-        return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle ASGI call."""
+        if scope["type"] in ("http", "websocket"):
+            scope.setdefault("state", {})["config"] = self.config
+        await self.app(scope, receive, send)
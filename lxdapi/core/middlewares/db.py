@@ -2,40 +2,111 @@
 
 import logging
 
-from fastapi import Request, Response
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from starlette.middleware.base import (
-    BaseHTTPMiddleware,
-    RequestResponseEndpoint,
-)
-from starlette.types import ASGIApp
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from lxdapi.core.config import Config
+from lxdapi.core.database import get_session_maker
 from lxdapi.core.exceptions.common import DatabaseException
+from lxdapi.core.exceptions.handler import exception_response
 
 log = logging.getLogger(__name__)
 
 
-class DBAsyncSessionMiddleware(BaseHTTPMiddleware):
-    """Database session middleware."""
+class LazyAsyncSession:
+    """Database session which is created on first use.
+
+    Requests that never ask for a session don't touch the connection pool.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        """Initialize."""
+        self._session_maker = session_maker
+        self._session: AsyncSession | None = None
+
+    @property
+    def is_used(self) -> bool:
+        """Return True if the session was created."""
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        """Return the session, creating it if needed."""
+        if self._session is None:
+            self._session = self._session_maker()
+        return self._session
+
+    async def commit(self) -> None:
+        """Commit the session, if it was used."""
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        """Roll back the session, if it was used."""
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        """Close the session, if it was used."""
+        if self._session is not None:
+            await self._session.close()
+
+
+class DBAsyncSessionMiddleware:
+    """Database session middleware.
+
+    Sets a `LazyAsyncSession` in the request state. If some dependency used
+    the session, it is committed before the response starts, so the client
+    gets a success only for committed changes. If the commit fails, an error
+    response is sent instead of the response of the route. The session is
+    rolled back if the request failed before the response started.
+    """
 
     def __init__(self, app: ASGIApp, config: Config) -> None:
         """Initialize."""
-        super().__init__(app)
-        engine = create_async_engine(config.DATABASE_URL)
-        self.async_session_maker = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)  # type: ignore
+        self.app = app
+        self.async_session_maker = get_session_maker(config)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle ASGI call."""
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        db = LazyAsyncSession(self.async_session_maker)
+        scope.setdefault("state", {})["db"] = db
+        committed = False
+        # Set if the commit failed, messages of the route response are dropped
+        failed = False
+
+        async def send_after_commit(message: Message) -> None:
+            nonlocal committed, failed
+            if message["type"] in ("http.response.start", "websocket.accept") and not committed:
+                committed = True
+                try:
+                    await db.commit()
+                except SQLAlchemyError as error:
+                    await db.rollback()
+                    log.exception(f"Exception in db. Rolling back. Details: {error}")
+                    if message["type"] != "http.response.start":
+                        raise DatabaseException("Database error")
+                    failed = True
+                    await exception_response(DatabaseException("Database error"))(scope, receive, send)
+                    return
+            if not failed:
+                await send(message)
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        """Dispatch."""
         try:
-            request.state.db = self.async_session_maker()
-            return await call_next(request)
+            await self.app(scope, receive, send_after_commit)
+            # Changes made while the response body was sent, e.g. by a streaming response
+            await db.commit()
         except SQLAlchemyError as error:
-            await request.state.db.rollback()
+            await db.rollback()
             log.exception(f"Exception in db. Rolling back. Details: {error}")
             raise DatabaseException("Database error")
+        except BaseException:
+            await db.rollback()
+            raise
         finally:
-            await request.state.db.commit()
-            await request.state.db.close()
+            await db.close()
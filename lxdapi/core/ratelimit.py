@@ -0,0 +1,293 @@
+"""Rate limiting of requests and concurrency quotas of operations.
+
+Requests are limited by token buckets: every key has a bucket of `burst`
+tokens refilled with `rate` tokens per second, and each request takes one.
+Operations in progress are limited by slots: a key has `max_in_flight`
+slots, held while an operation runs, also after the request that started
+it has been answered.
+
+Backends store buckets and slots. The memory backend is per process, so
+with several workers each of them allows the full quota. The database
+backend shares quotas between all workers through the application database.
+Other shared stores, like Redis, can be added by implementing
+`RateLimitBackend`.
+"""
+import logging
+from abc import ABCMeta, abstractmethod
+from asyncio import Task, create_task, gather, wait_for
+from contextlib import asynccontextmanager
+from math import inf
+from time import monotonic
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from ..models import RateLimitBucketModel, RateLimitSlotModel
+from ..utils.cache import TTLCache
+from .config import Config
+from .database import get_session_maker
+from .exceptions.ratelimit import (
+    RateLimitExceededException,
+    TooManyOperationsException,
+)
+
+log = logging.getLogger(__name__)
+
+
+class RateLimitBackend(metaclass=ABCMeta):
+    """Storage of token buckets and operation slots."""
+
+    # Slots can be released by other processes, e.g. the worker
+    shared = False
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take a token from bucket.
+
+        Returns:
+            float: 0 if the token is taken, otherwise seconds until it is available.
+        """
+
+    @abstractmethod
+    async def acquire(self, key: str, limit: int, ttl: float) -> str | None:
+        """Acquire one of `limit` slots, held for `ttl` seconds at most.
+
+        Returns:
+            str | None: ID to release the slot with, None if all slots are held.
+        """
+
+    @abstractmethod
+    async def release(self, key: str, slot: str) -> None:
+        """Release slot."""
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Backend storing buckets and slots in process memory.
+
+    A bucket is stored until it is full again, at most `maxsize` buckets
+    are stored. Slots are always released by the process, so they don't
+    expire.
+    """
+
+    def __init__(self, maxsize: int = 100000) -> None:
+        """Initialize empty backend."""
+        self.buckets: TTLCache[str, tuple[float, float]] = TTLCache(maxsize=maxsize, ttl=inf)
+        self.slots: dict[str, int] = {}
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take a token from bucket."""
+        now = monotonic()
+        bucket = self.buckets.get(key)
+        tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        self.buckets.set(key, (tokens - 1, now), ttl=(burst - tokens + 1) / rate)
+        return 0
+
+    async def acquire(self, key: str, limit: int, ttl: float) -> str | None:
+        """Acquire one of `limit` slots."""
+        held = self.slots.get(key, 0)
+        if held >= limit:
+            return None
+        self.slots[key] = held + 1
+        return key
+
+    async def release(self, key: str, slot: str) -> None:
+        """Release slot."""
+        held = self.slots.pop(key, 0) - 1
+        if held > 0:
+            self.slots[key] = held
+
+
+class DatabaseRateLimitBackend(RateLimitBackend):
+    """Backend storing buckets and slots in the application database.
+
+    Every call runs a short transaction of its own, not the one of the request.
+    Slots can be released by other processes with `RateLimitSlotModel.release`.
+    """
+
+    shared = True
+
+    def __init__(self, config: Config) -> None:
+        """Initialize backend using database of config."""
+        self.config = config
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take a token from bucket."""
+        async with get_session_maker(self.config)() as db:
+            wait = await RateLimitBucketModel.take(db, key, rate, burst)
+            await db.commit()
+        return wait
+
+    async def acquire(self, key: str, limit: int, ttl: float) -> str | None:
+        """Acquire one of `limit` slots."""
+        async with get_session_maker(self.config)() as db:
+            owner = await RateLimitSlotModel.acquire(db, key, limit, ttl)
+            await db.commit()
+        return owner
+
+    async def release(self, key: str, slot: str) -> None:
+        """Release slot."""
+        async with get_session_maker(self.config)() as db:
+            await RateLimitSlotModel.release(db, key, slot)
+            await db.commit()
+
+
+class OperationSlot:
+    """Slot of a user, held by a request.
+
+    The slot is released when the request ends, unless the request hands it
+    over to the operation it started with `hold_until`, or to another process
+    with `hand_over`.
+    """
+
+    def __init__(self, limiter: "RateLimiter", key: str, slot: str | None) -> None:
+        """Initialize slot.
+
+        Args:
+            limiter: Limiter the slot was acquired from.
+            key: User key.
+            slot: ID of the slot, None if operations are not limited.
+        """
+        self.limiter = limiter
+        self.key = key
+        self.slot = slot
+        self.held = False
+
+    @property
+    def owner(self) -> str | None:
+        """ID to release the slot with from another process, None if the backend is not shared."""
+        if self.slot is None or self.held or not self.limiter.backend.shared:
+            return None
+        return self.slot
+
+    def hand_over(self) -> None:
+        """Keep the slot held after the request, for another process to release it by `owner`."""
+        self.held = True
+
+    def hold_until(self, done: Callable[[], Awaitable[Any]]) -> None:
+        """Hold the slot after the request until `done()` completes, at most `slot_ttl` seconds.
+
+        Args:
+            done: Returns an awaitable completed with the operation, e.g. waiting for an LXD operation.
+        """
+        if self.slot is None or self.held:
+            return
+        self.held = True
+        task = create_task(self._release_after(done))
+        # The event loop keeps weak references to tasks only
+        self.limiter.tasks.add(task)
+        task.add_done_callback(self.limiter.tasks.discard)
+
+    async def release(self) -> None:
+        """Release the slot, if it is not released yet."""
+        slot, self.slot = self.slot, None
+        if slot is not None:
+            await self.limiter.backend.release(self.key, slot)
+
+    async def _release_after(self, done: Callable[[], Awaitable[Any]]) -> None:
+        """Release the slot once the operation completes."""
+        try:
+            await wait_for(done(), self.limiter.slot_ttl)
+        except Exception as e:
+            log.warning("Failed to wait for operation of %s, releasing its slot: %r", self.key, e)
+        finally:
+            await self.release()
+
+
+class RateLimiter:
+    """Rate limits and concurrency quotas of users.
+
+    Example:
+    ```
+        limiter = RateLimiter(MemoryRateLimitBackend(), rate=1, burst=10, max_in_flight=5)
+        async with limiter.operation("user:1", "create_server") as slot:
+            operation_id = ...
+            slot.hold_until(lambda: lxd_client.operations.wait(operation_id, limiter.slot_ttl))
+    ```
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        rate: float,
+        burst: float,
+        max_in_flight: int,
+        slot_ttl: float = 600,
+    ) -> None:
+        """Initialize limiter.
+
+        Args:
+            backend: Storage of buckets and slots.
+            rate: Requests per second allowed to a route, rate limiting is disabled if 0.
+            burst: Requests allowed at once after a pause, at least 1.
+            max_in_flight: Operations in progress allowed to a user, unlimited if 0.
+            slot_ttl: Seconds a slot is held if its worker failed to release it.
+        """
+        self.backend = backend
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_in_flight = max_in_flight
+        self.slot_ttl = slot_ttl
+        # Tasks releasing slots of operations which outlived their requests
+        self.tasks: set[Task[None]] = set()
+
+    @classmethod
+    def from_config(cls, config: Config) -> "RateLimiter":
+        """Create limiter with the configured backend and quotas."""
+        backend: RateLimitBackend
+        if config.RATE_LIMIT_BACKEND == "database":
+            backend = DatabaseRateLimitBackend(config)
+        else:
+            backend = MemoryRateLimitBackend()
+        return cls(
+            backend,
+            rate=config.RATE_LIMIT_RATE,
+            burst=config.RATE_LIMIT_BURST,
+            max_in_flight=config.RATE_LIMIT_MAX_IN_FLIGHT,
+            slot_ttl=config.RATE_LIMIT_SLOT_TTL,
+        )
+
+    async def close(self) -> None:
+        """Stop waiting for operations and release their slots."""
+        for task in self.tasks:
+            task.cancel()
+        await gather(*self.tasks, return_exceptions=True)
+
+    async def check(self, key: str, scope: str) -> None:
+        """Count a request of a user to a route.
+
+        Args:
+            key: User key.
+            scope: Route name, every route has its own bucket.
+
+        Raises:
+            RateLimitExceededException: If the request rate is exceeded.
+        """
+        if self.rate <= 0:
+            return
+        wait = await self.backend.take(f"{scope}:{key}", self.rate, self.burst)
+        if wait > 0:
+            raise RateLimitExceededException(wait)
+
+    @asynccontextmanager
+    async def operation(self, key: str, scope: str) -> AsyncIterator[OperationSlot]:
+        """Count a request and hold a slot of the user while it runs.
+
+        The slot is released when the block exits, unless it is handed over
+        to the started operation, see `OperationSlot.hold_until`.
+
+        Raises:
+            RateLimitExceededException: If the request rate is exceeded.
+            TooManyOperationsException: If all slots of the user are held.
+        """
+        await self.check(key, scope)
+        slot = None
+        if self.max_in_flight > 0:
+            slot = await self.backend.acquire(key, self.max_in_flight, self.slot_ttl)
+            if slot is None:
+                raise TooManyOperationsException()
+        holder = OperationSlot(self, key, slot)
+        try:
+            yield holder
+        finally:
+            if not holder.held:
+                await holder.release()
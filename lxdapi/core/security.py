@@ -1,8 +1,44 @@
 """Security variables and functions."""
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
 from fastapi.security import OAuth2PasswordBearer
 
+from lxdapi.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from lxdapi.models import UserModel
+
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl="/v1/auth/login",
     auto_error=False,
     description="User authorization. Access token valid for 15 minutes.",
 )
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated user, as needed for authorization checks."""
+
+    id: int
+    email: str
+    is_admin: bool
+    is_banned: bool
+    permission_groups: frozenset[str]
+
+    @classmethod
+    def from_user(cls, user: "UserModel") -> "Principal":
+        """Create principal from user model."""
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_admin=user.is_admin,
+            is_banned=user.is_banned,
+            permission_groups=frozenset(user.permission_groups),
+        )
+
+
+# Principals by token subject. Changes of users made by `UserModel` in this
+# process invalidate it, changes made by other processes are visible after
+# the TTL.
+principals: TTLCache[str, Principal] = TTLCache(maxsize=10000, ttl=30)
@@ -0,0 +1,48 @@
+"""Authentication dependency."""
+from fastapi import Depends, Request
+
+from lxdapi.core.exceptions.auth import (
+    NotAuthenticatedException,
+    UserBannedException,
+)
+from lxdapi.core.security import Principal, oauth2_scheme, principals
+from lxdapi.models import UserModel
+from lxdapi.utils.auth import get_verifier
+
+from .database import get_db
+
+
+async def get_current_user(request: Request, token: str | None = Depends(oauth2_scheme)) -> Principal:
+    """Get the user authenticated by the bearer token.
+
+    The token is verified by the shared verifier, and the user is resolved
+    from the principal cache by the token subject, so a database session is
+    opened only on a cache miss or to sync revoked tokens.
+
+    Raises:
+        NotAuthenticatedException: If token is missing or its user doesn't exist.
+        TokenInvalidException: If token is invalid or revoked.
+        UserBannedException: If user is banned.
+
+    Returns:
+        Principal: Authenticated user.
+    """
+    if token is None:
+        raise NotAuthenticatedException()
+    verifier = get_verifier(request.state.config)
+    if verifier.sync_due:
+        await verifier.sync(get_db(request))
+    subject = verifier.verify(token).get("sub")
+    if not isinstance(subject, str) or not subject.isdigit():
+        raise NotAuthenticatedException()
+
+    principal = principals.get(subject)
+    if principal is None:
+        user = await UserModel.get(get_db(request), int(subject))
+        if user is None:
+            raise NotAuthenticatedException()
+        principal = Principal.from_user(user)
+        principals.set(subject, principal)
+    if principal.is_banned:
+        raise UserBannedException()
+    return principal
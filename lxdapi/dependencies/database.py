@@ -1,28 +1,32 @@
 """Module containing database setup and dependency."""
 
 from fastapi import Request
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from lxdapi.core.config import Config
+from lxdapi.core.database import get_session_maker
 
 
 def get_db_deprecated(config: Config) -> AsyncSession:
     """Get async database session instance with current engine.
 
-    *Deprecated*: Use get_db instead.
+    *Deprecated*: Use get_db instead, or `get_session_maker` outside of requests.
+
+    The session is bound to the shared engine, so the caller must close it.
 
     Returns:
         AsyncSession: Prepared database session.
     """
-    engine = create_async_engine(config.DATABASE_URL, future=True)
-    return sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)()  # type: ignore
+    return get_session_maker(config)()
 
 
 def get_db(request: Request) -> AsyncSession:
     """Get database session from request.
 
+    The session is created on first call within a request, so routes that
+    don't depend on it never open a database connection.
+
     Returns:
         AsyncSession: Prepared database session.
     """
-    return request.state.db
+    return request.state.db.session
@@ -3,11 +3,25 @@
 from aiolxd import LXD
 from fastapi import Request
 
+from lxdapi.core.lxd import LXDClient
+
+
+def get_lxd_client(request: Request) -> LXDClient:
+    """Get application LXD client.
+
+    Returns:
+        LXDClient: Application-wide LXD client, possibly not started yet.
+    """
+    return request.app.state.lxd_client
+
 
 def get_lxd(request: Request) -> LXD:
-    """Get AioLXD session from request.
+    """Get AioLXD session from application state.
+
+    Raises:
+        LXDNotReadyException: If the client is not connected yet.
 
     Returns:
         LXD: Prepared AioLXD session.
     """
-    return request.state.lxd
+    return get_lxd_client(request).lxd
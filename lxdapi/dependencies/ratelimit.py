@@ -0,0 +1,59 @@
+"""Rate limiting dependency."""
+from typing import AsyncIterator, Callable
+
+from fastapi import Depends, Request
+
+from lxdapi.core.exceptions.jwt import TokenInvalidException
+from lxdapi.core.ratelimit import OperationSlot, RateLimiter
+from lxdapi.core.security import oauth2_scheme
+from lxdapi.utils.auth import get_verifier
+
+
+def get_client_key(request: Request, token: str | None = Depends(oauth2_scheme)) -> str:
+    """Get key of the client to count its quotas by.
+
+    Clients with a valid bearer token are counted by the token subject, so
+    quotas follow users across addresses. Others are counted by address.
+    The token is verified by the shared verifier only, without a database
+    lookup, and an invalid token is left for authentication to reject.
+    """
+    if token is not None:
+        try:
+            subject = get_verifier(request.state.config).verify(token).get("sub")
+        except TokenInvalidException:
+            subject = None
+        if subject is not None:
+            return f"user:{subject}"
+    return f"ip:{request.client.host if request.client else ''}"
+
+
+def rate_limit(scope: str) -> Callable[..., AsyncIterator[OperationSlot]]:
+    """Create dependency limiting requests of a client to a route and its operations in progress.
+
+    The route gets the slot of the client and hands it over to the
+    operation it starts, so the slot is held until the operation completes.
+
+    Args:
+        scope: Route name, every route has its own request rate limit.
+
+    Example:
+    ```
+        @router.post("/")
+        async def create_server(slot: OperationSlot = Depends(rate_limit("create_server"))):
+            ...
+            slot.hold_until(lambda: lxd_client.operations.wait(operation_id, slot.limiter.slot_ttl))
+    ```
+    """
+
+    async def dependency(request: Request, key: str = Depends(get_client_key)) -> AsyncIterator[OperationSlot]:
+        """Hold a slot of the client until the response is sent, or until the operation it is handed over to completes.
+
+        Raises:
+            RateLimitExceededException: If the request rate is exceeded.
+            TooManyOperationsException: If too many operations of the client are in progress.
+        """
+        limiter: RateLimiter = request.app.state.rate_limiter
+        async with limiter.operation(key, scope) as slot:
+            yield slot
+
+    return dependency
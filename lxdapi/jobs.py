@@ -0,0 +1,61 @@
+"""Background job handlers.
+
+Handlers are run by the worker for jobs from the queue (see `JobModel`). A
+handler gets the worker's LXD client, the job payload and the number of the
+attempt, starting from 1, and returns a JSON-serializable result. An
+exception fails the attempt and the job is retried later, except for
+`PermanentJobError`, which moves the job to the dead-letter status.
+"""
+from typing import Any, Awaitable, Callable
+
+from aiolxd.entities.response import StatusCode
+
+from lxdapi.core.lxd import LXDClient
+from lxdapi.core.lxd.instances import find_operation, instance_exists
+
+JobHandler = Callable[[LXDClient, dict[str, Any], int], Awaitable[Any]]
+
+# Description of LXD instance creation operations
+CREATE_DESCRIPTION = "Creating instance"
+
+
+class PermanentJobError(Exception):
+    """Job error that retrying won't fix."""
+
+
+async def create_server(lxd_client: LXDClient, payload: dict[str, Any], attempt: int) -> dict[str, Any]:
+    """Create virtual machine and wait until LXD finishes the operation.
+
+    A previous attempt may have created the instance before it failed, e.g.
+    on a timeout, so on a retry an existing instance is a success, and a
+    create operation still in progress is waited for instead of starting
+    another. On the first attempt they belong to someone else.
+
+    Payload:
+        name: Instance name.
+        source: Image alias.
+
+    Raises:
+        PermanentJobError: If the instance exists on the first attempt.
+    """
+    lxd = lxd_client.lxd
+    name = payload["name"]
+    operation_id = await find_operation(lxd, name, CREATE_DESCRIPTION)
+    if operation_id is not None and attempt == 1:
+        raise PermanentJobError(f"Instance {name} is already being created")
+    if operation_id is None:
+        if await instance_exists(lxd, name):
+            if attempt == 1:
+                raise PermanentJobError(f"Instance {name} already exists")
+            return {"operation_id": None}
+        response = await lxd.instance.create(name=name, source=payload["source"], type_="virtual-machine")
+        operation_id = response.metadata["id"]
+    operation = await lxd_client.operations.wait(operation_id, lxd_client.config.QUEUE_JOB_TIMEOUT)
+    if operation.get("status_code") != StatusCode.SUCCESS.value:
+        raise RuntimeError(operation.get("err") or f"Operation {operation_id} is {operation.get('status')}")
+    return {"operation_id": operation_id}
+
+
+HANDLERS: dict[str, JobHandler] = {
+    "create_server": create_server,
+}
@@ -2,8 +2,22 @@
 
 All models must be re-exported in this module, to make them available to the
 Alembic migrations generator.
-
-Currently database is not used, so this module is empty.
 """
+from .job import JobModel, JobStatus
+from .lease import LeaseModel
+from .rate_limit import RateLimitBucketModel, RateLimitSlotModel
+from .revoked_token import RevokedTokenModel
+from .server import ServerModel
+from .user import UserModel, UserPermissionGroupModel
 
-# __all__ = []
+__all__ = [
+    "JobModel",
+    "JobStatus",
+    "LeaseModel",
+    "RateLimitBucketModel",
+    "RateLimitSlotModel",
+    "RevokedTokenModel",
+    "ServerModel",
+    "UserModel",
+    "UserPermissionGroupModel",
+]
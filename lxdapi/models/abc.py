@@ -2,17 +2,62 @@
 from __future__ import annotations
 
 import typing as t
+from dataclasses import dataclass
 
 from pydantic import BaseModel
-from sqlalchemy import Column, select
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    Row,
+    and_,
+    delete,
+    event,
+    insert,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, class_mapper, make_transient_to_detached
+from sqlalchemy.orm.attributes import instance_state, set_committed_value
+from sqlalchemy.orm.interfaces import ORMOption
 
 from ..core.database import Base
+from ..core.exceptions.common import InvalidCursorException
+from ..utils.cache import TTLCache
+from ..utils.pagination import decode_cursor, encode_cursor
 
 # БОЛЬШЕ ДЖЕНЕРИКОВ БОГУ ДЖЕНЕРИКОВ
 T = t.TypeVar("T", bound="AbstractModel")
 
 
+@dataclass
+class Page(t.Generic[T]):
+    """Page of models returned by keyset pagination."""
+
+    items: t.Sequence[T]
+    # Cursor of the next page, None if this is the last page
+    next_cursor: str | None
+
+
+def _invalidate_on_commit(db: AsyncSession, invalidate: t.Callable[[], None]) -> None:
+    """Remove cached values again when the transaction of the session ends.
+
+    Values removed on change can be cached again by other sessions, from the
+    committed row, until the change is committed.
+    """
+    db.sync_session.info.setdefault("invalidate_on_commit", []).append(invalidate)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_committed(session: Session) -> None:
+    """Remove cached values changed in the transaction."""
+    for invalidate in session.info.pop("invalidate_on_commit", ()):
+        invalidate()
+
+
 class AbstractModel(Base):
     """Base database model.
 
@@ -20,12 +65,33 @@ class AbstractModel(Base):
     for all the models.
 
     Models with one primary key are supported.
+
+    Query helpers accept loader `options`, like `selectinload(UserModel.servers)`,
+    `raiseload("*")` or `load_only(ServerModel.id, ServerModel.name)`.
+    Relationships are declared with `lazy="raise_on_sql"`, so a relationship
+    that wasn't loaded by an option raises instead of emitting a query per model.
+
+    Models can set `cache` to cache column values by primary key and by
+    `cache_keys` columns for `get`, `get_by_key` and `get_by_keys`. Entries
+    are invalidated by `save`, `update` and `remove` of this process, and
+    all entries by bulk helpers, so the TTL should be short: changes made by
+    other processes are visible only after it. Cached values are shared, so
+    models with mutable column values (e.g. JSON) shouldn't be cached.
+    Loaded collections listed in `cache_relationships` are cached with the
+    model.
     """
 
     # https://docs.sqlalchemy.org/en/20/changelog/migration_20.html#migration-to-2-0-step-six-add-allow-unmapped-to-explicitly-typed-orm-models
     __allow_unmapped__ = True
     __abstract__ = True
 
+    # Read-through cache of column values, disabled if None
+    cache: t.ClassVar[TTLCache[tuple[str, t.Any], t.Any] | None] = None
+    # Unique columns, besides the primary key, to cache lookups by
+    cache_keys: t.ClassVar[tuple[str, ...]] = ()
+    # Collections of related models to cache with the model
+    cache_relationships: t.ClassVar[tuple[str, ...]] = ()
+
     def __repr__(self) -> str:
         """Return the representation of the model."""
         return f"<{self.__class__.__name__} {self.get_primary_key()}={self.get_primary_key_value(self)}>"
@@ -73,10 +139,110 @@ class AbstractModel(Base):
         return getattr(model, cls.get_primary_key())
 
     @classmethod
-    async def get(cls: t.Type[T], db: AsyncSession, primary_key: t.Any) -> T | None:
-        """Get a model by primary key."""
-        query = select(cls).filter_by(**{cls.get_primary_key(): primary_key})
-        return (await db.execute(query)).scalars().first()
+    async def get(
+        cls: t.Type[T], db: AsyncSession, primary_key: t.Any, *, options: t.Sequence[ORMOption] = ()
+    ) -> T | None:
+        """Get a model by primary key.
+
+        A model already in the session is returned without a query, then the
+        model cache is checked, if enabled and no options are given.
+        """
+        if cls.cache is None or options or db.identity_key(cls, primary_key) in db.identity_map:
+            return await db.get(cls, primary_key, options=options)
+        values = cls.cache.get((cls.get_primary_key(), primary_key))
+        if values is not None:
+            cached = cls._from_cache(values)
+            db.add(cached)
+            return cached
+        model = await db.get(cls, primary_key)
+        if model is not None:
+            model._cache()
+        return model
+
+    @classmethod
+    async def _get_one(
+        cls: t.Type[T], db: AsyncSession, name: str, value: t.Any, options: t.Sequence[ORMOption]
+    ) -> T | None:
+        """Get a model by primary key or a cached key, using the cache."""
+        if name == cls.get_primary_key():
+            return await cls.get(db, value, options=options)
+        if options:
+            return (await db.execute(select(cls).filter_by(**{name: value}).options(*options))).scalars().first()
+        if cls.cache is not None:
+            primary_key = cls.cache.get((name, value))
+            if primary_key is not None:
+                model = await cls.get(db, primary_key)
+                if model is not None and getattr(model, name) == value:
+                    return model
+        model = (await db.execute(select(cls).filter_by(**{name: value}))).scalars().first()
+        if model is not None:
+            model._cache()
+        return model
+
+    def _cache(self) -> None:
+        """Cache column values of a model loaded from the database."""
+        cache = type(self).cache
+        state = instance_state(self)
+        if cache is None or state.session is None or state.modified or state.expired_attributes:
+            return
+        values = self._cache_values(self)
+        for key in self.cache_relationships:
+            if key in state.unloaded:
+                return
+            values[key] = [self._cache_values(related) for related in getattr(self, key)]
+        primary_key = self.get_primary_key_value(self)
+        cache.set((self.get_primary_key(), primary_key), values)
+        for key in self.cache_keys:
+            cache.set((key, getattr(self, key)), primary_key)
+
+    @staticmethod
+    def _cache_values(model: AbstractModel) -> dict[str, t.Any]:
+        """Return column values of a model by attribute name."""
+        return {column.key: getattr(model, column.key) for column in instance_state(model).mapper.column_attrs}
+
+    @classmethod
+    def _from_cache(cls: t.Type[T], values: dict[str, t.Any]) -> T:
+        """Create a detached model from cached values, as if it was loaded from the database."""
+        mapper = class_mapper(cls)
+        model: T = mapper.class_manager.new_instance()
+        for key, value in values.items():
+            if key in mapper.relationships:
+                related = mapper.relationships[key].mapper.class_
+                value = [related._from_cache(related_values) for related_values in value]
+            set_committed_value(model, key, value)  # type: ignore[no-untyped-call]
+        make_transient_to_detached(model)
+        return model
+
+    def _invalidate_cache(self) -> t.Callable[[], None]:
+        """Remove cached values of a model, including its previous keys.
+
+        Returns:
+            Callable: Removes the same values again. Until the transaction is
+                committed, other sessions can cache the previous values.
+        """
+        cache = type(self).cache
+        if cache is None:
+            return lambda: None
+        state = instance_state(self)
+        keys = [(self.get_primary_key(), self.get_primary_key_value(self))]
+        for key in self.cache_keys:
+            history = state.attrs[key].history
+            keys.extend((key, value) for value in (*history.deleted, *history.unchanged, *history.added))
+
+        pop = cache.pop
+
+        def invalidate() -> None:
+            for key in keys:
+                pop(key)
+
+        invalidate()
+        return invalidate
+
+    @classmethod
+    def _clear_cache(cls) -> None:
+        """Remove all cached values of the model."""
+        if cls.cache is not None:
+            cls.cache.clear()
 
     @staticmethod
     def _get_column(model: t.Type[T], column: Column[t.Any]) -> str:
@@ -87,33 +253,219 @@ class AbstractModel(Base):
         return name
 
     @classmethod
-    async def get_by_key(cls: t.Type[T], db: AsyncSession, key: Column[t.Any], value: t.Any) -> T | None:
+    async def get_by_key(
+        cls: t.Type[T],
+        db: AsyncSession,
+        key: Column[t.Any],
+        value: t.Any,
+        *,
+        options: t.Sequence[ORMOption] = (),
+    ) -> T | None:
         """Get a model by a key."""
-        query = select(cls).filter_by(**{cls._get_column(cls, key): value})
+        name = cls._get_column(cls, key)
+        if name == cls.get_primary_key() or name in cls.cache_keys:
+            return await cls._get_one(db, name, value, options)
+        query = select(cls).filter_by(**{name: value}).options(*options)
         return (await db.execute(query)).scalars().first()
 
     @classmethod
     async def get_list_by_key(
-        cls: t.Type[T], db: AsyncSession, key: Column[t.Any], value: t.Any, limit: int = 10, offset: int = 0
+        cls: t.Type[T],
+        db: AsyncSession,
+        key: Column[t.Any],
+        value: t.Any,
+        limit: int = 10,
+        offset: int = 0,
+        *,
+        options: t.Sequence[ORMOption] = (),
     ) -> t.Sequence[T]:
         """Get a list of models by a key."""
         query = select(cls).filter_by(**{cls._get_column(cls, key): value}).offset(offset).limit(limit)
-        return (await db.execute(query)).scalars().all()
+        return (await db.execute(query.options(*options))).scalars().all()
 
     @classmethod
-    async def get_by_keys(cls: t.Type[T], db: AsyncSession, /, **kwargs: t.Any) -> T | None:
+    async def get_by_keys(
+        cls: t.Type[T], db: AsyncSession, /, *, options: t.Sequence[ORMOption] = (), **kwargs: t.Any
+    ) -> T | None:
         """Get a model by multiple keys."""
-        query = select(cls).filter_by(**kwargs)
+        if len(kwargs) == 1:
+            [(name, value)] = kwargs.items()
+            if name == cls.get_primary_key() or name in cls.cache_keys:
+                return await cls._get_one(db, name, value, options)
+        query = select(cls).filter_by(**kwargs).options(*options)
         return (await db.execute(query)).scalars().first()
 
     @classmethod
     async def get_list_by_keys(
-        cls: t.Type[T], db: AsyncSession, *, limit: int = 0, offset: int = 0, **kwargs: t.Any
+        cls: t.Type[T],
+        db: AsyncSession,
+        *,
+        limit: int | None = None,
+        offset: int = 0,
+        options: t.Sequence[ORMOption] = (),
+        **kwargs: t.Any,
     ) -> t.Sequence[T]:
-        """Get a list of models by multiple keys."""
-        query = select(cls).filter_by(**kwargs).offset(offset).limit(limit)
+        """Get a list of models by multiple keys, all of them if limit is not set."""
+        query = select(cls).filter_by(**kwargs).offset(offset).limit(limit).options(*options)
         return (await db.execute(query)).scalars().all()
 
+    @classmethod
+    async def get_page(
+        cls: t.Type[T],
+        db: AsyncSession,
+        /,
+        *,
+        limit: int = 10,
+        cursor: str | None = None,
+        order_by: Column[t.Any] | None = None,
+        options: t.Sequence[ORMOption] = (),
+        **kwargs: t.Any,
+    ) -> Page[T]:
+        """Get a page of models by multiple keys, using keyset pagination.
+
+        Unlike offset pagination, fetching a page costs the same no matter how
+        deep it is, as long as `order_by` is indexed. Models are ordered by
+        `order_by` and then by primary key, so the order is stable.
+
+        Example:
+        ```
+            page = await ServerModel.get_page(db, limit=100, user_id=1)
+            page = await ServerModel.get_page(db, limit=100, cursor=page.next_cursor, user_id=1)
+        ```
+
+        Args:
+            db: Database session.
+            limit: Page size.
+            cursor: `next_cursor` of the previous page, first page if not set.
+            order_by: Column to order by, primary key if not set. Its values
+                must be JSON-serializable, as they are stored in cursors.
+            options: Loader options.
+            kwargs: Keys to filter by, must be the same for every page.
+
+        Raises:
+            ValueError: If limit is not positive.
+            InvalidCursorException: If cursor is malformed.
+        """
+        if limit < 1:
+            raise ValueError("Page limit must be positive")
+        primary_key = getattr(cls, cls.get_primary_key())
+        columns = [primary_key]
+        if order_by is not None and cls._get_column(cls, order_by) != cls.get_primary_key():
+            columns.insert(0, getattr(cls, order_by.name))
+
+        query = select(cls).filter_by(**kwargs).order_by(*columns).limit(limit + 1).options(*options)
+        if cursor is not None:
+            position = decode_cursor(cursor)
+            if not isinstance(position, list) or len(position) != len(columns):
+                raise InvalidCursorException()
+            # (a, b) > (x, y), without row values which not all databases support
+            condition = columns[-1] > position[-1]
+            for column, value in zip(columns[-2::-1], position[-2::-1]):
+                condition = or_(column > value, and_(column == value, condition))
+            query = query.where(condition)
+
+        items = (await db.execute(query)).scalars().all()
+        if len(items) <= limit:
+            return Page(items=items, next_cursor=None)
+        items = items[:limit]
+        return Page(items=items, next_cursor=encode_cursor([getattr(items[-1], c.name) for c in columns]))
+
+    @classmethod
+    async def iter_pages(
+        cls: t.Type[T],
+        db: AsyncSession,
+        /,
+        *,
+        page_size: int = 100,
+        order_by: Column[t.Any] | None = None,
+        options: t.Sequence[ORMOption] = (),
+        **kwargs: t.Any,
+    ) -> t.AsyncIterator[t.Sequence[T]]:
+        """Iterate over all models by multiple keys in pages of `page_size`.
+
+        Only one page is loaded at a time, see `get_page`.
+
+        Example:
+        ```
+            async for servers in ServerModel.iter_pages(db, page_size=500, is_deleted=False):
+                ...
+        ```
+        """
+        cursor = None
+        while True:
+            page = await cls.get_page(db, limit=page_size, cursor=cursor, order_by=order_by, options=options, **kwargs)
+            if page.items:
+                yield page.items
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    @classmethod
+    async def stream(
+        cls: t.Type[T],
+        db: AsyncSession,
+        /,
+        *criteria: ColumnElement[bool],
+        yield_per: int = 1000,
+        options: t.Sequence[ORMOption] = (),
+        **kwargs: t.Any,
+    ) -> t.AsyncIterator[T]:
+        """Iterate over models matching criteria and keys, fetching `yield_per` rows at a time.
+
+        Rows are read from a server-side cursor, so the whole result is never
+        in memory. Models that are not referenced anymore are released by the
+        session, unless they are modified.
+
+        Example:
+        ```
+            async for server in ServerModel.stream(db, ServerModel.cpu > 1, is_deleted=False):
+                ...
+        ```
+        """
+        query = select(cls).where(*criteria).filter_by(**kwargs).options(*options)
+        query = query.execution_options(yield_per=yield_per)
+        result = await db.stream(query)
+        try:
+            async for model in result.scalars():
+                yield model
+        finally:
+            await result.close()
+
+    @classmethod
+    async def stream_columns(
+        cls: t.Type[T],
+        db: AsyncSession,
+        columns: t.Sequence[Column[t.Any]],
+        /,
+        *criteria: ColumnElement[bool],
+        yield_per: int = 1000,
+        **kwargs: t.Any,
+    ) -> t.AsyncIterator[Row[t.Any]]:
+        """Iterate over columns of rows matching criteria and keys, fetching `yield_per` rows at a time.
+
+        Same as `stream`, but returns plain rows with only the given columns,
+        without the cost of creating models and tracking them in the session.
+
+        Example:
+        ```
+            async for row in ServerModel.stream_columns(db, [ServerModel.id, ServerModel.name]):
+                print(row.id, row.name)
+        ```
+        """
+        names = [cls._get_column(cls, column) for column in columns]
+        query = (
+            select(*(getattr(cls, name) for name in names))
+            .where(*criteria)
+            .filter_by(**kwargs)
+            .execution_options(yield_per=yield_per)
+        )
+        result = await db.stream(query)
+        try:
+            async for row in result:
+                yield row
+        finally:
+            await result.close()
+
     @classmethod
     async def create(cls: t.Type[T], db: AsyncSession, **kwargs: t.Any) -> T:
         """Create a new model."""
@@ -123,18 +475,134 @@ class AbstractModel(Base):
 
     @classmethod
     async def remove_by_primary(cls: t.Type[T], db: AsyncSession, primary_key: t.Any) -> None:
-        """Remove a model by primary key."""
+        """Remove a model by primary key.
+
+        Unlike `delete_where`, relationship cascades are applied.
+        """
         model = await cls.get(db, primary_key)
         if model:
             await model.remove(db)
 
+    @classmethod
+    async def bulk_create(cls: t.Type[T], db: AsyncSession, rows: t.Sequence[dict[str, t.Any]]) -> t.Sequence[T]:
+        """Create models from rows in a single INSERT statement.
+
+        Example:
+        ```
+            servers = await ServerModel.bulk_create(db, [{"name": "a", ...}, {"name": "b", ...}])
+        ```
+
+        Returns:
+            Sequence[T]: Created models.
+        """
+        if not rows:
+            return []
+        cls._clear_cache()
+        _invalidate_on_commit(db, cls._clear_cache)
+        return (await db.scalars(insert(cls).values(rows).returning(cls))).all()
+
+    @classmethod
+    async def bulk_upsert(
+        cls: t.Type[T],
+        db: AsyncSession,
+        rows: t.Sequence[dict[str, t.Any]],
+        index_elements: t.Sequence[str] | None = None,
+        update_columns: t.Sequence[str] | None = None,
+    ) -> t.Sequence[T]:
+        """Insert rows, updating existing ones, in a single `INSERT ... ON CONFLICT` statement.
+
+        Supported on PostgreSQL and SQLite. All rows must have the same keys.
+
+        Args:
+            db: Database session.
+            rows: Column values.
+            index_elements: Columns of the unique index to detect conflicts on,
+                the primary key if not set.
+            update_columns: Columns to update on conflict, all columns of rows
+                except `index_elements` if not set. If empty, conflicting rows are
+                left untouched.
+
+        Raises:
+            NotImplementedError: If the database doesn't support the statement.
+
+        Returns:
+            Sequence[T]: Inserted and updated models. Skipped rows are not returned.
+        """
+        if not rows:
+            return []
+        cls._clear_cache()
+        _invalidate_on_commit(db, cls._clear_cache)
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            query = postgresql.insert(cls).values(rows)  # type: ignore[no-untyped-call]
+        elif dialect == "sqlite":
+            query = sqlite.insert(cls).values(rows)  # type: ignore[no-untyped-call]
+        else:
+            raise NotImplementedError(f"Upsert is not supported for {dialect}")
+        index_elements = index_elements or [cls.get_primary_key()]
+        if update_columns is None:
+            update_columns = [column for column in rows[0] if column not in index_elements]
+        if update_columns:
+            query = query.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={column: query.excluded[column] for column in update_columns},
+            )
+        else:
+            query = query.on_conflict_do_nothing(index_elements=index_elements)
+        # Models already in the session must be refreshed with the returned rows
+        statement = select(cls).from_statement(query.returning(cls)).execution_options(populate_existing=True)
+        return (await db.scalars(statement)).all()
+
+    @classmethod
+    async def bulk_update_by_pk(cls: t.Type[T], db: AsyncSession, rows: t.Sequence[dict[str, t.Any]]) -> None:
+        """Update rows by primary key, which must be in every row.
+
+        Rows are sent as a batch of one UPDATE statement. RETURNING isn't
+        available for this kind of statement, and models already in the session
+        are not refreshed.
+        """
+        if rows:
+            cls._clear_cache()
+            _invalidate_on_commit(db, cls._clear_cache)
+            await db.execute(update(cls), rows)
+
+    @classmethod
+    async def delete_where(
+        cls: t.Type[T], db: AsyncSession, /, *criteria: ColumnElement[bool], **kwargs: t.Any
+    ) -> t.Sequence[t.Any]:
+        """Delete models matching criteria and keys in a single DELETE statement.
+
+        Relationship cascades are not applied, only `ON DELETE` of foreign keys,
+        use `remove` for models with dependent rows.
+
+        Example:
+        ```
+            await ServerModel.delete_where(db, ServerModel.is_deleted == True, user_id=1)
+        ```
+
+        Returns:
+            Sequence[Any]: Primary keys of deleted models.
+        """
+        cls._clear_cache()
+        _invalidate_on_commit(db, cls._clear_cache)
+        primary_key = getattr(cls, cls.get_primary_key())
+        query = delete(cls).where(*criteria).filter_by(**kwargs)
+        if db.get_bind().dialect.delete_returning:
+            return (await db.scalars(query.returning(primary_key))).all()
+        # Without RETURNING, find the keys first
+        keys = (await db.scalars(select(primary_key).where(*criteria).filter_by(**kwargs))).all()
+        await db.execute(query)
+        return keys
+
     async def remove(self, db: AsyncSession) -> None:
         """Remove the model."""
+        _invalidate_on_commit(db, self._invalidate_cache())
         await db.delete(self)
         await db.flush()
 
     async def save(self, db: AsyncSession) -> None:
         """Save the model."""
+        _invalidate_on_commit(db, self._invalidate_cache())
         db.add(self)
         await db.flush()
 
@@ -0,0 +1,253 @@
+"""Background job model."""
+
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from random import uniform
+from typing import Any, Sequence
+
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .abc import AbstractModel
+from .rate_limit import RateLimitSlotModel
+
+
+class JobStatus(str, Enum):
+    """Background job status."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    # Failed `max_attempts` times or has no handler, won't be retried
+    DEAD = "dead"
+
+
+def _now() -> datetime:
+    """Return current UTC time."""
+    return datetime.now(timezone.utc)
+
+
+class JobModel(AbstractModel):
+    """Durable background job, consumed by the worker.
+
+    Jobs are dequeued by priority, higher first, and then by the time they
+    became runnable. A dequeued job is locked until `locked_until`, which its
+    worker renews while the job runs: if the worker dies, the job is dequeued
+    again after that. Failed jobs are retried with exponential backoff until
+    `max_attempts` is reached, then they are moved to the dead-letter `DEAD`
+    status, as are jobs whose worker died on the last attempt.
+
+    A job can hold a rate limit slot of the client that queued it, see
+    `OperationSlot.hand_over`. The slot is released in the transaction that
+    marks the job succeeded or dead.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_dequeue", "status", "priority", "run_at"),)
+
+    id: int = Column("id", Integer, primary_key=True)
+    kind: str = Column("kind", String(255), nullable=False)
+    payload: dict[str, Any] = Column("payload", JSON, nullable=False, default=dict)
+    status: str = Column("status", String(16), nullable=False, default=JobStatus.PENDING.value)
+    priority: int = Column("priority", Integer, nullable=False, default=0)
+    attempts: int = Column("attempts", Integer, nullable=False, default=0)
+    max_attempts: int = Column("max_attempts", Integer, nullable=False, default=5)
+    run_at: datetime = Column("run_at", DateTime(timezone=True), nullable=False, default=_now)
+    locked_by: str | None = Column("locked_by", String(255), nullable=True)
+    locked_until: datetime | None = Column("locked_until", DateTime(timezone=True), nullable=True)
+    last_error: str | None = Column("last_error", Text, nullable=True)
+    result: Any = Column("result", JSON, nullable=True)
+    slot_key: str | None = Column("slot_key", String(255), nullable=True)
+    slot_owner: str | None = Column("slot_owner", String(32), nullable=True)
+    created_at: datetime = Column("created_at", DateTime(timezone=True), nullable=False, default=_now)
+    updated_at: datetime = Column("updated_at", DateTime(timezone=True), nullable=False, default=_now, onupdate=_now)
+
+    @classmethod
+    async def enqueue(
+        cls,
+        db: AsyncSession,
+        kind: str,
+        payload: dict[str, Any],
+        priority: int = 0,
+        max_attempts: int = 5,
+        delay: float = 0,
+        slot_key: str | None = None,
+        slot_owner: str | None = None,
+    ) -> "JobModel":
+        """Add job to the queue. Caller must commit the transaction.
+
+        Args:
+            db: Database session.
+            kind: Name of the worker handler.
+            payload: JSON-serializable handler arguments.
+            priority: Jobs with higher priority are dequeued first.
+            max_attempts: Number of attempts before the job is dead.
+            delay: Seconds before the job can be dequeued.
+            slot_key: Key of the rate limit slot held until the job is done.
+            slot_owner: Owner ID of the slot.
+        """
+        return await cls.create(
+            db,
+            kind=kind,
+            payload=payload,
+            priority=priority,
+            max_attempts=max_attempts,
+            run_at=_now() + timedelta(seconds=delay),
+            slot_key=slot_key,
+            slot_owner=slot_owner,
+        )
+
+    @classmethod
+    async def dequeue(cls, db: AsyncSession, owner: str, limit: int, lock_for: float) -> Sequence["JobModel"]:
+        """Lock a batch of runnable jobs for a worker. Caller must commit the transaction.
+
+        On PostgreSQL candidates are selected with `FOR UPDATE SKIP LOCKED`,
+        so concurrent workers get different jobs without waiting for each
+        other. The update repeats the runnable condition, so a job is never
+        handed to two workers on databases without row locks either.
+
+        Args:
+            db: Database session.
+            owner: Worker ID.
+            limit: Maximum number of jobs.
+            lock_for: Seconds before the job can be dequeued again by another worker.
+
+        Returns:
+            Sequence[JobModel]: Locked jobs, highest priority first.
+        """
+        now = _now()
+        abandoned = (cls.status == JobStatus.RUNNING.value) & (cls.locked_until <= now)
+        # A job crashing its worker every time would otherwise be run forever
+        dead = await db.execute(
+            update(cls)
+            .where(abandoned, cls.attempts >= cls.max_attempts)
+            .values(
+                status=JobStatus.DEAD.value,
+                last_error="Worker stopped while running the last attempt",
+                locked_by=None,
+                locked_until=None,
+                updated_at=now,
+            )
+            .returning(cls.slot_key, cls.slot_owner)
+            .execution_options(synchronize_session=False)
+        )
+        for slot_key, slot_owner in dead.all():
+            if slot_key is not None and slot_owner is not None:
+                await RateLimitSlotModel.release(db, slot_key, slot_owner)
+        runnable = or_(
+            (cls.status == JobStatus.PENDING.value) & (cls.run_at <= now),
+            # Job of a worker that died
+            abandoned & (cls.attempts < cls.max_attempts),
+        )
+        candidates = (
+            select(cls.id)
+            .where(runnable)
+            .order_by(cls.priority.desc(), cls.run_at, cls.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        query = (
+            update(cls)
+            .where(cls.id.in_(candidates), runnable)
+            .values(
+                status=JobStatus.RUNNING.value,
+                locked_by=owner,
+                locked_until=now + timedelta(seconds=lock_for),
+                attempts=cls.attempts + 1,
+                updated_at=now,
+            )
+            .returning(cls)
+        )
+        # Jobs already in the session must be refreshed with the returned rows
+        statement = select(cls).from_statement(query).execution_options(populate_existing=True)
+        jobs = (await db.scalars(statement)).all()
+        return sorted(jobs, key=lambda job: (-job.priority, job.id))
+
+    async def renew_lock(self, db: AsyncSession, lock_for: float) -> bool:
+        """Extend lock of a running job. Caller must commit the transaction.
+
+        Returns:
+            bool: False if the job lock was lost to another worker.
+        """
+        now = _now()
+        query = (
+            update(type(self))
+            .where(
+                type(self).id == self.id,
+                type(self).locked_by == self.locked_by,
+                type(self).attempts == self.attempts,
+            )
+            .values(locked_until=now + timedelta(seconds=lock_for))
+            .execution_options(synchronize_session=False)
+        )
+        return (await db.execute(query)).rowcount == 1  # type: ignore[attr-defined]
+
+    async def complete(self, db: AsyncSession, result: Any = None) -> bool:
+        """Mark job as succeeded. Caller must commit the transaction.
+
+        Returns:
+            bool: False if the job lock was lost to another worker.
+        """
+        return await self._finish(db, status=JobStatus.SUCCEEDED.value, result=result)
+
+    async def fail(self, db: AsyncSession, error: str, backoff: float, max_backoff: float, retry: bool = True) -> bool:
+        """Schedule retry of a failed job, or mark it dead. Caller must commit the transaction.
+
+        Args:
+            db: Database session.
+            error: Error description.
+            backoff: Delay before the first retry in seconds, doubled on every attempt.
+            max_backoff: Maximum delay before a retry in seconds.
+            retry: Set to False to mark job dead right away, e.g. for a permanent error.
+
+        Returns:
+            bool: False if the job lock was lost to another worker.
+        """
+        if not retry or self.attempts >= self.max_attempts:
+            return await self._finish(db, status=JobStatus.DEAD.value, last_error=error)
+        delay = min(backoff * 2 ** (self.attempts - 1), max_backoff)
+        # Jitter, so jobs failed together are not retried together
+        delay = uniform(delay / 2, delay)
+        return await self._finish(
+            db, status=JobStatus.PENDING.value, last_error=error, run_at=_now() + timedelta(seconds=delay)
+        )
+
+    async def requeue(self, db: AsyncSession) -> None:
+        """Move dead job back to the queue with a fresh attempts budget. Caller must commit the transaction."""
+        await self.update(db, status=JobStatus.PENDING.value, attempts=0, run_at=_now())
+
+    async def _finish(self, db: AsyncSession, **values: Any) -> bool:
+        """Update and unlock job, if it is still locked by the same worker and attempt."""
+        values.update(locked_by=None, locked_until=None, updated_at=_now())
+        query = (
+            update(type(self))
+            .where(
+                type(self).id == self.id,
+                type(self).locked_by == self.locked_by,
+                type(self).attempts == self.attempts,
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if (await db.execute(query)).rowcount != 1:  # type: ignore[attr-defined]
+            return False
+        for key, value in values.items():
+            # The row is updated already, don't mark the model as modified
+            set_committed_value(self, key, value)  # type: ignore[no-untyped-call]
+        done = self.status in (JobStatus.SUCCEEDED.value, JobStatus.DEAD.value)
+        if done and self.slot_key is not None and self.slot_owner is not None:
+            await RateLimitSlotModel.release(db, self.slot_key, self.slot_owner)
+        return True
@@ -0,0 +1,90 @@
+"""Worker lease model."""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import BigInteger, Column, DateTime, String, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .abc import AbstractModel
+
+
+class LeaseModel(AbstractModel):
+    """Lease of a scheduled job, held by one worker at a time.
+
+    A lease is claimed for a run `slot`, the wall-clock timestamp the run is
+    scheduled at, so each slot is run by at most one worker. While a run is in
+    progress its worker renews the lease. A lease of a failed worker expires
+    after its TTL and the next slot can be claimed by any worker.
+
+    Expiration uses the clocks of workers, which must be synchronized.
+    """
+
+    __tablename__ = "worker_leases"
+
+    name: str = Column("name", String(255), primary_key=True)
+    owner: str = Column("owner", String(255), nullable=False)
+    slot: int = Column("slot", BigInteger, nullable=False)
+    expires_at: datetime = Column("expires_at", DateTime(timezone=True), nullable=False)
+
+    @classmethod
+    async def claim(cls, db: AsyncSession, name: str, owner: str, slot: int, ttl: float) -> bool:
+        """Claim lease for a run slot.
+
+        The lease is claimed if it doesn't exist, or if its previous slot is
+        older and it is expired or held by the same owner. Caller must commit
+        the transaction.
+
+        Args:
+            db: Database session.
+            name: Job name.
+            owner: Worker ID.
+            slot: Run slot, must grow with every run.
+            ttl: Lease lifetime in seconds.
+
+        Returns:
+            bool: True if the lease is claimed.
+        """
+        now = datetime.now(timezone.utc)
+        values = {"owner": owner, "slot": slot, "expires_at": now + timedelta(seconds=ttl)}
+        query = (
+            update(cls)
+            .where(cls.name == name, cls.slot < slot, (cls.owner == owner) | (cls.expires_at <= now))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if (await db.execute(query)).rowcount == 1:  # type: ignore[attr-defined]
+            return True
+        try:
+            async with db.begin_nested():
+                await db.execute(insert(cls).values(name=name, **values))
+        except IntegrityError:
+            # Lease exists and is held for this or a newer slot
+            return False
+        return True
+
+    @classmethod
+    async def renew(cls, db: AsyncSession, name: str, owner: str, slot: int, ttl: float) -> bool:
+        """Extend lease held by owner.
+
+        Returns:
+            bool: False if the lease was lost, e.g. expired and claimed by another worker.
+        """
+        query = (
+            update(cls)
+            .where(cls.name == name, cls.owner == owner, cls.slot == slot)
+            .values(expires_at=datetime.now(timezone.utc) + timedelta(seconds=ttl))
+            .execution_options(synchronize_session=False)
+        )
+        return (await db.execute(query)).rowcount == 1  # type: ignore[attr-defined]
+
+    @classmethod
+    async def release(cls, db: AsyncSession, name: str, owner: str, slot: int) -> None:
+        """Expire lease held by owner, so the next slot can be claimed by any worker."""
+        query = (
+            update(cls)
+            .where(cls.name == name, cls.owner == owner, cls.slot == slot)
+            .values(expires_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(query)
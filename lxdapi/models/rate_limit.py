@@ -0,0 +1,139 @@
+"""Rate limit models."""
+
+from time import time
+from uuid import uuid4
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    String,
+    case,
+    delete,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .abc import AbstractModel
+
+
+class RateLimitBucketModel(AbstractModel):
+    """Token bucket shared by all workers.
+
+    The bucket holds up to `burst` tokens and is refilled with `rate` tokens
+    per second. Refill is computed when a token is taken, so only the token
+    count and the time of the last update are stored.
+
+    Time is a Unix timestamp of workers, their clocks must be synchronized.
+    """
+
+    __tablename__ = "rate_limit_buckets"
+
+    key: str = Column("key", String(255), primary_key=True)
+    tokens: float = Column("tokens", Float, nullable=False)  # type: ignore[misc]
+    updated_at: float = Column("updated_at", Float, nullable=False)  # type: ignore[misc]
+
+    @classmethod
+    async def take(cls, db: AsyncSession, key: str, rate: float, burst: float) -> float:
+        """Take a token from bucket, creating a full bucket if it doesn't exist.
+
+        The token is taken by one conditional update, so concurrent workers
+        never take more tokens than the bucket has. Caller must commit the
+        transaction.
+
+        Args:
+            db: Database session.
+            key: Bucket key.
+            rate: Tokens added per second.
+            burst: Bucket capacity.
+
+        Returns:
+            float: 0 if the token is taken, otherwise seconds until it is available.
+        """
+        for _ in range(3):
+            now = time()
+            refilled = cls.tokens + (now - cls.updated_at) * rate
+            available = case((refilled > burst, burst), else_=refilled)
+            query = (
+                update(cls)
+                .where(cls.key == key, available >= 1)
+                .values(tokens=available - 1, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if (await db.execute(query)).rowcount == 1:  # type: ignore[attr-defined]
+                return 0
+            bucket = (await db.execute(select(cls.tokens, cls.updated_at).where(cls.key == key))).first()
+            if bucket is not None:
+                wait = (1 - min(burst, bucket.tokens + (now - bucket.updated_at) * rate)) / rate
+                if wait > 0:
+                    return wait
+                # Refilled since the update
+                continue
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(cls).values(key=key, tokens=burst - 1, updated_at=now))
+            except IntegrityError:
+                # Created by another worker
+                continue
+            return 0
+        return 1 / rate
+
+
+class RateLimitSlotModel(AbstractModel):
+    """Slot of an operation in progress, shared by all workers.
+
+    A key has up to `limit` numbered slots. A slot is held by a random owner
+    ID until it is released, or until it expires if its worker failed.
+    """
+
+    __tablename__ = "rate_limit_slots"
+
+    key: str = Column("key", String(255), primary_key=True)
+    slot: int = Column("slot", Integer, primary_key=True)
+    owner: str = Column("owner", String(32), nullable=False)
+    expires_at: float = Column("expires_at", Float, nullable=False)  # type: ignore[misc]
+
+    @classmethod
+    async def acquire(cls, db: AsyncSession, key: str, limit: int, ttl: float) -> str | None:
+        """Acquire a free or expired slot. Caller must commit the transaction.
+
+        Args:
+            db: Database session.
+            key: Slots key.
+            limit: Number of slots.
+            ttl: Seconds the slot is held for if it is not released.
+
+        Returns:
+            str | None: Owner ID to release the slot with, None if all slots are held.
+        """
+        now = time()
+        owner = uuid4().hex
+        values = {"owner": owner, "expires_at": now + ttl}
+        held = set((await db.scalars(select(cls.slot).where(cls.key == key, cls.expires_at > now))).all())
+        for slot in range(limit):
+            if slot in held:
+                continue
+            query = (
+                update(cls)
+                .where(cls.key == key, cls.slot == slot, cls.expires_at <= now)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if (await db.execute(query)).rowcount == 1:  # type: ignore[attr-defined]
+                return owner
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(cls).values(key=key, slot=slot, **values))
+            except IntegrityError:
+                # Acquired by another worker
+                continue
+            return owner
+        return None
+
+    @classmethod
+    async def release(cls, db: AsyncSession, key: str, owner: str) -> None:
+        """Release slot held by owner. Caller must commit the transaction."""
+        await db.execute(delete(cls).where(cls.key == key, cls.owner == owner))
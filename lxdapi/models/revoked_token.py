@@ -0,0 +1,39 @@
+"""Revoked token model."""
+
+from datetime import datetime, timezone
+from typing import Sequence
+
+from sqlalchemy import Column, DateTime, String, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .abc import AbstractModel
+
+
+class RevokedTokenModel(AbstractModel):
+    """JWT revoked before it expires, identified by its `jti` claim.
+
+    Rows are needed only until the token expires, after that they are
+    removed by `remove_expired`.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    jti: str = Column("jti", String(255), primary_key=True)
+    expires_at: datetime = Column("expires_at", DateTime(timezone=True), nullable=False, index=True)
+
+    @classmethod
+    async def revoke(cls, db: AsyncSession, jti: str, expires_at: datetime) -> None:
+        """Revoke token. Caller must commit the transaction."""
+        if await cls.get(db, jti) is None:
+            await cls.create(db, jti=jti, expires_at=expires_at)
+
+    @classmethod
+    async def get_active(cls, db: AsyncSession) -> Sequence[str]:
+        """Return `jti` of revoked tokens which are not expired yet."""
+        query = select(cls.jti).where(cls.expires_at > datetime.now(timezone.utc))
+        return (await db.scalars(query)).all()
+
+    @classmethod
+    async def remove_expired(cls, db: AsyncSession) -> None:
+        """Remove rows of expired tokens. Caller must commit the transaction."""
+        await db.execute(delete(cls).where(cls.expires_at <= datetime.now(timezone.utc)))
@@ -2,7 +2,16 @@
 
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    false,
+)
 from sqlalchemy.orm import relationship
 
 from .abc import AbstractModel
@@ -18,7 +27,7 @@ class ServerModel(AbstractModel):
 
     id: int = Column("id", Integer, primary_key=True)
     user_id: int = Column("user_id", Integer, ForeignKey("users.id"))
-    user: "UserModel" = relationship("UserModel", back_populates="servers", lazy="joined")
+    user: "UserModel" = relationship("UserModel", back_populates="servers", lazy="raise_on_sql")
     name: str = Column("name", String(255), nullable=False)
     cpu: float = Column("cpu", Float, nullable=False)
     memory: int = Column("memory", Integer, nullable=False)
@@ -27,3 +36,16 @@ class ServerModel(AbstractModel):
     ip: str = Column("ip", String(255), nullable=False)
     is_deleted: bool = Column("is_deleted", Boolean, nullable=False, default=False)
     is_active: bool = Column("is_active", Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        Index("ix_servers_user_id", "user_id"),
+        # Only non-deleted servers are looked up by name. Queries must compare
+        # `is_deleted == false()` literally, not by a bound parameter, for the
+        # partial index to be used.
+        Index(
+            "ix_servers_active_name",
+            "name",
+            postgresql_where=is_deleted == false(),
+            sqlite_where=is_deleted == false(),
+        ),
+    )
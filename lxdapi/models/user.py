@@ -1,35 +1,116 @@
 """User model."""
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Iterable, Sequence
 
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    select,
+    true,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import relationship
 
+from ..core.security import principals
+from ..utils.cache import TTLCache
 from .abc import AbstractModel
 
 if TYPE_CHECKING:
     from .server import ServerModel
 
+# Groups of a user created without explicit groups
+DEFAULT_PERMISSION_GROUPS = ("user",)
+
+
+class UserPermissionGroupModel(AbstractModel):
+    """Membership of a user in a permission group."""
+
+    __tablename__ = "user_permission_groups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_user_permission_groups_user_id_name"),
+        # Members of a group
+        Index("ix_user_permission_groups_name", "name"),
+    )
+
+    id: int = Column("id", Integer, primary_key=True)
+    user_id: int = Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    name: str = Column("name", String(64), nullable=False)
+
 
 class UserModel(AbstractModel):
     """User model."""
 
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True)
-    email = Column(String(255), unique=True, nullable=False)
-    is_banned = Column(Boolean, default=False, nullable=False)
-    is_admin = Column(Boolean, default=False, nullable=False)
-    servers: list["ServerModel"] = relationship("ServerModel", back_populates="user")
-    _permission_groups: str = Column("permission_groups", String(255), nullable=False, default="user")
+    # Users are looked up on every authenticated request
+    cache: ClassVar[TTLCache[tuple[str, Any], Any]] = TTLCache(maxsize=10000, ttl=5)
+    cache_keys = ("email",)
+    cache_relationships = ("_permission_groups",)
+
+    id: int = Column(Integer, primary_key=True)
+    email: str = Column(String(255), unique=True, nullable=False)
+    is_banned: bool = Column(Boolean, default=False, nullable=False)
+    is_admin: bool = Column(Boolean, default=False, nullable=False)
+    servers: list["ServerModel"] = relationship("ServerModel", back_populates="user", lazy="raise_on_sql")
+    # Loaded with the user, permissions are checked on every request
+    _permission_groups: list[UserPermissionGroupModel] = relationship(
+        "UserPermissionGroupModel", lazy="selectin", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (
+        Index("ix_users_admins", "id", postgresql_where=is_admin == true(), sqlite_where=is_admin == true()),
+    )
+
+    def __init__(self, **kwargs: Any) -> None:
+        """Create user, in the default permission groups if none are given."""
+        kwargs.setdefault("permission_groups", DEFAULT_PERMISSION_GROUPS)
+        super().__init__(**kwargs)
+
+    def _invalidate_cache(self) -> Callable[[], None]:
+        """Remove cached values and the cached principal of the user."""
+        invalidate_values = super()._invalidate_cache()
+        subject = str(self.id)
+
+        def invalidate() -> None:
+            invalidate_values()
+            principals.pop(subject)
+
+        principals.pop(subject)
+        return invalidate
+
+    @classmethod
+    def _clear_cache(cls) -> None:
+        """Remove all cached values and principals."""
+        super()._clear_cache()
+        principals.clear()
 
     @property
-    def permission_groups(self) -> list[str]:
-        """Return the list of permission groups."""
-        return self._permission_groups.split(",")
+    def permission_groups(self) -> set[str]:
+        """Return the set of permission groups."""
+        return {group.name for group in self._permission_groups}
 
     @permission_groups.setter
-    def permission_groups(self, value: list[str]) -> None:
-        """Set the list of permission groups."""
-        value = list(set(value))
-        self._permission_groups = ",".join(value)
+    def permission_groups(self, value: Iterable[str]) -> None:
+        """Set permission groups, memberships in unchanged groups are kept."""
+        groups = set(value)
+        kept = [group for group in self._permission_groups if group.name in groups]
+        added = groups - {group.name for group in kept}
+        self._permission_groups = kept + [UserPermissionGroupModel(name=name) for name in sorted(added)]
+
+    def has_permission_group(self, name: str) -> bool:
+        """Check if the user is in a permission group."""
+        return any(group.name == name for group in self._permission_groups)
+
+    @classmethod
+    async def get_list_by_permission_group(
+        cls, db: AsyncSession, name: str, *, limit: int | None = None
+    ) -> Sequence["UserModel"]:
+        """Get users in a permission group, using the index of group names."""
+        members = select(UserPermissionGroupModel.user_id).where(UserPermissionGroupModel.name == name)
+        query = select(cls).where(cls.id.in_(members)).order_by(cls.id).limit(limit)
+        return (await db.execute(query)).scalars().all()
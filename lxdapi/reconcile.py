@@ -0,0 +1,237 @@
+"""Synchronization of server rows with LXD instances."""
+import logging
+import re
+from asyncio import gather
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import false
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lxdapi.core.lxd import LXDClient
+from lxdapi.core.lxd.events import event_instances
+from lxdapi.core.lxd.instances import get_instance, list_instances
+from lxdapi.models import ServerModel
+
+log = logging.getLogger(__name__)
+
+# Columns of `ServerModel` filled from LXD
+SERVER_COLUMNS = ("cpu", "memory", "disk", "system", "ip", "is_active")
+
+_SIZE_UNITS = {
+    "": 1,
+    "B": 1,
+    "KB": 10**3,
+    "MB": 10**6,
+    "GB": 10**9,
+    "TB": 10**12,
+    "KIB": 2**10,
+    "MIB": 2**20,
+    "GIB": 2**30,
+    "TIB": 2**40,
+}
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*$")
+
+
+def parse_size(value: str | None) -> int:
+    """Parse LXD size, like "10GiB" or "512MB", to bytes.
+
+    Returns:
+        int: Size in bytes, 0 if not set or not absolute (e.g. "50%").
+    """
+    match = _SIZE_RE.match(value or "")
+    if match is None or match.group(2).upper() not in _SIZE_UNITS:
+        return 0
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def parse_cpu(value: str | None) -> float:
+    """Parse LXD `limits.cpu`, a count or a set of pinned CPUs like "0-3,6".
+
+    Returns:
+        float: Number of CPUs, 0 if not limited.
+    """
+    if not value:
+        return 0
+    if value.isdigit():
+        return float(value)
+    count = 0
+    for part in value.split(","):
+        start, _, end = part.partition("-")
+        try:
+            count += int(end or start) - int(start) + 1
+        except ValueError:
+            return 0
+    return float(count)
+
+
+def server_values(document: dict[str, Any]) -> dict[str, Any]:
+    """Return `ServerModel` column values of an instance.
+
+    Memory and disk are stored in MiB.
+
+    Args:
+        document: Instance document with state, like in a recursion level 2 listing.
+    """
+    config = document.get("expanded_config") or document.get("config") or {}
+    devices = document.get("expanded_devices") or document.get("devices") or {}
+    addresses = [
+        address["address"]
+        for name, interface in sorted(((document.get("state") or {}).get("network") or {}).items())
+        if name != "lo"
+        for address in interface.get("addresses", [])
+        if address.get("scope") == "global" and address.get("family") == "inet"
+    ]
+    system = " ".join(filter(None, (config.get("image.os"), config.get("image.release"))))
+    return {
+        "cpu": parse_cpu(config.get("limits.cpu")),
+        "memory": parse_size(config.get("limits.memory")) // 2**20,
+        "disk": parse_size((devices.get("root") or {}).get("size")) // 2**20,
+        "system": system or document.get("architecture", ""),
+        "ip": addresses[0] if addresses else "",
+        "is_active": document.get("status") == "Running",
+    }
+
+
+def _batches(items: Sequence[dict[str, Any]], size: int) -> Iterable[Sequence[dict[str, Any]]]:
+    """Split items into batches of at most `size` items."""
+    return (items[i : i + size] for i in range(0, len(items), size))
+
+
+@dataclass
+class ReconcileStats:
+    """Number of server rows changed by a reconciliation."""
+
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+
+class Reconciler:
+    """Keeps `ServerModel` rows in sync with LXD instances.
+
+    A full sweep fetches all instances with state in one request and compares
+    them with the rows. Between sweeps lifecycle events mark instances dirty,
+    and only those are fetched and compared. If the events stream has been
+    reconnected since the last sweep, events might have been missed and a
+    full sweep is done instead, at most once per `sweep_interval`: while the
+    stream is down, the load of sweeps would grow with the number of
+    instances on every run.
+
+    Only changed rows are written: new instances are inserted, changed ones
+    updated and rows of removed instances are marked deleted, in batches and
+    in a single transaction.
+    """
+
+    project = "default"
+
+    def __init__(self, lxd_client: LXDClient, batch_size: int = 500, sweep_interval: float = 300) -> None:
+        """Initialize reconciler.
+
+        Args:
+            lxd_client: LXD client, its events stream marks instances dirty.
+            batch_size: Maximum number of rows in one INSERT or UPDATE statement.
+            sweep_interval: Minimum seconds between sweeps done instead of syncing dirty instances.
+        """
+        self._client = lxd_client
+        self.batch_size = batch_size
+        self.sweep_interval = sweep_interval
+        self._swept_at: float | None = None
+        self.dirty: set[str] = set()
+        self._epoch: int | None = None
+        lxd_client.events.add_listener(self._on_event)
+
+    async def sweep(self, db: AsyncSession) -> ReconcileStats:
+        """Compare all instances with all server rows and commit the changes."""
+        events = self._client.events
+        # Changes of dirty instances made after this point are in the listing
+        epoch = events.epoch if events.connected else None
+        dirty, self.dirty = self.dirty, set()
+        try:
+            documents = await list_instances(self._client.lxd, recursion=2)
+            stats = await self._apply(db, {document["name"]: server_values(document) for document in documents})
+        except BaseException:
+            self.dirty |= dirty
+            raise
+        self._epoch = epoch
+        self._swept_at = monotonic()
+        log.info("Reconciled all servers: %s", stats)
+        return stats
+
+    async def sync_dirty(self, db: AsyncSession) -> ReconcileStats:
+        """Compare instances changed since the last run with their rows and commit the changes."""
+        events = self._client.events
+        if self._epoch is None or not events.connected or events.epoch != self._epoch:
+            if self._swept_at is not None and monotonic() - self._swept_at < self.sweep_interval:
+                # Events might be missed, the next sweep will cover them
+                return ReconcileStats()
+            return await self.sweep(db)
+        dirty, self.dirty = self.dirty, set()
+        if not dirty:
+            return ReconcileStats()
+        try:
+            names = sorted(dirty)
+            documents = await gather(*(get_instance(self._client.lxd, name) for name in names))
+            desired = {
+                name: None if document is None else server_values(document) for name, document in zip(names, documents)
+            }
+            stats = await self._apply(db, desired, names=dirty)
+        except BaseException:
+            self.dirty |= dirty
+            raise
+        log.debug("Reconciled %s dirty servers: %s", len(dirty), stats)
+        return stats
+
+    async def _apply(
+        self, db: AsyncSession, desired: dict[str, dict[str, Any] | None], names: set[str] | None = None
+    ) -> ReconcileStats:
+        """Write differences between instances and rows.
+
+        Args:
+            db: Database session.
+            desired: Column values by instance name, None for removed instances.
+            names: Compare only rows with these names, all rows if not set. Rows
+                not in `desired` are marked deleted.
+        """
+        columns = [ServerModel.id, ServerModel.name, *(getattr(ServerModel, c) for c in SERVER_COLUMNS)]
+        # Literal comparison, so the partial index of non-deleted servers is used
+        criteria = [ServerModel.is_deleted == false()]
+        if names is not None:
+            criteria.append(ServerModel.name.in_(names))
+        existing = set()
+        updates = []
+        deletes = []
+        # Rows are streamed, only names and changed rows are kept
+        rows = ServerModel.stream_columns(db, columns, *criteria, yield_per=self.batch_size)
+        async for row in rows:
+            existing.add(row.name)
+            values = desired.get(row.name)
+            if values is None:
+                deletes.append({"id": row.id, "is_deleted": True, "is_active": False})
+            elif any(getattr(row, column) != value for column, value in values.items()):
+                updates.append({"id": row.id, **values})
+        inserts = [
+            {"name": name, "is_deleted": False, **values}
+            for name, values in desired.items()
+            if values is not None and name not in existing
+        ]
+
+        for batch in _batches(inserts, self.batch_size):
+            await ServerModel.bulk_create(db, batch)
+        # Statements of a batch must set the same columns
+        for batch in _batches(updates, self.batch_size):
+            await ServerModel.bulk_update_by_pk(db, batch)
+        for batch in _batches(deletes, self.batch_size):
+            await ServerModel.bulk_update_by_pk(db, batch)
+        await db.commit()
+        return ReconcileStats(inserted=len(inserts), updated=len(updates), deleted=len(deletes))
+
+    def _on_event(self, event: dict[str, Any]) -> None:
+        """Mark instances of a lifecycle event dirty."""
+        if event.get("type") != "lifecycle" or event.get("project", self.project) != self.project:
+            return
+        self.dirty |= event_instances(event)
+        old_name = ((event.get("metadata") or {}).get("context") or {}).get("old_name")
+        if old_name:
+            self.dirty.add(old_name)
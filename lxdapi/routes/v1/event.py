@@ -0,0 +1,105 @@
+"""LXD events endpoints."""
+import json
+from asyncio import FIRST_COMPLETED, create_task, wait
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, Query, WebSocket, status
+from fastapi.responses import StreamingResponse
+from starlette.websockets import WebSocketDisconnect
+
+from lxdapi.core.exceptions.handler import ErrorSchema
+from lxdapi.core.exceptions.lxd import LXDException
+from lxdapi.core.lxd import LXDClient, Subscription
+from lxdapi.dependencies.lxd import get_lxd_client
+
+router = APIRouter(tags=["event"], prefix="/events")
+
+# Seconds between SSE comments keeping idle connections open through proxies
+KEEPALIVE_INTERVAL = 15
+
+
+@router.get("", responses={400: {"model": ErrorSchema}, 503: {"model": ErrorSchema}})
+async def stream_events(
+    *,
+    lxd_client: LXDClient = Depends(get_lxd_client),
+    type: list[str] | None = Query(None, description="Event types to receive, all if not set."),
+    instance: list[str] | None = Query(None, description="Instance names to receive events about."),
+) -> StreamingResponse:
+    """Stream LXD events as Server-Sent Events.
+
+    All clients share one upstream subscription. Each client has a bounded
+    queue: if it reads too slowly the oldest events are dropped, and a client
+    that stops reading is disconnected.
+    """
+    # Errors are returned before the response starts, but the subscription is
+    # created by the body: a body that is never iterated, e.g. because the
+    # client disconnected, must not hold a subscription.
+    lxd_client.events.check_subscribe(type)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            subscription = lxd_client.events.subscribe(type, instance)
+        except LXDException:
+            # Subscribers limit reached since the check
+            return
+        try:
+            while not subscription.closed:
+                event = await subscription.get(KEEPALIVE_INTERVAL)
+                if event is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            lxd_client.events.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.websocket("/ws")
+async def websocket_events(
+    websocket: WebSocket,
+    type: list[str] | None = Query(None),
+    instance: list[str] | None = Query(None),
+) -> None:
+    """Stream LXD events as WebSocket text messages.
+
+    Same as the SSE endpoint, each message is one JSON-encoded event.
+    """
+    lxd_client: LXDClient = websocket.app.state.lxd_client
+    try:
+        subscription = lxd_client.events.subscribe(type, instance)
+    except LXDException as e:
+        await websocket.close(
+            code=status.WS_1008_POLICY_VIOLATION if e.status_code < 500 else status.WS_1013_TRY_AGAIN_LATER
+        )
+        return
+    await websocket.accept()
+    try:
+        # The client only sends a close frame, wait for it alongside the events
+        sender = create_task(_send_events(websocket, subscription))
+        receiver = create_task(_wait_disconnect(websocket))
+        done, pending = await wait((sender, receiver), return_when=FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if sender in done and sender.exception() is None:
+            # Subscription was closed: the client is too slow, or we shut down
+            await websocket.close(code=status.WS_1001_GOING_AWAY)
+    finally:
+        lxd_client.events.unsubscribe(subscription)
+
+
+async def _send_events(websocket: WebSocket, subscription: Subscription) -> None:
+    """Send subscription events until it is closed."""
+    while not subscription.closed:
+        event = await subscription.get()
+        if event is not None:
+            await websocket.send_text(json.dumps(event))
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    """Receive messages until the client disconnects."""
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,48 @@
+"""Background job endpoints."""
+from fastapi import APIRouter, Depends, Path
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lxdapi.core.exceptions.common import (
+    JobNotDeadException,
+    JobNotFoundException,
+)
+from lxdapi.core.exceptions.handler import ErrorSchema
+from lxdapi.dependencies.database import get_db
+from lxdapi.models import JobModel, JobStatus
+from lxdapi.schemas.job import JobSchema
+
+router = APIRouter(tags=["job"], prefix="/jobs")
+
+
+async def _get_job(db: AsyncSession, job_id: int) -> JobModel:
+    """Get job by ID.
+
+    Raises:
+        JobNotFoundException: If job doesn't exist.
+    """
+    job = await JobModel.get(db, job_id)
+    if job is None:
+        raise JobNotFoundException()
+    return job
+
+
+@router.get("/{job_id}", response_model=JobSchema, responses={404: {"model": ErrorSchema}})
+async def get_job(*, db: AsyncSession = Depends(get_db), job_id: int = Path(..., ge=1)) -> JobModel:
+    """Get background job status and result."""
+    return await _get_job(db, job_id)
+
+
+@router.post(
+    "/{job_id}/requeue",
+    response_model=JobSchema,
+    responses={404: {"model": ErrorSchema}, 409: {"model": ErrorSchema}},
+)
+async def requeue_job(*, db: AsyncSession = Depends(get_db), job_id: int = Path(..., ge=1)) -> JobModel:
+    """Move a dead job back to the queue."""
+    job = await _get_job(db, job_id)
+    if job.status != JobStatus.DEAD:
+        raise JobNotDeadException()
+    await job.requeue(db)
+    # Commit before responding, so the job is visible to the worker and to the client
+    await db.commit()
+    return job
@@ -0,0 +1,62 @@
+"""Metrics endpoint."""
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from lxdapi.core.config import Config
+from lxdapi.core.database import get_pool_status
+from lxdapi.core.exceptions.handler import ErrorSchema
+from lxdapi.core.lxd import LXDClient
+from lxdapi.dependencies.config import get_config
+from lxdapi.dependencies.lxd import get_lxd_client
+
+router = APIRouter(tags=["metrics"], prefix="/metrics")
+
+
+@router.get("", response_model=dict[str, Any], responses={500: {"model": ErrorSchema}})
+async def metrics(
+    *,
+    config: Config = Depends(get_config),
+    lxd_client: LXDClient = Depends(get_lxd_client),
+) -> dict[str, Any]:
+    """Metrics endpoint.
+
+    Returns runtime statistics of shared resources, like the database
+    connection pool, for monitoring.
+    """
+    return {
+        "database": get_pool_status(config),
+        "lxd": {
+            "ready": lxd_client.is_ready,
+            "events": {
+                "connected": lxd_client.events.connected,
+                "epoch": lxd_client.events.epoch,
+                "received": lxd_client.events.received,
+                "subscribers": lxd_client.events.subscribers,
+                "dropped": lxd_client.events.dropped,
+            },
+            "admission": {
+                "limit": lxd_client.admission.max_concurrency,
+                "in_flight": lxd_client.admission.in_flight,
+                "queued": lxd_client.admission.queued,
+                "admitted": lxd_client.admission.admitted,
+                "rejected": lxd_client.admission.rejected,
+                "timed_out": lxd_client.admission.timed_out,
+            },
+            "reads": {
+                "issued": lxd_client.reads.issued,
+                "coalesced": lxd_client.reads.coalesced,
+                "in_flight": lxd_client.reads.in_flight,
+            },
+            "inventory": {
+                "fresh": lxd_client.inventory.is_fresh,
+                "hits": lxd_client.inventory.hits,
+                "misses": lxd_client.inventory.misses,
+            },
+            "operations": {
+                "cached": lxd_client.operations.size,
+                "waiting": lxd_client.operations.waiting,
+                "fetched": lxd_client.operations.fetched,
+            },
+        },
+    }
@@ -0,0 +1,59 @@
+"""Operation tracking endpoints."""
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, Depends, Path, Query
+from fastapi.responses import StreamingResponse
+
+from lxdapi.core.exceptions.handler import ErrorSchema
+from lxdapi.core.lxd import LXDClient
+from lxdapi.dependencies.lxd import get_lxd_client
+from lxdapi.schemas.operation import OperationSchema
+
+router = APIRouter(tags=["operation"], prefix="/operations")
+
+
+@router.get(
+    "/{operation_id}",
+    response_model=OperationSchema,
+    response_model_by_alias=True,
+    responses={404: {"model": ErrorSchema}},
+)
+async def get_operation(
+    *,
+    lxd_client: LXDClient = Depends(get_lxd_client),
+    operation_id: str = Path(..., min_length=1),
+    wait: float | None = Query(None, ge=0, le=300, description="Wait up to this many seconds for completion."),
+) -> dict[str, Any]:
+    """Get operation.
+
+    Operation state is served from a cache updated by LXD events. With `wait`
+    the request returns as soon as the operation finishes, or with its
+    current state after the timeout.
+    """
+    if wait:
+        return await lxd_client.operations.wait(operation_id, wait)
+    return await lxd_client.operations.get(operation_id)
+
+
+@router.get("/{operation_id}/events", responses={404: {"model": ErrorSchema}})
+async def watch_operation(
+    *,
+    lxd_client: LXDClient = Depends(get_lxd_client),
+    operation_id: str = Path(..., min_length=1),
+    timeout: float = Query(60, gt=0, le=3600, description="Close the stream after this many idle seconds."),
+) -> StreamingResponse:
+    """Stream operation state as Server-Sent Events.
+
+    Sends an `operation` event with the current state and then one on every
+    change, until the operation finishes.
+    """
+    # Fetch before streaming, so unknown operations return 404
+    await lxd_client.operations.get(operation_id)
+
+    async def events() -> AsyncIterator[str]:
+        async for operation in lxd_client.operations.watch(operation_id, timeout):
+            data = OperationSchema(**operation).dict(by_alias=True)
+            yield f"event: operation\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
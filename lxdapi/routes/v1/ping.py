@@ -1,7 +1,10 @@
 """Ping endpoint."""
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
 from lxdapi.core.exceptions.handler import ErrorSchema
+from lxdapi.core.exceptions.lxd import LXDNotReadyException
+from lxdapi.core.lxd import LXDClient
+from lxdapi.dependencies.lxd import get_lxd_client
 
 router = APIRouter(tags=["ping"], prefix="/ping")
 
@@ -14,3 +17,18 @@ async def ping() -> str:
     Used in docker container to set healthly status.
     """
     return "ok"
+
+
+@router.get("/ready", response_model=str, responses={503: {"model": ErrorSchema}})
+async def ready(
+    *,
+    lxd_client: LXDClient = Depends(get_lxd_client),
+) -> str:
+    """Readiness endpoint.
+
+    Returns "ok" once the LXD client is connected and its connection pool
+    is warmed up, 503 before that.
+    """
+    if not lxd_client.is_ready:
+        raise LXDNotReadyException()
+    return "ok"
@@ -1,8 +1,13 @@
 """Version 1 API."""
 from fastapi import APIRouter
 
-from . import ping, server
+from . import event, job, metrics, operation, ping, server, user
 
 router = APIRouter(tags=["v1"])
 router.include_router(ping.router)
+router.include_router(metrics.router)
 router.include_router(server.router)
+router.include_router(operation.router)
+router.include_router(event.router)
+router.include_router(job.router)
+router.include_router(user.router)
@@ -1,64 +1,298 @@
 """Server managment endpoints."""
+import json
+from asyncio import Semaphore, as_completed, create_task, gather, sleep
+from typing import Any, AsyncIterator, Iterable, Iterator
+
 from aiolxd import LXD
-from fastapi import APIRouter, Depends, Path, Query
+from fastapi import APIRouter, Depends, Header, Path, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.status import HTTP_202_ACCEPTED
 
-from lxdapi.dependencies.lxd import get_lxd
+from lxdapi.core.config import Config
+from lxdapi.core.database import get_session_maker
+from lxdapi.core.exceptions.common import InvalidFieldsException
+from lxdapi.core.lxd import LXDClient
+from lxdapi.core.lxd.instances import (
+    change_state,
+    delete_instance,
+    list_instances,
+)
+from lxdapi.core.ratelimit import OperationSlot
+from lxdapi.dependencies.config import get_config
+from lxdapi.dependencies.database import get_db
+from lxdapi.dependencies.lxd import get_lxd, get_lxd_client
+from lxdapi.dependencies.ratelimit import rate_limit
+from lxdapi.models import JobModel, JobStatus
+from lxdapi.schemas.job import JobSchema
+from lxdapi.schemas.server import (
+    INSTANCE_NAME_REGEX,
+    SERVER_FIELDS,
+    BulkAction,
+    BulkActionSchema,
+    BulkResultSchema,
+    ServerSchema,
+)
+from lxdapi.utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(tags=["server"], prefix="/server")
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Maximum seconds between polls of a job holding a slot of a per-process rate limit backend
+JOB_POLL_MAX_INTERVAL = 30.0
+
+
+def _parse_fields(fields: str | None) -> list[str] | None:
+    """Parse comma-separated fields parameter."""
+    if fields is None:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in SERVER_FIELDS]
+    if unknown:
+        raise InvalidFieldsException(detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def _ndjson(items: Iterable[Any]) -> Iterator[str]:
+    """Serialize items as newline-delimited JSON."""
+    for item in items:
+        yield json.dumps(item) + "\n"
+
+
+def _hold_until_finished(slot: OperationSlot, lxd_client: LXDClient, operation_ids: list[str]) -> None:
+    """Hold slot of the client until its LXD operations are finished.
+
+    A failed wait, e.g. for an operation LXD has pruned already, doesn't
+    release the slot while other operations are still running.
+    """
+    timeout = slot.limiter.slot_ttl
+    slot.hold_until(
+        lambda: gather(*(lxd_client.operations.wait(id_, timeout) for id_ in operation_ids), return_exceptions=True)
+    )
+
+
+async def _wait_job(config: Config, job_id: int) -> None:
+    """Wait until background job succeeds or is dead.
+
+    Jobs take minutes, so the longer the job runs, the less often it is polled.
+    """
+    interval = config.QUEUE_POLL_INTERVAL
+    while True:
+        await sleep(interval)
+        interval = min(interval * 2, JOB_POLL_MAX_INTERVAL)
+        async with get_session_maker(config)() as db:
+            job = await JobModel.get(db, job_id)
+        if job is None or job.status in (JobStatus.SUCCEEDED.value, JobStatus.DEAD.value):
+            return
+
 
 @router.get("/")
 async def get_servers(
     *,
-    lxd: LXD = Depends(get_lxd),
-) -> list[str]:
-    """Get servers."""
-    servers = await lxd.instance.list(recursion=True)
-    return [server.name for server in servers]
+    response: Response,
+    lxd_client: LXDClient = Depends(get_lxd_client),
+    fresh: bool = Query(False, description="Bypass the instance cache."),
+    limit: int | None = Query(None, ge=1, le=1000, description="Page size, all servers if not set."),
+    cursor: str | None = Query(None, description="Value of X-Next-Cursor header from the previous page."),
+    status: str | None = Query(None, description="Filter by status, e.g. Running."),
+    type_: str | None = Query(None, alias="type", description="Filter by type: container or virtual-machine."),
+    project: str | None = Query(None, description="LXD project, default project if not set."),
+    fields: str | None = Query(None, description=f"Comma-separated fields: {', '.join(SERVER_FIELDS)}."),
+    format_: str | None = Query(None, alias="format", regex="^(json|ndjson)$"),
+    accept: str | None = Header(None),
+) -> Any:
+    """Get servers.
+
+    Returns a list of names, or of objects with requested `fields`. Servers
+    are sorted by name. If `limit` is set and there are more servers, the
+    cursor of the next page is returned in the X-Next-Cursor header.
+
+    Names of the default project are served from the instance inventory
+    cache, which is kept up to date by LXD lifecycle events. Other fields and
+    filters fetch only the LXD recursion level they need, and concurrent
+    identical requests share one LXD call.
+    """
+    requested = _parse_fields(fields)
+    recursion = max((SERVER_FIELDS[field] for field in requested or ()), default=0)
+    if status is not None or type_ is not None:
+        recursion = max(recursion, 1)
+
+    documents: list[dict[str, Any]]
+    if recursion == 0 and project is None:
+        documents = [{"name": name} for name in await lxd_client.inventory.names(fresh=fresh)]
+    else:
+        # Concurrent identical listings share one LXD request and its result,
+        # so the list is copied by sorting and documents are never modified
+        lxd = lxd_client.lxd
+        shared = await lxd_client.reads.do(
+            ("instances", recursion, project), lambda: list_instances(lxd, recursion, project)
+        )
+        documents = sorted(shared, key=lambda document: document["name"])
+    if status is not None:
+        documents = [document for document in documents if document["status"].lower() == status.lower()]
+    if type_ is not None:
+        documents = [document for document in documents if document["type"] == type_]
 
+    if cursor is not None:
+        after = str(decode_cursor(cursor))
+        documents = [document for document in documents if document["name"] > after]
+    headers = {}
+    if limit is not None and len(documents) > limit:
+        documents = documents[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(documents[-1]["name"])
 
-@router.post("/")
+    items: list[Any]
+    if requested is None:
+        items = [document["name"] for document in documents]
+    else:
+        items = [ServerSchema.from_lxd(document, requested).dict(exclude_unset=True) for document in documents]
+
+    if format_ == "ndjson" or (format_ is None and accept is not None and NDJSON_MEDIA_TYPE in accept):
+        return StreamingResponse(_ndjson(items), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+    response.headers.update(headers)
+    return items
+
+
+@router.post("/", responses={202: {"model": JobSchema}})
 async def create_server(
     *,
-    lxd: LXD = Depends(get_lxd),
-    name: str = Query(..., min_length=1),
+    response: Response,
+    lxd_client: LXDClient = Depends(get_lxd_client),
+    db: AsyncSession = Depends(get_db),
+    config: Config = Depends(get_config),
+    slot: OperationSlot = Depends(rate_limit("create_server")),
+    name: str = Query(..., regex=INSTANCE_NAME_REGEX),
     source: str = Query(min_length=1, default="ubuntu/22.04"),
-) -> str:
-    """Create server."""
-    creation_request = await lxd.instance.create(name=name, source=source, type_="virtual-machine")
-    return creation_request.metadata["id"]
+    background: bool = Query(False, description="Queue creation as a background job and return it."),
+    priority: int = Query(0, description="Priority of the background job, higher runs first."),
+) -> Any:
+    """Create server.
+
+    Returns LXD operation ID. With `background` the request is only queued:
+    it returns the job with status 202 right away, and the worker creates the
+    server, retrying if LXD is unavailable. Track it at `/jobs/{id}`.
+
+    Creation counts as an operation of the client until the server is
+    created, or the job is done.
+    """
+    if not background:
+        creation_request = await lxd_client.lxd.instance.create(name=name, source=source, type_="virtual-machine")
+        operation_id = creation_request.metadata["id"]
+        _hold_until_finished(slot, lxd_client, [operation_id])
+        return operation_id
+    # With a shared rate limit backend the worker releases the slot when the job is done
+    owner = slot.owner
+    job = await JobModel.enqueue(
+        db,
+        "create_server",
+        {"name": name, "source": source},
+        priority=priority,
+        slot_key=slot.key if owner is not None else None,
+        slot_owner=owner,
+    )
+    # Commit before responding, so the job is visible to the worker and to the client
+    await db.commit()
+    if owner is not None:
+        slot.hand_over()
+    else:
+        job_id = job.id
+        slot.hold_until(lambda: _wait_job(config, job_id))
+    response.status_code = HTTP_202_ACCEPTED
+    return JobSchema.from_orm(job)
+
+
+@router.post("/bulk", response_model=list[BulkResultSchema])
+async def bulk_action(
+    *,
+    lxd_client: LXDClient = Depends(get_lxd_client),
+    lxd: LXD = Depends(get_lxd),
+    config: Config = Depends(get_config),
+    slot: OperationSlot = Depends(rate_limit("bulk_action")),
+    body: BulkActionSchema,
+    stream: bool = Query(False, description="Stream results as NDJSON in completion order."),
+) -> Any:
+    """Apply an action to many servers.
+
+    Requests are sent to LXD concurrently, at most LXD_BULK_CONCURRENCY at a
+    time. Returns operation ID or error for every server, in request order,
+    or streams them as soon as each one completes. The action counts as one
+    operation of the client until all its LXD operations are finished.
+    """
+    semaphore = Semaphore(config.LXD_BULK_CONCURRENCY)
+    # Operations started so far, also by results not sent yet
+    started: list[str] = []
+
+    async def run(name: str) -> BulkResultSchema:
+        async with semaphore:
+            try:
+                if body.action == BulkAction.DELETE:
+                    operation_id = await delete_instance(lxd, name)
+                else:
+                    operation_id = await change_state(lxd, name, body.action.value, body.force)
+            except Exception as e:
+                return BulkResultSchema(name=name, error=str(e) or e.__class__.__name__)
+            started.append(operation_id)
+            return BulkResultSchema(name=name, operation_id=operation_id)
+
+    names = list(dict.fromkeys(body.names))
+    if stream:
+
+        async def results() -> AsyncIterator[str]:
+            tasks = [create_task(run(name)) for name in names]
+            try:
+                for completed in as_completed(tasks):
+                    yield (await completed).json() + "\n"
+            finally:
+                # The client may disconnect mid-stream, then no more requests are sent
+                for task in tasks:
+                    task.cancel()
+                _hold_until_finished(slot, lxd_client, started)
+
+        return StreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE)
+    completed = await gather(*(run(name) for name in names))
+    _hold_until_finished(slot, lxd_client, started)
+    return completed
 
 
 @router.delete("/{name}")
 async def delete_server(
     *,
+    lxd_client: LXDClient = Depends(get_lxd_client),
     lxd: LXD = Depends(get_lxd),
-    name: str = Path(..., min_length=1),
+    slot: OperationSlot = Depends(rate_limit("delete_server")),
+    name: str = Path(..., regex=INSTANCE_NAME_REGEX),
 ) -> str:
     """Delete server."""
-    deletion_request = await lxd.instance.delete(name=name)
-    return deletion_request.metadata["id"]
+    operation_id = await delete_instance(lxd, name)
+    _hold_until_finished(slot, lxd_client, [operation_id])
+    return operation_id
 
 
 @router.post("/{name}/start")
 async def start_server(
     *,
+    lxd_client: LXDClient = Depends(get_lxd_client),
     lxd: LXD = Depends(get_lxd),
-    name: str = Path(..., min_length=1),
+    slot: OperationSlot = Depends(rate_limit("start_server")),
+    name: str = Path(..., regex=INSTANCE_NAME_REGEX),
     force: bool = Query(False),
 ) -> str:
     """Start server."""
-    start_request = await lxd.transport.instances.slash(name).state.put(data={"action": "start", "force": force})
-    return start_request.metadata["id"]
+    operation_id = await change_state(lxd, name, "start", force)
+    _hold_until_finished(slot, lxd_client, [operation_id])
+    return operation_id
 
 
 @router.post("/{name}/stop")
 async def stop_server(
     *,
+    lxd_client: LXDClient = Depends(get_lxd_client),
     lxd: LXD = Depends(get_lxd),
-    name: str = Path(..., min_length=1),
+    slot: OperationSlot = Depends(rate_limit("stop_server")),
+    name: str = Path(..., regex=INSTANCE_NAME_REGEX),
     force: bool = Query(False),
 ) -> str:
     """Stop server."""
-    stop_request = await lxd.transport.instances.slash(name).state.put(data={"action": "stop", "force": force})
-    return stop_request.metadata["id"]
+    operation_id = await change_state(lxd, name, "stop", force)
+    _hold_until_finished(slot, lxd_client, [operation_id])
+    return operation_id
@@ -0,0 +1,21 @@
+"""User endpoints."""
+from fastapi import APIRouter, Depends
+
+from lxdapi.core.exceptions.handler import ErrorSchema
+from lxdapi.core.security import Principal
+from lxdapi.dependencies.auth import get_current_user
+from lxdapi.schemas.user import UserSchema
+
+router = APIRouter(tags=["user"], prefix="/user")
+
+
+@router.get(
+    "/me",
+    response_model=UserSchema,
+    responses={401: {"model": ErrorSchema}, 403: {"model": ErrorSchema}, 422: {"model": ErrorSchema}},
+)
+async def get_me(*, user: Principal = Depends(get_current_user)) -> UserSchema:
+    """Get the authenticated user."""
+    return UserSchema(
+        id=user.id, email=user.email, is_admin=user.is_admin, permission_groups=sorted(user.permission_groups)
+    )
@@ -0,0 +1,23 @@
+"""Background job schemas."""
+from datetime import datetime
+from typing import Any
+
+from lxdapi.models.job import JobStatus
+
+from .abc import BaseSchema
+
+
+class JobSchema(BaseSchema):
+    """Background job."""
+
+    id: int
+    kind: str
+    status: JobStatus
+    priority: int
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    last_error: str | None = None
+    result: Any = None
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,27 @@
+"""Operation schemas."""
+from typing import Any
+
+from pydantic import Field
+
+from .abc import BaseSchema
+
+
+class OperationSchema(BaseSchema):
+    """LXD background operation."""
+
+    id: str
+    class_: str = Field(alias="class")
+    description: str
+    status: str
+    status_code: int
+    resources: dict[str, list[str]] | None = None
+    metadata: dict[str, Any] | None = None
+    may_cancel: bool = False
+    err: str = ""
+    created_at: str | None = None
+    updated_at: str | None = None
+
+    class Config:
+        """Config."""
+
+        allow_population_by_field_name = True
@@ -0,0 +1,132 @@
+"""Server schemas."""
+from enum import Enum
+from typing import Any, Iterable
+
+from pydantic import Field, constr
+
+from .abc import BaseSchema
+
+# Valid LXD instance name, it can't change the path of LXD requests
+INSTANCE_NAME_REGEX = "^[A-Za-z][A-Za-z0-9-]{0,62}$"
+InstanceName = constr(regex=INSTANCE_NAME_REGEX)
+
+# LXD `recursion` level needed to fill each server field:
+# 0 - instance URLs only, 1 - instance documents, 2 - documents with state.
+SERVER_FIELDS: dict[str, int] = {
+    "name": 0,
+    "status": 1,
+    "type": 1,
+    "project": 1,
+    "architecture": 1,
+    "created_at": 1,
+    "description": 1,
+    "location": 1,
+    "profiles": 1,
+    "resources": 1,
+    "state": 2,
+}
+
+
+class ServerResourcesSchema(BaseSchema):
+    """Resource limits of a server, as configured in LXD."""
+
+    cpu: str | None = None
+    memory: str | None = None
+    disk: str | None = None
+
+
+class ServerStateSchema(BaseSchema):
+    """Runtime state of a server."""
+
+    cpu_usage: int | None = None
+    memory_usage: int | None = None
+    disk_usage: dict[str, int] = {}
+    processes: int | None = None
+    addresses: list[str] = []
+
+
+class ServerSchema(BaseSchema):
+    """Server, with only requested fields set."""
+
+    name: str
+    status: str | None = None
+    type: str | None = None
+    project: str | None = None
+    architecture: str | None = None
+    created_at: str | None = None
+    description: str | None = None
+    location: str | None = None
+    profiles: list[str] | None = None
+    resources: ServerResourcesSchema | None = None
+    state: ServerStateSchema | None = None
+
+    @classmethod
+    def from_lxd(cls, document: dict[str, Any], fields: Iterable[str]) -> "ServerSchema":
+        """Create schema from LXD instance document.
+
+        Args:
+            document: Instance document, with "state" for recursion level 2.
+            fields: Names of fields to set, see `SERVER_FIELDS`.
+        """
+        data: dict[str, Any] = {"name": document["name"]}
+        for field in fields:
+            if field == "resources":
+                config = document.get("expanded_config") or document.get("config") or {}
+                devices = document.get("expanded_devices") or document.get("devices") or {}
+                data[field] = ServerResourcesSchema(
+                    cpu=config.get("limits.cpu"),
+                    memory=config.get("limits.memory"),
+                    disk=(devices.get("root") or {}).get("size"),
+                )
+            elif field == "state":
+                data[field] = cls._state_from_lxd(document.get("state") or {})
+            elif field != "name":
+                data[field] = document.get(field)
+        return cls(**data)
+
+    @staticmethod
+    def _state_from_lxd(state: dict[str, Any]) -> ServerStateSchema:
+        """Create state schema from LXD instance state."""
+        addresses = [
+            address["address"]
+            for interface in (state.get("network") or {}).values()
+            for address in interface.get("addresses", [])
+            if address.get("scope") == "global"
+        ]
+        return ServerStateSchema(
+            cpu_usage=(state.get("cpu") or {}).get("usage"),
+            memory_usage=(state.get("memory") or {}).get("usage"),
+            disk_usage={name: disk.get("usage", 0) for name, disk in (state.get("disk") or {}).items()},
+            processes=state.get("processes"),
+            addresses=addresses,
+        )
+
+
+class BulkAction(str, Enum):
+    """Action applied to many servers at once."""
+
+    START = "start"
+    STOP = "stop"
+    RESTART = "restart"
+    FREEZE = "freeze"
+    UNFREEZE = "unfreeze"
+    DELETE = "delete"
+
+
+class BulkActionSchema(BaseSchema):
+    """Bulk action request."""
+
+    action: BulkAction
+    names: list[InstanceName] = Field(..., min_items=1, max_items=1000)  # type: ignore[valid-type]
+    force: bool = False
+
+
+class BulkResultSchema(BaseSchema):
+    """Result of bulk action for one server.
+
+    Exactly one of `operation_id` and `error` is set.
+    """
+
+    name: str
+    operation_id: str | None = None
+    error: str | None = None
@@ -0,0 +1,12 @@
+"""User schemas."""
+
+from .abc import BaseSchema
+
+
+class UserSchema(BaseSchema):
+    """User."""
+
+    id: int
+    email: str
+    is_admin: bool
+    permission_groups: list[str]
@@ -3,18 +3,32 @@
 from calendar import timegm
 from datetime import datetime, timedelta
 from logging import getLogger
-from typing import Any
+from time import monotonic, time
+from typing import Any, Iterable
 
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from lxdapi.core.config import Config
-from lxdapi.core.exceptions.jwt import TokenInvalidException
+from lxdapi.core.exceptions.jwt import (
+    TokenInvalidException,
+    TokenRevokedException,
+)
+from lxdapi.models import RevokedTokenModel
+from lxdapi.utils.cache import TTLCache
+from lxdapi.utils.jwks import KeySet
 
 ALGORITHM = "HS256"
 JSON_TYPE = dict[str, str | int | float | bool | None | dict[str, "JSON_TYPE"] | list["JSON_TYPE"]]
 
+# jose raises exception if jti field is not int, so we disable jti check
+OPTIONS = {"verify_jti": False}
+
 logger = getLogger(__name__)
 
+_verifiers: dict[tuple[str, str, bool], "JWTVerifier"] = {}
+
 
 def timegm_delta(**delta: Any) -> int:
     """Get timegm from timedelta."""
@@ -34,20 +48,30 @@ def generate_iat_ts() -> int:
 def encode(config: Config, data: JSON_TYPE) -> str:
     """Encode provided data to signed JWT token.
 
+    Tokens are signed with the private key of the key set, with its `kid`
+    header, if `JWT_KEYS_PATH` has one. Otherwise they are signed with the
+    secret.
+
     Args:
         data: JWT data.
 
     Returns:
         str: JWT string.
     """
+    key_set = get_verifier(config).key_set
+    if key_set is not None and key_set.signing_key is not None:
+        kid, key, algorithm = key_set.signing_key
+        return jwt.encode(data, key, algorithm=algorithm, headers={"kid": kid})
     return jwt.encode(data, config.SECRET, algorithm=ALGORITHM)
 
 
-def decode(config: Config, token: str, options: dict[str, bool] = {}) -> JSON_TYPE:
+def decode(config: Config, token: str, options: dict[str, bool] | None = None) -> JSON_TYPE:
     """Decode JWT token and return its data.
 
     Args:
         token: JWT token string.
+        options: jose verification options, tokens verified with options
+            are not cached.
 
     Raises:
         TokenInvalidException: If token is invalid.
@@ -55,16 +79,152 @@ def decode(config: Config, token: str, options: dict[str, bool] = {}) -> JSON_TY
     Returns:
         dict: Parsed JWT data.
     """
-    # jose raises exception if jti field is not int, so we disable jti
-    # check globally
-    options["verify_jti"] = False
-    try:
-        return jwt.decode(
-            token,
-            config.SECRET,
-            algorithms=[ALGORITHM],
-            options=options,
-        )
-    except JWTError:
-        logger.exception("JWT exception")
-        raise TokenInvalidException(detail="JWT decode/verification error")
+    return get_verifier(config).verify(token, options)
+
+
+def get_verifier(config: Config) -> "JWTVerifier":
+    """Get the shared verifier of the configured secret and key set.
+
+    The verifier is created on first call and reused afterwards.
+
+    Raises:
+        ValueError: If the key set is invalid.
+        OSError: If the key set can't be read.
+
+    Returns:
+        JWTVerifier: Process-wide verifier.
+    """
+    require_key_id = bool(config.JWT_KEYS_PATH) if config.JWT_REQUIRE_KEY_ID is None else config.JWT_REQUIRE_KEY_ID
+    verifier = _verifiers.get((config.SECRET, config.JWT_KEYS_PATH, require_key_id))
+    if verifier is None:
+        key_set = None
+        if config.JWT_KEYS_PATH:
+            key_set = KeySet(config.JWT_KEYS_PATH, config.JWT_SIGNING_KEY_ID, config.JWT_KEYS_ROTATION_WINDOW)
+        verifier = JWTVerifier(config.SECRET, key_set=key_set, require_key_id=require_key_id)
+        _verifiers[(config.SECRET, config.JWT_KEYS_PATH, require_key_id)] = verifier
+    return verifier
+
+
+class JWTVerifier:
+    """Verifies JWT tokens signed with a secret, or with keys of a key set.
+
+    Tokens with a `kid` header are verified with that key of the key set,
+    other tokens with the secret, unless `require_key_id` is set: then
+    holding the secret is not enough to issue valid tokens. The secret key
+    is built once. Verified tokens are cached until they expire, for
+    at most `cache_ttl` seconds, so a token used for many requests is
+    verified once. Tokens are revoked by their `jti` claim, which is checked
+    on every call, cached or not.
+
+    Invalid tokens are logged without a stack trace at debug level: clients
+    sending many invalid tokens must not flood the logs.
+
+    Claims are shared between calls with the same token, so callers must not
+    modify them.
+
+    Example:
+    ```
+        verifier = JWTVerifier(config.SECRET)
+        claims = verifier.verify(token)
+        verifier.revoke(claims["jti"])
+    ```
+    """
+
+    def __init__(
+        self,
+        secret: str,
+        algorithm: str = ALGORITHM,
+        cache_size: int = 10000,
+        cache_ttl: float = 300,
+        sync_interval: float = 30,
+        key_set: KeySet | None = None,
+        require_key_id: bool = False,
+    ) -> None:
+        """Build key of the secret.
+
+        Args:
+            secret: Signing secret.
+            algorithm: HMAC signing algorithm.
+            cache_size: Maximum number of cached tokens, 0 disables the cache.
+            cache_ttl: Maximum time a token is cached for, in seconds.
+            sync_interval: Seconds after which revoked tokens should be synced again, see `sync_due`.
+            key_set: Keys to verify tokens with a `kid` header.
+            require_key_id: Reject tokens without a `kid` header, signed with the secret.
+        """
+        self.algorithm = algorithm
+        self._key = jwk.construct(secret, algorithm)
+        self._cache: TTLCache[str, JSON_TYPE] = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.revoked: set[str] = set()
+        self.sync_interval = sync_interval
+        self._synced_at: float | None = None
+        self.key_set = key_set
+        self.require_key_id = require_key_id
+
+    def verify(self, token: str, options: dict[str, bool] | None = None) -> JSON_TYPE:
+        """Verify token and return its claims.
+
+        Args:
+            token: JWT token string.
+            options: jose verification options, tokens verified with options
+                are not cached.
+
+        Raises:
+            TokenInvalidException: If token is invalid or expired.
+            TokenRevokedException: If token is revoked.
+        """
+        claims = None if options else self._cache.get(token)
+        if claims is None:
+            try:
+                key, algorithm = self._get_key(token)
+                claims = jwt.decode(token, key, algorithms=[algorithm], options={**OPTIONS, **(options or {})})
+            except JWTError as e:
+                logger.debug("Invalid JWT: %s", e)
+                raise TokenInvalidException(detail="JWT decode/verification error")
+            if not options:
+                self._cache_claims(token, claims)
+        if claims.get("jti") in self.revoked:
+            raise TokenRevokedException()
+        return claims
+
+    def _get_key(self, token: str) -> tuple[Key, str]:
+        """Return key and algorithm to verify token with.
+
+        Raises:
+            JWTError: If token header is malformed, or its key is unknown or required but missing.
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is None and not self.require_key_id:
+            return self._key, self.algorithm
+        if not isinstance(kid, str):
+            raise JWTError(f"Invalid key ID {kid!r}")
+        key = None if self.key_set is None else self.key_set.get(kid)
+        if key is None:
+            raise JWTError(f"Unknown key ID {kid!r}")
+        return key
+
+    def _cache_claims(self, token: str, claims: JSON_TYPE) -> None:
+        """Cache claims of a verified token until it expires."""
+        exp = claims.get("exp")
+        if exp is None:
+            self._cache.set(token, claims)
+        elif isinstance(exp, (int, float)) and exp > time():
+            self._cache.set(token, claims, ttl=exp - time())
+
+    def revoke(self, jti: str) -> None:
+        """Revoke tokens with `jti` claim in this process, see `sync` for other processes."""
+        self.revoked.add(jti)
+
+    def set_revoked(self, jtis: Iterable[str]) -> None:
+        """Replace the set of revoked `jti` claims."""
+        self.revoked = set(jtis)
+
+    @property
+    def sync_due(self) -> bool:
+        """Return True if revoked tokens were never synced, or `sync_interval` ago."""
+        return self._synced_at is None or monotonic() - self._synced_at >= self.sync_interval
+
+    async def sync(self, db: AsyncSession) -> None:
+        """Load revoked tokens which are not expired from the database."""
+        # Concurrent callers don't sync again while this one waits
+        self._synced_at = monotonic()
+        self.set_revoked(await RevokedTokenModel.get_active(db))
@@ -0,0 +1,76 @@
+"""In-memory caches."""
+from collections import OrderedDict
+from time import monotonic
+from typing import Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Size-bounded cache with expiring entries.
+
+    Entries expire `ttl` seconds after they were set. When the cache is full,
+    the least recently used entry is evicted.
+
+    Example:
+    ```
+        cache: TTLCache[int, str] = TTLCache(maxsize=1000, ttl=5)
+        cache.set(1, "one")
+        cache.get(1)  # "one"
+    ```
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        """Initialize empty cache.
+
+        Args:
+            maxsize: Maximum number of entries.
+            ttl: Lifetime of an entry in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Return number of entries, including expired ones not evicted yet."""
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """Return value of key, None if it is not cached or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Cache value of key, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key.
+            value: Cached value.
+            ttl: Lifetime of this entry in seconds, if shorter than the cache TTL.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        """Remove key and return its value, None if it is not cached or expired."""
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[0] <= monotonic():
+            return None
+        return entry[1]
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
@@ -0,0 +1,119 @@
+"""Cron expressions."""
+from datetime import datetime, timedelta
+
+# (name, minimum, maximum) of each field of a cron expression
+FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of month", 1, 31),
+    ("month", 1, 12),
+    ("day of week", 0, 7),
+)
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+
+def _parse_field(value: str, name: str, minimum: int, maximum: int) -> frozenset[int]:
+    """Parse one field of a cron expression to the set of matching values.
+
+    Raises:
+        ValueError: If field is malformed or out of range.
+    """
+    result: set[int] = set()
+    for part in value.split(","):
+        range_, _, step_ = part.partition("/")
+        step = int(step_) if step_ else 1
+        if range_ == "*":
+            start, end = minimum, maximum
+        elif "-" in range_:
+            start_, end_ = range_.split("-", 1)
+            start, end = int(start_), int(end_)
+        else:
+            start = int(range_)
+            end = maximum if step_ else start
+        if step < 1 or not minimum <= start <= end <= maximum:
+            raise ValueError(f"Invalid {name} field: {value!r}")
+        result.update(range(start, end + 1, step))
+    if name == "day of week" and 7 in result:
+        # Both 0 and 7 mean Sunday
+        result = (result - {7}) | {0}
+    return frozenset(result)
+
+
+class CronExpression:
+    """Standard 5-field cron expression: minute, hour, day of month, month and day of week.
+
+    Fields support `*`, values, ranges, lists and steps, like `*/15`, `1-5` or
+    `0,30`. Names of months and days are not supported. Macros like `@hourly`
+    are expanded. As in cron, if both day fields are restricted, a day
+    matching either of them matches.
+
+    Example:
+    ```
+        cron = CronExpression("*/5 * * * *")
+        cron.next_after(datetime(2022, 1, 1, 0, 1))  # datetime(2022, 1, 1, 0, 5)
+    ```
+    """
+
+    def __init__(self, expression: str) -> None:
+        """Parse expression.
+
+        Raises:
+            ValueError: If expression is malformed.
+        """
+        self.expression = expression
+        fields = MACROS.get(expression.strip(), expression).split()
+        if len(fields) != len(FIELDS):
+            raise ValueError(f"Cron expression must have {len(FIELDS)} fields: {expression!r}")
+        try:
+            parsed = [_parse_field(value, *field) for value, field in zip(fields, FIELDS)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression {expression!r}: {e}") from e
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def __repr__(self) -> str:
+        """Return representation with the source expression."""
+        return f"CronExpression({self.expression!r})"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        """Return True if date of moment matches day fields."""
+        day = moment.day in self.days
+        # datetime weekday() is 0 for Monday, cron uses 0 for Sunday
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Return the first matching minute strictly after moment.
+
+        Raises:
+            ValueError: If expression never matches, like `0 0 31 2 *`.
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Matching days repeat at least every 4 years (leap years)
+        limit = candidate + timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month = candidate.month + 1
+                year = candidate.year + month // 13
+                candidate = candidate.replace(year=year, month=(month - 1) % 12 + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
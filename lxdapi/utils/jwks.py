@@ -0,0 +1,125 @@
+"""JSON Web Key sets for asymmetric JWT signing."""
+import json
+import logging
+from asyncio import sleep
+from pathlib import Path
+from time import monotonic
+
+from jose import jwk
+from jose.backends.base import Key
+from jose.exceptions import JWKError
+
+log = logging.getLogger(__name__)
+
+# Algorithms of keys in key sets. EdDSA is not supported by python-jose.
+ALGORITHMS = ("ES256", "ES384", "ES512", "RS256", "RS384", "RS512")
+
+
+class KeySet:
+    """Keys to verify JWTs by their `kid` header, and optionally to sign them.
+
+    Keys are loaded from a JSON file with a JWK or a JWK set (`{"keys": [...]}`),
+    or from a directory of such files. Every key must have `kid` and `alg`.
+    Public keys are used for verification. The private key with
+    `signing_key_id`, or the only private key if it is not set, signs tokens.
+
+    Nodes verifying tokens need only public keys. Files are reloaded by
+    `refresh` when they change, and keys removed from them are accepted for
+    `rotation_window` seconds more. To rotate keys, add the new public key
+    to all nodes first, then sign with it, then remove the old key.
+
+    Example:
+    ```
+        keys = KeySet("/etc/lxdapi/jwks.json")
+        kid, key, algorithm = keys.signing_key
+        token = jwt.encode(claims, key, algorithm=algorithm, headers={"kid": kid})
+    ```
+    """
+
+    def __init__(self, path: str, signing_key_id: str = "", rotation_window: float = 3600) -> None:
+        """Load keys.
+
+        Args:
+            path: Key set file or directory of `*.json` key set files.
+            signing_key_id: `kid` of the private key to sign with.
+            rotation_window: Seconds keys removed from files are still accepted for.
+
+        Raises:
+            ValueError: If keys are invalid.
+            OSError: If files can't be read.
+        """
+        self.path = Path(path)
+        self.signing_key_id = signing_key_id
+        self.rotation_window = rotation_window
+        self._keys: dict[str, tuple[Key, str]] = {}
+        self._retired: dict[str, tuple[Key, str, float]] = {}
+        self.signing_key: tuple[str, Key, str] | None = None
+        self._stamp: tuple[tuple[str, int], ...] | None = None
+        self.refresh()
+
+    def get(self, kid: str) -> tuple[Key, str] | None:
+        """Return public key and its algorithm by key ID, None if it is unknown or retired too long ago."""
+        key = self._keys.get(kid)
+        if key is None and kid in self._retired:
+            public_key, algorithm, retired_at = self._retired[kid]
+            if monotonic() - retired_at <= self.rotation_window:
+                return public_key, algorithm
+            del self._retired[kid]
+        return key
+
+    def refresh(self) -> bool:
+        """Reload keys if files have changed.
+
+        Raises:
+            ValueError: If keys are invalid, the current keys are kept.
+            OSError: If files can't be read.
+
+        Returns:
+            bool: True if keys were reloaded.
+        """
+        files = sorted(self.path.glob("*.json")) if self.path.is_dir() else [self.path]
+        stamp = tuple((str(file), file.stat().st_mtime_ns) for file in files)
+        if stamp == self._stamp:
+            return False
+        keys, signing_key = self._load(files)
+        now = monotonic()
+        for kid, (public_key, algorithm) in self._keys.items():
+            if kid not in keys:
+                self._retired[kid] = (public_key, algorithm, now)
+        for kid in keys:
+            self._retired.pop(kid, None)
+        self._keys, self.signing_key, self._stamp = keys, signing_key, stamp
+        return True
+
+    def _load(self, files: list[Path]) -> tuple[dict[str, tuple[Key, str]], tuple[str, Key, str] | None]:
+        """Load public keys and the signing key from files."""
+        keys: dict[str, tuple[Key, str]] = {}
+        private: dict[str, tuple[str, Key, str]] = {}
+        for file in files:
+            try:
+                document = json.loads(file.read_text())
+                for data in document.get("keys", [document]):
+                    kid, algorithm = data.get("kid"), data.get("alg")
+                    if not kid or algorithm not in ALGORITHMS:
+                        raise ValueError(f"key must have kid and alg, one of {', '.join(ALGORITHMS)}")
+                    key = jwk.construct(data, algorithm)
+                    keys[kid] = (key.public_key(), algorithm)
+                    if "d" in data:
+                        private[kid] = (kid, key, algorithm)
+            except (JWKError, ValueError, AttributeError) as e:
+                raise ValueError(f"Invalid key set {file}: {e}") from e
+        if self.signing_key_id:
+            if self.signing_key_id not in private:
+                raise ValueError(f"Private key {self.signing_key_id} not found in {self.path}")
+            return keys, private[self.signing_key_id]
+        return keys, next(iter(private.values())) if len(private) == 1 else None
+
+    async def run(self, interval: float) -> None:
+        """Refresh keys every `interval` seconds, until cancelled."""
+        while True:
+            await sleep(interval)
+            try:
+                if self.refresh():
+                    log.info("Reloaded JWT keys from %s", self.path)
+            except (OSError, ValueError) as e:
+                log.warning("Failed to reload JWT keys, keeping the current ones: %s", e)
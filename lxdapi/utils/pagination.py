@@ -0,0 +1,24 @@
+"""Pagination utils."""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from typing import Any
+
+from lxdapi.core.exceptions.common import InvalidCursorException
+
+
+def encode_cursor(value: Any) -> str:
+    """Encode JSON-serializable position to an opaque cursor string."""
+    return urlsafe_b64encode(json.dumps(value, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    """Decode cursor created by `encode_cursor`.
+
+    Raises:
+        InvalidCursorException: If cursor is malformed.
+    """
+    try:
+        return json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise InvalidCursorException()
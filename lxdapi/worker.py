@@ -1,66 +1,367 @@
 """Worker module."""
+import asyncio
+import heapq
 import logging
-from asyncio import create_task, sleep
-from dataclasses import dataclass
-from time import time
+from asyncio import (
+    FIRST_COMPLETED,
+    Task,
+    create_task,
+    gather,
+    sleep,
+    wait,
+    wait_for,
+)
+from dataclasses import dataclass, field
+from datetime import datetime
+from random import uniform
+from time import monotonic, time
 from typing import Any, Callable, Coroutine
 
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from lxdapi.core.config import Config
-from lxdapi.dependencies.database import get_db_deprecated
+from lxdapi.core.database import dispose_engines, get_session_maker
+from lxdapi.core.lxd import LXDClient
+from lxdapi.jobs import HANDLERS, PermanentJobError
+from lxdapi.models import JobModel, LeaseModel
+from lxdapi.reconcile import Reconciler
+from lxdapi.utils.cron import CronExpression
 
 log = logging.getLogger(__name__)
 
 
 @dataclass
 class Cron:
-    """Cron class."""
+    """Scheduled job.
+
+    Exactly one of `every` (seconds between runs) and `cron` (cron expression
+    in local time) must be set.
+
+    Attributes:
+        func: Coroutine function to run.
+        every: Run interval in seconds.
+        cron: Cron expression, like "*/5 * * * *".
+        max_concurrency: Maximum number of simultaneous runs. When reached,
+            due runs are skipped.
+        jitter: Maximum random delay of each run in seconds.
+    """
 
     func: Callable[..., Coroutine[Any, Any, None]]
-    every: float | int
-    current: int = 0
+    every: float | None = None
+    cron: str | None = None
+    max_concurrency: int = 1
+    jitter: float = 0
+    running: set["Task[None]"] = field(default_factory=set, init=False, repr=False)
+    skipped: int = field(default=0, init=False)
+    _expression: CronExpression | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Validate schedule.
+
+        Raises:
+            ValueError: If schedule is missing or invalid.
+        """
+        if (self.every is None) == (self.cron is None):
+            raise ValueError("Exactly one of every and cron must be set")
+        if self.every is not None and self.every <= 0:
+            raise ValueError(f"Job interval must be positive: {self.every}")
+        if self.cron is not None:
+            self._expression = CronExpression(self.cron)
+
+    @property
+    def name(self) -> str:
+        """Return job name."""
+        return getattr(self.func, "__name__", repr(self.func))
+
+    def next_slot(self, after: float) -> float:
+        """Return wall-clock time of the first run slot strictly after a moment.
+
+        Interval slots are multiples of `every` since the epoch, so all
+        workers agree on them.
+
+        Args:
+            after: Unix timestamp.
+        """
+        if self._expression is not None:
+            return self._expression.next_after(datetime.fromtimestamp(after)).timestamp()
+        assert self.every is not None
+        return (after // self.every + 1) * self.every
+
+    def next_deadline(self, previous: float | None, now: float) -> float:
+        """Return monotonic time of the next interval run.
+
+        Runs are scheduled from the previous deadline, not from the time the
+        run actually started, so lag doesn't accumulate. Runs missed while the
+        loop was blocked are not caught up.
+
+        Args:
+            previous: Deadline of the previous run, None for the first run.
+            now: Current monotonic time.
+        """
+        assert self.every is not None
+        if previous is None:
+            return now + self.every
+        deadline = previous + self.every
+        if deadline <= now:
+            missed = int((now - deadline) // self.every) + 1
+            deadline += missed * self.every
+        return deadline
 
 
 class Worker:
-    """Worker class."""
+    """Worker class.
+
+    Jobs are kept in a heap ordered by their next monotonic deadline. The
+    loop sleeps until the earliest deadline, starts the due jobs as tasks and
+    reschedules them.
+
+    With WORKER_DISTRIBUTED any number of workers can share one database.
+    All jobs are scheduled at wall-clock slots and every run first claims the
+    job lease for its slot (see `LeaseModel`), so each slot runs on one
+    worker only. Leases of running jobs are renewed, and a failed worker's
+    jobs are taken over by others once its leases expire.
+
+    Besides scheduled jobs, the worker consumes the durable job queue (see
+    `JobModel`), running up to QUEUE_BATCH_SIZE queued jobs at a time with
+    handlers from `lxdapi.jobs`.
+    """
 
     def __init__(self, debug: bool = False) -> None:
         """Initialize worker."""
         self.task_counter = 0
         self.debug = debug
+        self.config = Config.from_env()
+        self.lxd_client = LXDClient(self.config)
+        self.reconciler = Reconciler(
+            self.lxd_client,
+            batch_size=self.config.RECONCILE_BATCH_SIZE,
+            sweep_interval=self.config.RECONCILE_INTERVAL,
+        )
         self.cron = [
             Cron(self.function_proxy(self.test_job), every=60 * 5),
+            Cron(self.function_proxy(self.reconcile_servers), every=self.config.RECONCILE_INTERVAL),
+            Cron(self.function_proxy(self.reconcile_dirty_servers), every=self.config.RECONCILE_DIRTY_INTERVAL),
         ]
-        self.interval = 5
-        self.config = Config.from_env()
+        self.handlers = HANDLERS
+        self.queued: set["Task[None]"] = set()
         log.debug("Worker initialized")
 
     async def run(self) -> None:
-        """Run worker."""
+        """Run worker.
+
+        Running jobs are cancelled, and the LXD client and the shared database
+        engine are closed when the worker stops.
+        """
+        try:
+            self.lxd_client.start_in_background()
+            if self.debug:
+                try:
+                    await wait_for(self.lxd_client.wait_ready(), self.config.LXD_CONNECT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    log.warning("LXD is not available, jobs using it will be skipped")
+                await self._run()
+            else:
+                await gather(self._run(), self._consume())
+        finally:
+            await self._cancel_running()
+            await self.lxd_client.close()
+            await dispose_engines()
+
+    async def _run(self) -> None:
+        """Run scheduled tasks."""
         log.info("Worker started scheduled tasks.")
-        # Prepare tasks
-        for cron in self.cron:
-            if cron.every % self.interval != 0:
-                old = cron.every
-                cron.every = cron.every - (cron.every % self.interval) + self.interval
-                log.warning("Interval is not a divisor of every. Fixing from %s to %s", old, cron.every)
         if self.debug:
             log.info("Debug mode enabled. Starting all tasks...")
             for cron in self.cron:
                 await cron.func()
-        else:
-            while True:
-                for cron in self.cron:
-                    diff = cron.every / self.interval
-                    log.debug(f"Current: {cron.current}, every: {cron.every}, interval: {self.interval}, diff: {diff}")
-                    if cron.current >= diff:
-                        create_task(cron.func())
-                        cron.current = 0
-                    else:
-                        cron.current += 1
-                log.debug(f"Sleeping for {self.interval} seconds...")
-                await sleep(self.interval)
+            return
+        if self.config.WORKER_DISTRIBUTED:
+            log.info("Distributed mode enabled, worker ID is %s", self.config.WORKER_ID)
+        # (deadline, job index, slot) - the index breaks ties between equal deadlines
+        schedule: list[tuple[float, int, float]] = []
+        for index, cron in enumerate(self.cron):
+            deadline, slot = self._next_run(cron, None, None)
+            heapq.heappush(schedule, (deadline, index, slot))
+        while schedule:
+            deadline, index, slot = schedule[0]
+            delay = deadline - monotonic()
+            if delay > 0:
+                log.debug("Sleeping for %.3f seconds...", delay)
+                await sleep(delay)
+                continue
+            cron = self.cron[index]
+            self._start(cron, slot)
+            deadline, slot = self._next_run(cron, deadline, slot)
+            heapq.heapreplace(schedule, (deadline, index, slot))
+
+    def _next_run(self, cron: Cron, deadline: float | None, slot: float | None) -> tuple[float, float]:
+        """Return monotonic deadline and wall-clock slot of the next job run.
+
+        Args:
+            cron: Job.
+            deadline: Deadline of the previous run.
+            slot: Slot of the previous run.
+        """
+        now = monotonic()
+        if cron.cron is None and not self.config.WORKER_DISTRIBUTED:
+            return cron.next_deadline(deadline, now), 0
+        wall = time()
+        # Wall clock can be slightly behind the deadline, don't repeat the slot
+        next_slot = cron.next_slot(max(wall, slot or 0))
+        return now + next_slot - wall, next_slot
+
+    def _start(self, cron: Cron, slot: float) -> None:
+        """Start job run, unless it is already running at its concurrency limit."""
+        if len(cron.running) >= cron.max_concurrency:
+            cron.skipped += 1
+            log.warning("Job %s is still running, skipping this run", cron.name)
+            return
+        task = create_task(self._run_job(cron, slot))
+        # Keep a reference, the event loop only holds weak ones
+        cron.running.add(task)
+        task.add_done_callback(cron.running.discard)
+
+    async def _run_job(self, cron: Cron, slot: float) -> None:
+        """Run job after random jitter delay, holding its lease in distributed mode."""
+        if cron.jitter:
+            await sleep(uniform(0, cron.jitter))
+        if not self.config.WORKER_DISTRIBUTED:
+            await cron.func()
+            return
+        # Milliseconds, so sub-second intervals get distinct slots
+        lease_slot = int(slot * 1000)
+        try:
+            async with get_session_maker(self.config)() as db:
+                claimed = await LeaseModel.claim(
+                    db, cron.name, self.config.WORKER_ID, lease_slot, self.config.WORKER_LEASE_TTL
+                )
+                await db.commit()
+        except SQLAlchemyError as e:
+            log.error("Failed to claim lease of job %s: %r", cron.name, e)
+            return
+        if not claimed:
+            log.debug("Job %s is run by another worker, skipping this run", cron.name)
+            return
+        heartbeat = create_task(self._renew_lease(cron, lease_slot))
+        try:
+            await cron.func()
+        finally:
+            heartbeat.cancel()
+            try:
+                async with get_session_maker(self.config)() as db:
+                    await LeaseModel.release(db, cron.name, self.config.WORKER_ID, lease_slot)
+                    await db.commit()
+            except SQLAlchemyError as e:
+                log.warning("Failed to release lease of job %s, it will expire: %r", cron.name, e)
+
+    async def _renew_lease(self, cron: Cron, slot: int) -> None:
+        """Renew job lease while the job is running."""
+        ttl = self.config.WORKER_LEASE_TTL
+        while True:
+            await sleep(ttl / 3)
+            try:
+                async with get_session_maker(self.config)() as db:
+                    renewed = await LeaseModel.renew(db, cron.name, self.config.WORKER_ID, slot, ttl)
+                    await db.commit()
+            except SQLAlchemyError as e:
+                log.warning("Failed to renew lease of job %s: %r", cron.name, e)
+                continue
+            if not renewed:
+                log.warning("Lease of job %s was lost, it may run on another worker too", cron.name)
+                return
+
+    async def _consume(self) -> None:
+        """Dequeue and run queued jobs."""
+        log.info("Worker started consuming job queue.")
+        while True:
+            free = self.config.QUEUE_BATCH_SIZE - len(self.queued)
+            if free <= 0:
+                await wait(self.queued, return_when=FIRST_COMPLETED)
+                continue
+            try:
+                async with get_session_maker(self.config)() as db:
+                    jobs = await JobModel.dequeue(db, self.config.WORKER_ID, free, self.config.QUEUE_LOCK_TIMEOUT)
+                    await db.commit()
+            except SQLAlchemyError as e:
+                log.error("Failed to dequeue jobs: %r", e)
+                jobs = []
+            for job in jobs:
+                task = create_task(self._run_queued(job))
+                self.queued.add(task)
+                task.add_done_callback(self.queued.discard)
+            if len(jobs) < free:
+                # Queue is drained
+                await sleep(self.config.QUEUE_POLL_INTERVAL)
+
+    async def _run_queued(self, job: JobModel) -> None:
+        """Run queued job and store its result or schedule a retry."""
+        log.info("Running job %s#%s, attempt %s", job.kind, job.id, job.attempts)
+        handler = self.handlers.get(job.kind)
+        result: Any = None
+        error: str | None = None
+        retry = handler is not None
+        # Without renewals the lock would expire while the job is still running
+        heartbeat = create_task(self._renew_job_lock(job))
+        try:
+            if handler is None:
+                error = f"Unknown job kind: {job.kind}"
+            else:
+                result = await wait_for(
+                    handler(self.lxd_client, job.payload, job.attempts), self.config.QUEUE_JOB_TIMEOUT
+                )
+        except PermanentJobError as e:
+            log.warning("Job %s#%s failed permanently: %r", job.kind, job.id, e)
+            error = str(e) or e.__class__.__name__
+            retry = False
+        except Exception as e:
+            log.warning("Job %s#%s failed: %r", job.kind, job.id, e)
+            error = str(e) or e.__class__.__name__
+        finally:
+            heartbeat.cancel()
+        try:
+            async with get_session_maker(self.config)() as db:
+                if error is None:
+                    finished = await job.complete(db, result)
+                else:
+                    finished = await job.fail(
+                        db, error, self.config.QUEUE_BACKOFF, self.config.QUEUE_MAX_BACKOFF, retry=retry
+                    )
+                await db.commit()
+        except SQLAlchemyError as e:
+            # The lock expires and the job is run again
+            log.error("Failed to store result of job %s#%s: %r", job.kind, job.id, e)
+            return
+        if not finished:
+            log.warning("Job %s#%s lock expired, it was taken by another worker", job.kind, job.id)
+
+    async def _renew_job_lock(self, job: JobModel) -> None:
+        """Renew lock of a queued job while it is running."""
+        lock_for = self.config.QUEUE_LOCK_TIMEOUT
+        while True:
+            await sleep(lock_for / 3)
+            try:
+                async with get_session_maker(self.config)() as db:
+                    renewed = await job.renew_lock(db, lock_for)
+                    await db.commit()
+            except SQLAlchemyError as e:
+                log.warning("Failed to renew lock of job %s#%s: %r", job.kind, job.id, e)
+                continue
+            if not renewed:
+                log.warning("Lock of job %s#%s was lost, it may run on another worker too", job.kind, job.id)
+                return
+
+    async def _cancel_running(self) -> None:
+        """Cancel all running jobs and wait for them.
+
+        Cancelled queued jobs are run again when their lock expires.
+        """
+        tasks = [task for cron in self.cron for task in cron.running] + list(self.queued)
+        for task in tasks:
+            task.cancel()
+        for result in await gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                log.error("Error in cancelled task", exc_info=result)
 
     def function_proxy(
         self,
@@ -73,7 +374,8 @@ class Worker:
         Pass to it essential dependencies and catch errors.
 
         Essential dependencies are:
-        - Database session (AsyncSession, first positional argument)
+        - Database session (AsyncSession, first positional argument), taken from
+          the shared engine pool and closed after the task finishes
 
         Args:
             func (Callable): Function to proxy.
@@ -85,25 +387,33 @@ class Worker:
             task_id = self.task_counter
             self.task_counter += 1
             try:
-                db = get_db_deprecated(self.config)
                 log.info(f"Running task {func.__name__}#{task_id}...")
                 start_time = time()
-                await func(db, *args, **kwargs)
+                async with get_session_maker(self.config)() as db:
+                    await func(db, *args, **kwargs)
                 elapsed_time = time() - start_time
-
-                if elapsed_time > self.interval:
-                    log.warning(
-                        f"Task {func.__name__}#{task_id} took {elapsed_time} seconds, but it should take"
-                        + f"less than {self.interval} seconds. Increase interval or split task."
-                    )
-                else:
-                    log.debug(f"Task {func.__name__}#{task_id} took {elapsed_time} seconds.")
+                log.debug(f"Task {func.__name__}#{task_id} took {elapsed_time} seconds.")
             except Exception as e:
                 log.error(f"Error in task {func.__name__}#{task_id}")
                 log.exception(e)
 
+        # Job name is used in logs and as its lease name
+        function_proxy_inner.__name__ = func.__name__
         return function_proxy_inner
 
+    async def reconcile_servers(self, db: AsyncSession) -> None:
+        """Sync all server rows with LXD instances."""
+        if not self.lxd_client.is_ready:
+            log.info("LXD client is not ready, skipping servers reconciliation")
+            return
+        await self.reconciler.sweep(db)
+
+    async def reconcile_dirty_servers(self, db: AsyncSession) -> None:
+        """Sync server rows of instances changed since the last run."""
+        if not self.lxd_client.is_ready:
+            return
+        await self.reconciler.sync_dirty(db)
+
     async def test_job(self, _db: AsyncSession) -> None:
         """Test job."""
         log.debug("Test job started")
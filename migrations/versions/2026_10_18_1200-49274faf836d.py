@@ -0,0 +1,29 @@
+"""Add worker leases.
+
+Revision ID: 49274faf836d
+Revises: 000000000000
+Create Date: 2026-10-18 12:00:00.000000+00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "49274faf836d"
+down_revision = "000000000000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "worker_leases",
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("owner", sa.String(length=255), nullable=False),
+        sa.Column("slot", sa.BigInteger(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("worker_leases")
@@ -0,0 +1,41 @@
+"""Add job queue.
+
+Revision ID: 8d3f9b4a0759
+Revises: 49274faf836d
+Create Date: 2026-10-18 13:00:00.000000+00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "8d3f9b4a0759"
+down_revision = "49274faf836d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=255), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("locked_by", sa.String(length=255), nullable=True),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_jobs_dequeue", "jobs", ["status", "priority", "run_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_jobs_dequeue", table_name="jobs")
+    op.drop_table("jobs")
@@ -0,0 +1,53 @@
+"""Add users and servers.
+
+The tables were created outside of migrations before, so they are created
+only if they don't exist yet. For the same reason the downgrade keeps them:
+it can't tell whether they hold data from before this revision.
+
+Revision ID: 9f44df03fe12
+Revises: 8d3f9b4a0759
+Create Date: 2026-10-18 14:00:00.000000+00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "9f44df03fe12"
+down_revision = "8d3f9b4a0759"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("email", sa.String(length=255), nullable=False),
+            sa.Column("is_banned", sa.Boolean(), nullable=False),
+            sa.Column("is_admin", sa.Boolean(), nullable=False),
+            sa.Column("permission_groups", sa.String(length=255), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("email"),
+        )
+    if "servers" not in tables:
+        op.create_table(
+            "servers",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=True),
+            sa.Column("name", sa.String(length=255), nullable=False),
+            sa.Column("cpu", sa.Float(), nullable=False),
+            sa.Column("memory", sa.Integer(), nullable=False),
+            sa.Column("disk", sa.Integer(), nullable=False),
+            sa.Column("system", sa.String(length=255), nullable=False),
+            sa.Column("ip", sa.String(length=255), nullable=False),
+            sa.Column("is_deleted", sa.Boolean(), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+
+def downgrade() -> None:
+    pass
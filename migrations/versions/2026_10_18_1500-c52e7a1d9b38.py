@@ -0,0 +1,76 @@
+"""Add lookup indexes and permission groups table.
+
+Permission groups move from a comma-separated column of users to the
+user_permission_groups table, indexed by group name.
+
+Revision ID: c52e7a1d9b38
+Revises: 9f44df03fe12
+Create Date: 2026-10-18 15:00:00.000000+00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "c52e7a1d9b38"
+down_revision = "9f44df03fe12"
+branch_labels = None
+depends_on = None
+
+users = sa.table("users", sa.column("id", sa.Integer()), sa.column("permission_groups", sa.String()))
+groups = sa.table("user_permission_groups", sa.column("user_id", sa.Integer()), sa.column("name", sa.String()))
+
+
+def upgrade() -> None:
+    op.create_index("ix_servers_user_id", "servers", ["user_id"], unique=False)
+    not_deleted = sa.column("is_deleted", sa.Boolean()) == sa.false()
+    op.create_index(
+        "ix_servers_active_name",
+        "servers",
+        ["name"],
+        unique=False,
+        postgresql_where=not_deleted,
+        sqlite_where=not_deleted,
+    )
+    admin = sa.column("is_admin", sa.Boolean()) == sa.true()
+    op.create_index("ix_users_admins", "users", ["id"], unique=False, postgresql_where=admin, sqlite_where=admin)
+
+    op.create_table(
+        "user_permission_groups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "name", name="uq_user_permission_groups_user_id_name"),
+    )
+    op.create_index("ix_user_permission_groups_name", "user_permission_groups", ["name"], unique=False)
+
+    connection = op.get_bind()
+    rows = [
+        {"user_id": user_id, "name": name}
+        for user_id, value in connection.execute(sa.select(users.c.id, users.c.permission_groups))
+        for name in sorted(set(filter(None, (value or "").split(","))))
+    ]
+    if rows:
+        op.bulk_insert(groups, rows)
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("permission_groups")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(
+            sa.Column("permission_groups", sa.String(length=255), nullable=False, server_default="user")
+        )
+    connection = op.get_bind()
+    memberships: dict[int, list[str]] = {}
+    for user_id, name in connection.execute(sa.select(groups.c.user_id, groups.c.name).order_by(groups.c.name)):
+        memberships.setdefault(user_id, []).append(name)
+    for user_id, names in memberships.items():
+        connection.execute(users.update().where(users.c.id == user_id).values(permission_groups=",".join(names)))
+
+    op.drop_index("ix_user_permission_groups_name", table_name="user_permission_groups")
+    op.drop_table("user_permission_groups")
+    op.drop_index("ix_users_admins", table_name="users")
+    op.drop_index("ix_servers_active_name", table_name="servers")
+    op.drop_index("ix_servers_user_id", table_name="servers")
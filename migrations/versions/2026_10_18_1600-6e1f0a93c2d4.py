@@ -0,0 +1,29 @@
+"""Add revoked tokens.
+
+Revision ID: 6e1f0a93c2d4
+Revises: c52e7a1d9b38
+Create Date: 2026-10-18 16:00:00.000000+00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "6e1f0a93c2d4"
+down_revision = "c52e7a1d9b38"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("jti", sa.String(length=255), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("jti"),
+    )
+    op.create_index(op.f("ix_revoked_tokens_expires_at"), "revoked_tokens", ["expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_revoked_tokens_expires_at"), table_name="revoked_tokens")
+    op.drop_table("revoked_tokens")
@@ -0,0 +1,37 @@
+"""Add rate limit buckets and slots.
+
+Revision ID: 3b8e5d27f41a
+Revises: 6e1f0a93c2d4
+Create Date: 2026-10-18 17:00:00.000000+00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "3b8e5d27f41a"
+down_revision = "6e1f0a93c2d4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_table(
+        "rate_limit_slots",
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("slot", sa.Integer(), nullable=False),
+        sa.Column("owner", sa.String(length=32), nullable=False),
+        sa.Column("expires_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key", "slot"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_slots")
+    op.drop_table("rate_limit_buckets")
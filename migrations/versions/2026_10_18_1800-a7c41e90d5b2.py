@@ -0,0 +1,25 @@
+"""Add rate limit slots of jobs.
+
+Revision ID: a7c41e90d5b2
+Revises: 3b8e5d27f41a
+Create Date: 2026-10-18 18:00:00.000000+00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "a7c41e90d5b2"
+down_revision = "3b8e5d27f41a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("slot_key", sa.String(length=255), nullable=True))
+    op.add_column("jobs", sa.Column("slot_owner", sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("slot_owner")
+        batch_op.drop_column("slot_key")
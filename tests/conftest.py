@@ -0,0 +1,3 @@
+"""Pytest configuration."""
+
+pytest_plugins = ["tests.fixtures"]
@@ -1,9 +1,27 @@
 """Fixtures for tests."""
 
 import pytest
-from fastapi.testclient import TestClient
 
-from lxdapi import app
+from lxdapi.core.config import Config
+from lxdapi.core.database import Base, dispose_engines, get_engine
+from lxdapi.core.security import principals
 
-# @pytest.fixture(scope="session")
-# def example() -> str:
+
+@pytest.fixture
+async def database(tmp_path, monkeypatch) -> Config:
+    """Point DATABASE_URL to an empty SQLite database with all tables.
+
+    Returns:
+        Config: Config of the database.
+    """
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path}/test.db")
+    config = Config.from_env()
+    async with get_engine(config).begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield config
+    await dispose_engines()
+    # Cached rows belong to this database
+    for mapper in Base.registry.mappers:
+        if getattr(mapper.class_, "cache", None) is not None:
+            mapper.class_.cache.clear()
+    principals.clear()
@@ -0,0 +1,202 @@
+"""Stubs shared by tests."""
+from asyncio import Queue
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Sequence
+from urllib.parse import parse_qsl, urlsplit
+
+from aiolxd import AbstractTransport
+from aiolxd.entities.response import (
+    AsyncResponse,
+    BaseResponse,
+    ErrorResponse,
+    StatusCode,
+    SyncResponse,
+)
+from aiolxd.exceptions import AioLXDResponseTypeError
+from aiolxd.transport import RequestMethod
+
+from lxdapi.core.config import Config
+from lxdapi.core.lxd import LXDClient
+
+
+def instance_document(name: str, recursion: int = 1) -> dict[str, Any]:
+    """Return a minimal but valid LXD instance document."""
+    document: dict[str, Any] = {
+        "architecture": "x86_64",
+        "created_at": "2023-01-01T00:00:00Z",
+        "last_used_at": "2023-01-01T00:00:00Z",
+        "location": "none",
+        "name": name,
+        "profiles": ["default"],
+        "project": "default",
+        "restore": None,
+        "stateful": False,
+        "status": "Running",
+        "status_code": 103,
+        "type": "virtual-machine",
+        "description": "",
+        "devices": {},
+        "ephemeral": False,
+        "config": {},
+        "expanded_config": {"limits.cpu": "2", "limits.memory": "2GiB"},
+        "expanded_devices": {"root": {"path": "/", "pool": "default", "type": "disk", "size": "10GiB"}},
+    }
+    if recursion > 1:
+        document["state"] = {
+            "status": "Running",
+            "cpu": {"usage": 1000},
+            "memory": {"usage": 2048},
+            "disk": {"root": {"usage": 4096}},
+            "processes": 10,
+            "network": {
+                "eth0": {
+                    "addresses": [
+                        {"family": "inet", "address": "10.0.0.2", "scope": "global"},
+                        {"family": "inet6", "address": "fe80::1", "scope": "link"},
+                    ]
+                }
+            },
+        }
+    return document
+
+
+class StubTransport(AbstractTransport):  # type: ignore[misc]
+    """In-memory LXD transport answering with canned documents."""
+
+    def __init__(self, instances: int = 50) -> None:
+        """Create transport with given number of instances."""
+        self.names = [f"instance-{i}" for i in range(instances)]
+        self.calls = 0
+        self.operations: dict[str, dict[str, Any]] = {}
+
+    async def request(
+        self,
+        method: RequestMethod,
+        path: str,
+        data: dict[str, Any] | None = None,
+        *,
+        recursion: bool | None = None,
+        filter: str | None = None,
+    ) -> BaseResponse:
+        """Answer server, instance listing and instance operation requests."""
+        self.calls += 1
+        url = urlsplit(path)
+        path = url.path
+        query = dict(parse_qsl(url.query))
+        if recursion is not None:
+            query["recursion"] = "1" if recursion else "0"
+        metadata: Any
+        if path == "/1.0":
+            metadata = {
+                "api_extensions": [],
+                "api_status": "stable",
+                "api_version": "1.0",
+                "auth": "trusted",
+                "public": False,
+                "auth_methods": ["tls"],
+            }
+        elif path == "/1.0/instances" and int(query.get("recursion", "0")):
+            metadata = [instance_document(name, int(query["recursion"])) for name in self.names]
+        elif path == "/1.0/instances" and method == RequestMethod.GET:
+            metadata = [f"/1.0/instances/{name}" for name in self.names]
+        elif path == "/1.0/instances" and method == RequestMethod.POST and data is not None:
+            self.names.append(data["name"])
+            return self.operation("Creating instance", data["name"])
+        elif path == "/1.0/operations":
+            metadata = {}
+            for operation in self.operations.values():
+                metadata.setdefault(operation["status"].lower(), []).append(operation)
+        elif path.startswith("/1.0/operations/"):
+            operation_id = path.removeprefix("/1.0/operations/").removesuffix("/wait")
+            if operation_id not in self.operations:
+                error = ErrorResponse(type_="error", metadata=None, error="Not found", error_code=StatusCode.NOT_FOUND)
+                raise AioLXDResponseTypeError(error)
+            metadata = self.operations[operation_id]
+        elif path.startswith("/1.0/instances/"):
+            name, _, action = path.removeprefix("/1.0/instances/").partition("/")
+            if name not in self.names:
+                error = ErrorResponse(type_="error", metadata=None, error="Not found", error_code=StatusCode.NOT_FOUND)
+                raise AioLXDResponseTypeError(error)
+            if method == RequestMethod.DELETE and not action:
+                self.names.remove(name)
+                return self.operation("delete", name)
+            if method == RequestMethod.PUT and action == "state" and data is not None:
+                return self.operation(data["action"], name)
+            if method == RequestMethod.GET and not action:
+                metadata = instance_document(name)
+            elif method == RequestMethod.GET and action == "state":
+                metadata = instance_document(name, recursion=2)["state"]
+            else:
+                raise NotImplementedError(f"{method.value} {path}")
+        else:
+            raise NotImplementedError(f"{method.value} {path}")
+        return SyncResponse(type_="sync", metadata=metadata, status="Success", status_code=StatusCode.SUCCESS)
+
+    def operation(self, description: str, name: str) -> AsyncResponse:
+        """Return response of a newly created background operation."""
+        operation_id = f"operation-{len(self.operations)}"
+        self.operations[operation_id] = {
+            "id": operation_id,
+            "class": "task",
+            "description": description,
+            "status": "Running",
+            "status_code": StatusCode.RUNNING.value,
+            "resources": {"instances": [f"/1.0/instances/{name}"]},
+            "metadata": None,
+            "may_cancel": False,
+            "err": "",
+            "created_at": "2023-01-01T00:00:00Z",
+            "updated_at": "2023-01-01T00:00:00Z",
+        }
+        return AsyncResponse(
+            type_="async",
+            metadata=self.operations[operation_id],
+            status="Operation created",
+            status_code=StatusCode.OPERTAINON_CREATED,
+            operation=f"/1.0/operations/{operation_id}",
+            transport=self,
+        )
+
+    def finish(self, operation_id: str) -> dict[str, Any]:
+        """Mark operation as succeeded and return the matching LXD event."""
+        operation = self.operations[operation_id] = {
+            **self.operations[operation_id],
+            "status": "Success",
+            "status_code": StatusCode.SUCCESS.value,
+        }
+        return {"type": "operation", "project": "default", "metadata": operation}
+
+    async def websocket(self) -> None:
+        """Do not open an event stream."""
+
+
+class StubLXDClient(LXDClient):
+    """LXD client using `StubTransport` and an in-memory events stream.
+
+    Put events into `event_queue` to deliver them, put None to drop the stream.
+    """
+
+    def __init__(self, config: Config, instances: int = 50) -> None:
+        """Create client with given number of instances."""
+        self.transport = StubTransport(instances)
+        super().__init__(config, transport=self.transport)
+        self.event_queue: Queue[dict[str, Any] | None] = Queue()
+
+    @asynccontextmanager
+    async def subscribe_events(self, types: Sequence[str]) -> AsyncIterator[AsyncIterator[dict[str, Any]]]:
+        """Yield events from `event_queue` until None is received."""
+
+        async def iterate() -> AsyncIterator[dict[str, Any]]:
+            while (event := await self.event_queue.get()) is not None:
+                yield event
+
+        yield iterate()
+
+
+def lifecycle_event(action: str, name: str, **context: Any) -> dict[str, Any]:
+    """Return LXD lifecycle event for an instance."""
+    return {
+        "type": "lifecycle",
+        "project": "default",
+        "metadata": {"action": action, "source": f"/1.0/instances/{name}", "context": context},
+    }
@@ -0,0 +1,83 @@
+"""Test JWT verification."""
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+
+import pytest
+from jose import jwt
+
+from lxdapi.core.config import Config
+from lxdapi.core.database import get_session_maker
+from lxdapi.core.exceptions.jwt import (
+    TokenInvalidException,
+    TokenRevokedException,
+)
+from lxdapi.models import RevokedTokenModel
+from lxdapi.utils.auth import (
+    ALGORITHM,
+    JWTVerifier,
+    decode,
+    encode,
+    timegm_delta,
+)
+
+
+def test_verify():
+    """Test valid tokens are verified and cached, invalid ones rejected."""
+    verifier = JWTVerifier("secret")
+    token = jwt.encode({"sub": "1", "exp": timegm_delta(minutes=5)}, "secret", algorithm=ALGORITHM)
+    assert verifier.verify(token)["sub"] == "1"
+    assert verifier.verify(token) is verifier.verify(token)
+
+    with pytest.raises(TokenInvalidException):
+        verifier.verify(jwt.encode({"sub": "1"}, "other", algorithm=ALGORITHM))
+    with pytest.raises(TokenInvalidException):
+        verifier.verify("not a token")
+    expired = jwt.encode({"sub": "1", "exp": timegm_delta(minutes=-1)}, "secret", algorithm=ALGORITHM)
+    with pytest.raises(TokenInvalidException):
+        verifier.verify(expired)
+
+
+def test_verify_cache_expiration():
+    """Test cached tokens are not used after they expire."""
+    verifier = JWTVerifier("secret")
+    token = jwt.encode({"sub": "1", "exp": timegm_delta(seconds=1)}, "secret", algorithm=ALGORITHM)
+    verifier.verify(token)
+    [(expires, _)] = verifier._cache._entries.values()
+    assert expires - monotonic() <= 1
+
+
+def test_revoke():
+    """Test revoked tokens are rejected, cached or not."""
+    verifier = JWTVerifier("secret")
+    token = jwt.encode({"sub": "1", "jti": "a"}, "secret", algorithm=ALGORITHM)
+    verifier.verify(token)
+    verifier.revoke("a")
+    with pytest.raises(TokenRevokedException):
+        verifier.verify(token)
+    verifier.set_revoked([])
+    assert verifier.verify(token)["jti"] == "a"
+
+
+def test_decode():
+    """Test decode with a shared verifier doesn't change default options."""
+    config = Config.from_env()
+    token = encode(config, {"sub": "1", "jti": "a"})
+    assert decode(config, token)["sub"] == "1"
+    assert decode(config, token, {"verify_sub": False})["sub"] == "1"
+    assert decode.__defaults__ == (None,)
+
+
+async def test_sync(database):
+    """Test revoked tokens are loaded from the database until they expire."""
+    now = datetime.now(timezone.utc)
+    async with get_session_maker(database)() as db:
+        await RevokedTokenModel.revoke(db, "a", now + timedelta(minutes=5))
+        await RevokedTokenModel.revoke(db, "a", now + timedelta(minutes=5))
+        await RevokedTokenModel.revoke(db, "b", now - timedelta(minutes=5))
+        await db.commit()
+        verifier = JWTVerifier("secret")
+        await verifier.sync(db)
+        assert verifier.revoked == {"a"}
+        await RevokedTokenModel.remove_expired(db)
+        await db.commit()
+        assert await RevokedTokenModel.get(db, "b") is None
@@ -0,0 +1,35 @@
+"""Test cron expressions."""
+from datetime import datetime
+
+import pytest
+
+from lxdapi.utils.cron import CronExpression
+
+
+@pytest.mark.parametrize(
+    "expression, moment, expected",
+    [
+        ("*/5 * * * *", datetime(2022, 1, 1, 0, 1), datetime(2022, 1, 1, 0, 5)),
+        ("0 9 * * 1-5", datetime(2022, 1, 1, 10, 0), datetime(2022, 1, 3, 9, 0)),
+        ("0 0 29 2 *", datetime(2022, 3, 1), datetime(2024, 2, 29)),
+        ("@hourly", datetime(2022, 12, 31, 23, 30), datetime(2023, 1, 1)),
+        ("0 0 1 * 7", datetime(2022, 1, 1), datetime(2022, 1, 2)),
+        ("30 12 * * *", datetime(2022, 1, 1, 12, 30), datetime(2022, 1, 2, 12, 30)),
+    ],
+)
+def test_cron_next_after(expression, moment, expected):
+    """Test next matching minute is found."""
+    assert CronExpression(expression).next_after(moment) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * *", "60 * * * *", "*/0 * * * *", "a * * * *"])
+def test_cron_invalid(expression):
+    """Test malformed expressions are rejected."""
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_cron_never_matches():
+    """Test impossible dates are reported."""
+    with pytest.raises(ValueError):
+        CronExpression("0 0 31 2 *").next_after(datetime(2022, 1, 1))
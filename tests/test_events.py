@@ -0,0 +1,57 @@
+"""Test LXD events fan-out."""
+import pytest
+
+from lxdapi.core.config import Config
+from lxdapi.core.exceptions.lxd import (
+    InvalidEventTypeException,
+    TooManySubscribersException,
+)
+from lxdapi.core.lxd import LXDClient, Subscription
+
+from .stubs import StubTransport, lifecycle_event
+
+
+def test_subscription_filters():
+    """Test events are filtered by type and instance."""
+    subscription = Subscription(types=["lifecycle"], instances=["web"])
+    assert subscription.matches(lifecycle_event("instance-started", "web"))
+    assert not subscription.matches(lifecycle_event("instance-started", "db"))
+    operation = {"type": "operation", "metadata": {"resources": {"instances": ["/1.0/instances/web"]}}}
+    assert not subscription.matches(operation)
+    assert Subscription(instances=["web"]).matches(operation)
+
+
+async def test_subscription_slow_consumer():
+    """Test oldest events are dropped and stuck subscribers are closed."""
+    subscription = Subscription(max_size=2, max_dropped=2)
+    for i in range(4):
+        subscription.put({"id": i})
+    assert subscription.dropped == 2
+    assert await subscription.get() == {"id": 2}
+    assert await subscription.get(timeout=0.01) == {"id": 3}
+    assert await subscription.get(timeout=0.01) is None
+
+    for i in range(5):
+        subscription.put({"id": i})
+    assert subscription.closed
+    assert await subscription.get() is None
+
+
+async def test_event_stream_subscribe():
+    """Test stream fans events out to subscriptions."""
+    client = LXDClient(Config.from_env(), transport=StubTransport())
+    events = client.events
+    events.max_subscribers = 1
+    subscription = events.subscribe(instances=["web"])
+    with pytest.raises(TooManySubscribersException):
+        events.subscribe()
+
+    events.dispatch(lifecycle_event("instance-started", "db"))
+    events.dispatch(lifecycle_event("instance-started", "web"))
+    assert (await subscription.get())["metadata"]["source"] == "/1.0/instances/web"
+
+    events.unsubscribe(subscription)
+    assert subscription.closed
+    assert events.subscribers == 0
+    with pytest.raises(InvalidEventTypeException):
+        events.subscribe(types=["logging"])
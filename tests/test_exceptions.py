@@ -0,0 +1,14 @@
+"""Test API exceptions."""
+from lxdapi.core.exceptions.auth import NotAuthenticatedException
+from lxdapi.core.exceptions.lxd import OperationNotFoundException
+
+
+def test_exception_chain():
+    """Test every exception class gets its own chain."""
+    assert NotAuthenticatedException().exception_chain == ["NotAuthenticatedException", "UnauthorizedException"]
+    assert OperationNotFoundException().exception_chain == [
+        "OperationNotFoundException",
+        "LXDException",
+        "NotFoundException",
+    ]
+    assert NotAuthenticatedException().exception_chain == ["NotAuthenticatedException", "UnauthorizedException"]
@@ -0,0 +1,60 @@
+"""Test instance inventory cache."""
+from asyncio import sleep
+from dataclasses import replace
+
+from lxdapi.core.config import Config
+from lxdapi.core.lxd.inventory import instance_name
+
+from .stubs import StubLXDClient, lifecycle_event
+
+
+async def settle() -> None:
+    """Let the events stream task run."""
+    for _ in range(5):
+        await sleep(0)
+
+
+def test_instance_name():
+    """Test instance name parsing."""
+    assert instance_name("/1.0/instances/web") == "web"
+    assert instance_name("/1.0/instances/web?project=default") == "web"
+    assert instance_name("/1.0/instances/web/state") is None
+    assert instance_name("/1.0/images/web") is None
+
+
+async def test_inventory_follows_events():
+    """Test names are updated from events without refetching."""
+    client = StubLXDClient(Config.from_env(), instances=2)
+    await client.start()
+    await settle()
+    assert client.events.connected
+
+    assert await client.inventory.names() == ["instance-0", "instance-1"]
+    calls = client.transport.calls
+
+    client.event_queue.put_nowait(lifecycle_event("instance-created", "web"))
+    client.event_queue.put_nowait(lifecycle_event("instance-deleted", "instance-0"))
+    client.event_queue.put_nowait(lifecycle_event("instance-renamed", "db", old_name="instance-1"))
+    await settle()
+
+    assert await client.inventory.names() == ["db", "web"]
+    assert client.transport.calls == calls
+    assert await client.inventory.names(fresh=True) == ["instance-0", "instance-1"]
+    assert client.transport.calls == calls + 1
+    await client.close()
+
+
+async def test_inventory_ttl_without_events():
+    """Test names are refetched after TTL when the events stream is down."""
+    client = StubLXDClient(replace(Config.from_env(), LXD_INVENTORY_TTL=0), instances=1)
+    await client.start()
+    await settle()
+    client.event_queue.put_nowait(None)
+    await settle()
+    assert not client.events.connected
+
+    assert await client.inventory.names() == ["instance-0"]
+    client.transport.names.append("instance-1")
+    assert await client.inventory.names() == ["instance-0", "instance-1"]
+    assert client.inventory.misses == 2
+    await client.close()
@@ -0,0 +1,103 @@
+"""Test JWT key sets."""
+import json
+from dataclasses import replace
+
+import pytest
+from ecdsa import NIST256p, SigningKey
+from jose import jwk, jwt
+
+from lxdapi.core.config import Config
+from lxdapi.core.exceptions.jwt import TokenInvalidException
+from lxdapi.utils.auth import JWTVerifier, decode, encode
+from lxdapi.utils.jwks import KeySet
+
+
+def _jwk(kid: str) -> dict:
+    """Generate private ES256 JWK."""
+    key = jwk.construct(SigningKey.generate(curve=NIST256p).to_pem().decode(), "ES256")
+    return {**key.to_dict(), "kid": kid}
+
+
+def _public(data: dict) -> dict:
+    """Return public part of JWK."""
+    return {key: value for key, value in data.items() if key != "d"}
+
+
+def _sign(data: dict, claims: dict) -> str:
+    """Sign claims with private JWK."""
+    return jwt.encode(claims, data, algorithm=data["alg"], headers={"kid": data["kid"]})
+
+
+def test_key_set_rotation(tmp_path):
+    """Test keys are reloaded and retired keys are accepted during the rotation window."""
+    old, new = _jwk("old"), _jwk("new")
+    path = tmp_path / "jwks.json"
+    path.write_text(json.dumps({"keys": [_public(old)]}))
+    key_set = KeySet(str(path), rotation_window=60)
+    verifier = JWTVerifier("secret", key_set=key_set)
+    old_token = _sign(old, {"sub": "1"})
+    assert verifier.verify(old_token)["sub"] == "1"
+    with pytest.raises(TokenInvalidException):
+        verifier.verify(_sign(new, {"sub": "2"}))
+
+    path.write_text(json.dumps({"keys": [_public(new)]}))
+    assert key_set.refresh()
+    assert not key_set.refresh()
+    assert verifier.verify(_sign(new, {"sub": "2"}))["sub"] == "2"
+    assert verifier.verify(_sign(old, {"sub": "3"}))["sub"] == "3"
+
+    key_set.rotation_window = 0
+    with pytest.raises(TokenInvalidException):
+        verifier.verify(_sign(old, {"sub": "4"}))
+    # Tokens with a key ID are never verified with the secret
+    with pytest.raises(TokenInvalidException):
+        verifier.verify(jwt.encode({"sub": "5"}, "secret", headers={"kid": "old"}))
+    assert verifier.verify(jwt.encode({"sub": "6"}, "secret"))["sub"] == "6"
+
+
+def test_key_set_invalid(tmp_path):
+    """Test invalid key sets are rejected, and the current keys kept."""
+    (tmp_path / "a.json").write_text(json.dumps(_public(_jwk("a"))))
+    key_set = KeySet(str(tmp_path))
+    (tmp_path / "b.json").write_text(json.dumps({"kty": "EC", "alg": "HS256", "kid": "b"}))
+    with pytest.raises(ValueError):
+        key_set.refresh()
+    assert key_set.get("a") is not None
+    with pytest.raises(ValueError):
+        KeySet(str(tmp_path / "a.json"), signing_key_id="a")
+
+
+def test_encode_with_key_set(tmp_path, monkeypatch):
+    """Test tokens are signed with the private key of the key set."""
+    private = _jwk("a")
+    (tmp_path / "private.json").write_text(json.dumps(private))
+    (tmp_path / "other.json").write_text(json.dumps(_public(_jwk("b"))))
+    config = replace(Config.from_env(), JWT_KEYS_PATH=str(tmp_path), JWT_SIGNING_KEY_ID="a")
+    token = encode(config, {"sub": "1"})
+    assert jwt.get_unverified_header(token)["kid"] == "a"
+    assert decode(config, token)["sub"] == "1"
+    # Nodes with only the public key verify it
+    public = tmp_path / "public"
+    public.mkdir()
+    (public / "jwks.json").write_text(json.dumps({"keys": [_public(private)]}))
+    assert decode(replace(config, JWT_KEYS_PATH=str(public), JWT_SIGNING_KEY_ID=""), token)["sub"] == "1"
+
+
+def test_require_key_id(tmp_path):
+    """Test tokens without a string key ID are rejected when key sets are used."""
+    private = _jwk("a")
+    (tmp_path / "jwks.json").write_text(json.dumps({"keys": [_public(private)]}))
+    verifier = JWTVerifier("secret", key_set=KeySet(str(tmp_path)), require_key_id=True)
+    assert verifier.verify(_sign(private, {"sub": "1"}))["sub"] == "1"
+    with pytest.raises(TokenInvalidException):
+        verifier.verify(jwt.encode({"sub": "2"}, "secret"))
+    for kid in (["a"], {"a": 1}, 1):
+        with pytest.raises(TokenInvalidException):
+            verifier.verify(jwt.encode({"sub": "3"}, private, algorithm="ES256", headers={"kid": kid}))
+
+    config = replace(Config.from_env(), JWT_KEYS_PATH="", JWT_SIGNING_KEY_ID="", JWT_REQUIRE_KEY_ID=None)
+    token = encode(config, {"sub": "4"})
+    with_keys = replace(config, JWT_KEYS_PATH=str(tmp_path))
+    with pytest.raises(TokenInvalidException):
+        decode(with_keys, token)
+    assert decode(replace(with_keys, JWT_REQUIRE_KEY_ID=False), token)["sub"] == "4"
@@ -0,0 +1,47 @@
+"""Test worker leases."""
+from asyncio import gather
+from dataclasses import replace
+
+from lxdapi.core.database import get_session_maker
+from lxdapi.models import LeaseModel
+from lxdapi.worker import Cron, Worker
+
+
+async def test_lease_claim(database):
+    """Test a slot is claimed once and an expired lease is taken over."""
+    async with get_session_maker(database)() as db:
+        assert await LeaseModel.claim(db, "job", "a", 1, ttl=60)
+        assert not await LeaseModel.claim(db, "job", "b", 1, ttl=60)
+        # Still held by a
+        assert not await LeaseModel.claim(db, "job", "b", 2, ttl=60)
+        assert await LeaseModel.renew(db, "job", "a", 1, ttl=60)
+        await LeaseModel.release(db, "job", "a", 1)
+        assert await LeaseModel.claim(db, "job", "b", 2, ttl=0)
+        assert not await LeaseModel.renew(db, "job", "a", 1, ttl=60)
+        # Expired lease of a failed worker
+        assert await LeaseModel.claim(db, "job", "a", 3, ttl=60)
+        await db.commit()
+
+
+async def test_distributed_workers(database):
+    """Test each slot of a job runs on one worker only."""
+    runs = []
+
+    async def job() -> None:
+        runs.append(1)
+
+    workers = []
+    for worker_id in ("a", "b", "c"):
+        worker = Worker()
+        worker.config = replace(database, WORKER_DISTRIBUTED=True, WORKER_ID=worker_id)
+        worker.cron = [Cron(job, every=0.2)]
+        workers.append(worker)
+    for worker in workers:
+        worker._start(worker.cron[0], slot=1.0)
+    await gather(*(task for worker in workers for task in worker.cron[0].running))
+    assert len(runs) == 1
+
+    for worker in workers:
+        worker._start(worker.cron[0], slot=2.0)
+    await gather(*(task for worker in workers for task in worker.cron[0].running))
+    assert len(runs) == 2
@@ -0,0 +1,147 @@
+"""Test LXD client lifecycle."""
+from asyncio import CancelledError, Event, create_task, sleep
+from dataclasses import replace
+
+import pytest
+from aiolxd.exceptions import AioLXDResponseTypeError
+
+from lxdapi.core.config import Config
+from lxdapi.core.exceptions.lxd import (
+    LXDNotReadyException,
+    LXDOverloadedException,
+    LXDQueueTimeoutException,
+)
+from lxdapi.core.lxd import AdmissionController, LXDClient
+from lxdapi.core.lxd.instances import change_state, delete_instance
+
+from .stubs import StubTransport
+
+
+async def test_lxd_client_not_ready():
+    """Test client is not handed out before start."""
+    client = LXDClient(Config.from_env(), transport=StubTransport())
+    assert not client.is_ready
+    with pytest.raises(LXDNotReadyException):
+        client.lxd
+
+
+async def test_lxd_client_start():
+    """Test client starts, warms up the pool and closes."""
+    transport = StubTransport()
+    client = LXDClient(Config.from_env(), transport=transport)
+    await client.start()
+    assert client.is_ready
+    # Requests are admitted by the client controller
+    assert client.lxd.transport.transport is transport
+    assert client.admission.admitted == transport.calls
+    assert transport.calls == Config.from_env().LXD_WARM_CONNECTIONS
+    await client.close()
+    assert not client.is_ready
+
+
+async def test_admission():
+    """Test requests over the limit wait in order, and are shed when the queue is full."""
+    admission = AdmissionController(max_concurrency=1, max_queue=2, queue_timeout=1)
+    release = Event()
+    order = []
+
+    async def request(name: str) -> None:
+        async with admission.slot():
+            order.append(name)
+            await release.wait()
+
+    tasks = [create_task(request(name)) for name in "abc"]
+    await sleep(0)
+    assert (admission.in_flight, admission.queued) == (1, 2)
+    with pytest.raises(LXDOverloadedException):
+        await request("d")
+    release.set()
+    for task in tasks:
+        await task
+    assert order == ["a", "b", "c"]
+    assert (admission.in_flight, admission.queued, admission.admitted, admission.rejected) == (0, 0, 3, 1)
+
+
+async def hold_slot(admission: AdmissionController) -> None:
+    """Hold a slot of admission."""
+    async with admission.slot():
+        pass
+
+
+async def test_admission_timeout():
+    """Test requests are rejected after the queue timeout, and cancelled ones leave the queue."""
+    admission = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=0.01)
+    async with admission.slot():
+        with pytest.raises(LXDQueueTimeoutException):
+            await hold_slot(admission)
+        admission.queue_timeout = 10
+        waiting = create_task(hold_slot(admission))
+        await sleep(0)
+        waiting.cancel()
+        with pytest.raises(CancelledError):
+            await waiting
+        assert admission.queued == 0 and admission.timed_out == 1
+    assert admission.in_flight == 0
+    async with admission.slot():
+        assert admission.in_flight == 1
+
+
+async def test_admission_waiter_dropped():
+    """Test a waiter cancelled and dropped by a release in the same tick leaves cleanly."""
+    admission = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=10)
+    async with admission.slot():
+        waiting = create_task(hold_slot(admission))
+        await sleep(0)
+        admission._waiters[0].cancel()
+    with pytest.raises(CancelledError):
+        await waiting
+    assert (admission.in_flight, admission.queued) == (0, 0)
+
+
+class ParkedWaitTransport(StubTransport):
+    """Stub transport holding operation waits until `released` is set."""
+
+    def __init__(self, instances: int = 1) -> None:
+        """Create transport."""
+        super().__init__(instances)
+        self.released = Event()
+        self.parked = 0
+
+    async def request(self, method, path, data=None, **kwargs):
+        """Hold operation waits, answer other requests right away."""
+        if path.split("?")[0].endswith("/wait"):
+            self.parked += 1
+            await self.released.wait()
+        return await super().request(method, path, data, **kwargs)
+
+
+async def test_admission_operation_wait():
+    """Test a parked operation wait doesn't hold an admission slot."""
+    transport = ParkedWaitTransport()
+    client = LXDClient(replace(Config.from_env(), LXD_MAX_CONCURRENCY=1, LXD_QUEUE_TIMEOUT=0.1), transport=transport)
+    await client.start()
+    operation_id = await change_state(client.lxd, "instance-0", "start")
+    # Events are not available with the stub transport, so the wait is sent to LXD
+    waiting = create_task(client.operations.wait(operation_id, 5))
+    await sleep(0.01)
+    assert transport.parked == 1
+    assert client.admission.in_flight == 0
+    await client.lxd.transport.get("/1.0")
+
+    transport.finish(operation_id)
+    transport.released.set()
+    assert (await waiting)["status"] == "Success"
+    await client.close()
+
+
+async def test_instance_name_quoted():
+    """Test instance names can't change the LXD request path."""
+    transport = StubTransport(instances=1)
+    client = LXDClient(Config.from_env(), transport=transport)
+    await client.start()
+    name = "instance-0?project=other"
+    for request in (change_state(client.lxd, name, "start"), delete_instance(client.lxd, name)):
+        with pytest.raises(AioLXDResponseTypeError):
+            await request
+    assert transport.names == ["instance-0"] and not transport.operations
+    await client.close()
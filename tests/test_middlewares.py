@@ -0,0 +1,78 @@
+"""Test middlewares."""
+from typing import AsyncIterator
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lxdapi.core.config import Config
+from lxdapi.core.database import get_session_maker
+from lxdapi.core.middlewares import ConfigMiddleware, DBAsyncSessionMiddleware
+from lxdapi.dependencies.database import get_db
+from lxdapi.models import UserModel
+
+
+def test_config_middleware():
+    """Test config is set in request state."""
+    config = Config.from_env()
+    app = FastAPI()
+
+    @app.get("/")
+    async def endpoint(request: Request) -> bool:
+        return request.state.config is config
+
+    app.add_middleware(ConfigMiddleware, config=config)
+    with TestClient(app) as client:
+        assert client.get("/").json() is True
+
+
+def test_db_session_is_lazy():
+    """Test database session is created only when a route asks for it."""
+    sessions = []
+    app = FastAPI()
+
+    @app.get("/without-db")
+    async def without_db(request: Request) -> None:
+        sessions.append(request.state.db)
+
+    @app.get("/with-db")
+    async def with_db(request: Request, db: AsyncSession = Depends(get_db)) -> int:
+        sessions.append(request.state.db)
+        return (await db.execute(text("SELECT 1"))).scalar_one()
+
+    app.add_middleware(DBAsyncSessionMiddleware, config=Config.from_env())
+    with TestClient(app) as client:
+        client.get("/without-db")
+        assert client.get("/with-db").json() == 1
+
+    assert [db.is_used for db in sessions] == [False, True]
+
+
+def test_db_session_commit_before_response(database):
+    """Test changes are committed before the response starts, and a failed commit is returned as an error."""
+    app = FastAPI()
+
+    @app.post("/users")
+    async def create(email: str, db: AsyncSession = Depends(get_db)) -> StreamingResponse:
+        db.add(UserModel(email=email))
+
+        async def body() -> AsyncIterator[str]:
+            async with get_session_maker(database)() as other:
+                yield str(await UserModel.get_by_keys(other, email=email) is not None)
+
+        return StreamingResponse(body())
+
+    @app.post("/duplicate")
+    async def duplicate(db: AsyncSession = Depends(get_db)) -> bool:
+        db.add_all([UserModel(email="b@example.com"), UserModel(email="b@example.com")])
+        return True
+
+    app.add_middleware(DBAsyncSessionMiddleware, config=database)
+    with TestClient(app) as client:
+        response = client.post("/users", params={"email": "a@example.com"})
+        assert (response.status_code, response.text) == (200, "True")
+        response = client.post("/duplicate")
+        assert response.status_code == 500
+        assert response.json()["error_code"] == "DatabaseException"
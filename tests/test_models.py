@@ -0,0 +1,268 @@
+"""Test model helpers."""
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import load_only, selectinload
+
+from lxdapi.core.database import get_session_maker
+from lxdapi.core.exceptions.common import InvalidCursorException
+from lxdapi.core.security import Principal, principals
+from lxdapi.models import ServerModel, UserModel, UserPermissionGroupModel
+
+
+def _server(name: str, **values):
+    """Return column values of a server."""
+    return {"name": name, "cpu": 1, "memory": 512, "disk": 1024, "system": "", "ip": "", **values}
+
+
+async def test_bulk_create(database):
+    """Test rows are created and returned as models."""
+    async with get_session_maker(database)() as db:
+        servers = await ServerModel.bulk_create(db, [_server("a"), _server("b")])
+        assert sorted(server.name for server in servers) == ["a", "b"]
+        assert all(server.id and server.is_deleted is False for server in servers)
+        assert await ServerModel.bulk_create(db, []) == []
+        await db.commit()
+        assert await db.scalar(select(func.count()).select_from(ServerModel)) == 2
+
+
+async def test_bulk_upsert(database):
+    """Test existing rows are updated and new ones inserted."""
+    async with get_session_maker(database)() as db:
+        user = await UserModel.create(db, email="a@example.com")
+        users = await UserModel.bulk_upsert(
+            db,
+            [{"email": "a@example.com", "is_admin": True}, {"email": "b@example.com", "is_admin": False}],
+            index_elements=["email"],
+        )
+        assert sorted((u.email, u.is_admin) for u in users) == [("a@example.com", True), ("b@example.com", False)]
+        # Models in the session are refreshed
+        assert user.is_admin is True
+
+        users = await UserModel.bulk_upsert(
+            db, [{"email": "a@example.com", "is_admin": False}], index_elements=["email"], update_columns=[]
+        )
+        assert users == []
+        await db.commit()
+        assert (await UserModel.get_by_key(db, UserModel.email, "a@example.com")).is_admin is True
+
+
+async def test_bulk_update_by_pk(database):
+    """Test rows are updated by primary key."""
+    async with get_session_maker(database)() as db:
+        a, b = sorted(await ServerModel.bulk_create(db, [_server("a"), _server("b")]), key=lambda s: s.name)
+        await db.commit()
+        await ServerModel.bulk_update_by_pk(db, [{"id": a.id, "cpu": 2}, {"id": b.id, "cpu": 4}])
+        await ServerModel.bulk_update_by_pk(db, [])
+        await db.commit()
+        rows = (await db.execute(select(ServerModel.name, ServerModel.cpu).order_by(ServerModel.name))).all()
+        assert [tuple(row) for row in rows] == [("a", 2), ("b", 4)]
+
+
+async def test_delete_where(database):
+    """Test matching rows are deleted in one statement."""
+    async with get_session_maker(database)() as db:
+        servers = await ServerModel.bulk_create(
+            db, [_server("a"), _server("b", is_deleted=True), _server("c", is_deleted=True)]
+        )
+        ids = {server.name: server.id for server in servers}
+        await db.commit()
+        deleted = await ServerModel.delete_where(db, ServerModel.name != "c", is_deleted=True)
+        assert deleted == [ids["b"]]
+        await ServerModel.remove_by_primary(db, ids["a"])
+        await db.commit()
+        assert (await db.scalars(select(ServerModel.name))).all() == ["c"]
+
+
+async def test_remove_by_primary_cascades(database):
+    """Test dependent rows of a removed model are removed or detached."""
+    async with get_session_maker(database)() as db:
+        user = await UserModel.create(db, email="a@example.com", permission_groups=["user", "admin"])
+        server = await ServerModel.create(db, user_id=user.id, **_server("a"))
+        await db.commit()
+        user_id, server_id = user.id, server.id
+        db.expunge_all()
+
+        await UserModel.remove_by_primary(db, user_id)
+        await db.commit()
+        assert (await db.scalars(select(UserPermissionGroupModel.user_id))).all() == []
+        assert (await ServerModel.get(db, server_id)).user_id is None
+
+        # The next user doesn't inherit memberships of the removed one
+        await UserModel.create(db, id=user_id, email="b@example.com", permission_groups=["user"])
+        await db.commit()
+        groups = await db.scalars(select(UserPermissionGroupModel.name).filter_by(user_id=user_id))
+        assert groups.all() == ["user"]
+
+
+async def test_get_page(database):
+    """Test pages follow each other by cursor, with ties broken by primary key."""
+    async with get_session_maker(database)() as db:
+        await ServerModel.bulk_create(db, [_server(name, cpu=cpu) for name, cpu in zip("abcde", (2, 1, 2, 1, 2))])
+        await db.commit()
+        first = await ServerModel.get_page(db, limit=2, order_by=ServerModel.cpu)
+        assert [server.name for server in first.items] == ["b", "d"]
+        second = await ServerModel.get_page(db, limit=2, cursor=first.next_cursor, order_by=ServerModel.cpu)
+        assert [server.name for server in second.items] == ["a", "c"]
+        last = await ServerModel.get_page(db, limit=2, cursor=second.next_cursor, order_by=ServerModel.cpu)
+        assert [server.name for server in last.items] == ["e"]
+        assert last.next_cursor is None
+
+        filtered = await ServerModel.get_page(db, limit=10, cpu=1)
+        assert [server.name for server in filtered.items] == ["b", "d"]
+        with pytest.raises(InvalidCursorException):
+            await ServerModel.get_page(db, cursor=first.next_cursor)
+        with pytest.raises(ValueError):
+            await ServerModel.get_page(db, limit=0)
+
+
+async def test_iter_pages(database):
+    """Test all models are iterated in pages."""
+    async with get_session_maker(database)() as db:
+        await ServerModel.bulk_create(db, [_server(str(i)) for i in range(7)])
+        await db.commit()
+        pages = [[server.name for server in page] async for page in ServerModel.iter_pages(db, page_size=3)]
+        assert pages == [["0", "1", "2"], ["3", "4", "5"], ["6"]]
+        assert len(await ServerModel.get_list_by_keys(db, is_deleted=False)) == 7
+
+
+async def test_stream(database):
+    """Test models and column projections are streamed."""
+    async with get_session_maker(database)() as db:
+        await ServerModel.bulk_create(db, [_server(str(i), cpu=i % 2) for i in range(5)])
+        await db.commit()
+        names = [server.name async for server in ServerModel.stream(db, ServerModel.name != "0", yield_per=2, cpu=0)]
+        assert sorted(names) == ["2", "4"]
+        rows = [tuple(row) async for row in ServerModel.stream_columns(db, [ServerModel.name, ServerModel.cpu], cpu=1)]
+        assert sorted(rows) == [("1", 1), ("3", 1)]
+        # Stopping early closes the cursor
+        async for server in ServerModel.stream(db, yield_per=1):
+            break
+        assert await ServerModel.get_list_by_keys(db, cpu=1, limit=1)
+
+
+async def test_get_identity_map(database):
+    """Test models already in the session are returned without a query."""
+    async with get_session_maker(database)() as db:
+        [server] = await ServerModel.bulk_create(db, [_server("a")])
+        await db.commit()
+        await db.refresh(server)
+        statements = []
+        event.listen(db.sync_session.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        assert await ServerModel.get(db, server.id) is server
+        assert await ServerModel.get_by_key(db, ServerModel.id, server.id) is server
+        assert statements == []
+
+
+async def test_get_cache(database):
+    """Test cached users are returned without a query and invalidated on changes."""
+    maker = get_session_maker(database)
+    async with maker() as db:
+        user = await UserModel.create(db, email="a@example.com")
+        await db.commit()
+        user_id = user.id
+
+    async with maker() as db:
+        assert (await UserModel.get_by_key(db, UserModel.email, "a@example.com")).id == user_id
+    async with maker() as db:
+        statements = []
+        event.listen(db.sync_session.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        user = await UserModel.get_by_keys(db, email="a@example.com")
+        assert user.id == user_id and await UserModel.get(db, user_id) is user
+        assert statements == []
+        await user.update(db, email="b@example.com")
+        await db.commit()
+
+    async with maker() as db:
+        assert await UserModel.get_by_key(db, UserModel.email, "a@example.com") is None
+        assert (await UserModel.get(db, user_id)).email == "b@example.com"
+        await (await UserModel.get(db, user_id)).remove(db)
+        await db.commit()
+    async with maker() as db:
+        assert await UserModel.get(db, user_id) is None
+
+
+async def test_loader_options(database):
+    """Test relationships are loaded by options only, with a fixed number of statements."""
+    async with get_session_maker(database)() as db:
+        users = [await UserModel.create(db, email=f"{i}@example.com") for i in range(3)]
+        await ServerModel.bulk_create(db, [_server(f"{u.id}-{i}", user_id=u.id) for u in users for i in range(2)])
+        await db.commit()
+        db.expunge_all()
+
+        statements = []
+        event.listen(db.sync_session.bind, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        servers = await ServerModel.get_list_by_keys(db, options=[selectinload(ServerModel.user)])
+        assert {server.user.email for server in servers} == {"0@example.com", "1@example.com", "2@example.com"}
+        # No JOIN by default, one query for servers, users and permission groups each
+        assert len(statements) == 3 and "JOIN" not in statements[0]
+
+        statements.clear()
+        users = await UserModel.get_list_by_keys(db, options=[selectinload(UserModel.servers)])
+        assert sorted(len(user.servers) for user in users) == [2, 2, 2]
+        assert len(statements) == 3
+
+        db.expunge_all()
+        options = [load_only(ServerModel.name, ServerModel.user_id)]
+        [server, *_] = await ServerModel.get_list_by_keys(db, limit=1, options=options)
+        # Unloaded relationships raise instead of a query per model
+        with pytest.raises(InvalidRequestError, match="raise_on_sql"):
+            server.user
+
+
+async def test_permission_groups(database):
+    """Test permission groups are stored as memberships and cached with the user."""
+    maker = get_session_maker(database)
+    async with maker() as db:
+        user = await UserModel.create(db, email="a@example.com")
+        admin = await UserModel.create(db, email="b@example.com", permission_groups=["user", "admin"])
+        await db.commit()
+        assert user.permission_groups == {"user"}
+        assert admin.has_permission_group("admin") and not user.has_permission_group("admin")
+        assert await UserModel.get_list_by_permission_group(db, "admin") == [admin]
+        user_id = user.id
+
+    async with maker() as db:
+        await UserModel.get(db, user_id)
+    async with maker() as db:
+        # From the cache, with its groups
+        user = await UserModel.get(db, user_id)
+        assert user.permission_groups == {"user"}
+        user.permission_groups = ["admin"]
+        await user.save(db)
+        await db.commit()
+    async with maker() as db:
+        assert (await UserModel.get(db, user_id)).permission_groups == {"admin"}
+        users = await UserModel.get_list_by_permission_group(db, "admin")
+        assert sorted(user.email for user in users) == ["a@example.com", "b@example.com"]
+
+
+async def test_cache_invalidated_on_commit(database):
+    """Test values cached by other sessions between a change and its commit are removed on commit."""
+    maker = get_session_maker(database)
+    async with maker() as db:
+        user = await UserModel.create(db, email="a@example.com")
+        await db.commit()
+    async with maker() as db, maker() as other:
+        await user.update(db, is_banned=True)
+        # The change is flushed, not committed: the previous values are cached again
+        assert (await UserModel.get(other, user.id)).is_banned is False
+        principals.set(str(user.id), Principal.from_user(user))
+        await db.commit()
+        assert UserModel.cache.get(("id", user.id)) is None
+        assert principals.get(str(user.id)) is None
+
+
+async def test_cache_invalidated_on_bulk_commit(database):
+    """Test values cached by other sessions between a bulk change and its commit are removed on commit."""
+    maker = get_session_maker(database)
+    async with maker() as db:
+        user = await UserModel.create(db, email="a@example.com")
+        await db.commit()
+    async with maker() as db, maker() as other:
+        await UserModel.bulk_update_by_pk(db, [{"id": user.id, "is_banned": True}])
+        assert (await UserModel.get(other, user.id)).is_banned is False
+        principals.set(str(user.id), Principal.from_user(user))
+        await db.commit()
+        assert UserModel.cache.get(("id", user.id)) is None
+        assert principals.get(str(user.id)) is None
@@ -0,0 +1,140 @@
+"""Test LXD operations tracking."""
+from asyncio import gather, sleep
+from dataclasses import replace
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+from aiohttp import ServerTimeoutError
+
+from lxdapi.core.config import Config
+from lxdapi.core.exceptions.lxd import OperationNotFoundException
+from lxdapi.core.lxd import LXDClient
+from lxdapi.core.lxd.instances import change_state
+
+from .stubs import StubLXDClient, StubTransport
+
+
+async def started_client() -> StubLXDClient:
+    """Return started stub client with connected events stream."""
+    client = StubLXDClient(Config.from_env(), instances=1)
+    await client.start()
+    await sleep(0)
+    assert client.events.connected
+    return client
+
+
+async def test_operation_not_found():
+    """Test unknown operation."""
+    client = await started_client()
+    with pytest.raises(OperationNotFoundException):
+        await client.operations.get("missing")
+    await client.close()
+
+
+async def test_operation_id_quoted():
+    """Test operation ID can't change the LXD URL."""
+    client = await started_client()
+    operation_id = await change_state(client.lxd, "instance-0", "start")
+    calls = client.transport.calls
+    for malformed in (f"{operation_id}?project=other", f"{operation_id}/wait", ".."):
+        with pytest.raises(OperationNotFoundException):
+            await client.operations.get(malformed)
+    assert client.transport.calls == calls + 2
+    await client.close()
+
+
+async def test_waiters_share_events():
+    """Test many waiters are woken up by one event without upstream requests."""
+    client = await started_client()
+    operation_id = await change_state(client.lxd, "instance-0", "start")
+
+    waiters = gather(*(client.operations.wait(operation_id, 5) for _ in range(100)))
+    await sleep(0.01)
+    client.event_queue.put_nowait(client.transport.finish(operation_id))
+    operations = await waiters
+
+    assert {operation["status"] for operation in operations} == {"Success"}
+    assert client.operations.fetched == 1
+    await client.close()
+
+
+async def test_wait_timeout_forgets_waiters():
+    """Test operations are not tracked as waited for after their waiters timed out."""
+    client = await started_client()
+    operation_id = await change_state(client.lxd, "instance-0", "start")
+    operations = await gather(*(client.operations.wait(operation_id, 0.01) for _ in range(3)))
+    assert {operation["status"] for operation in operations} == {"Running"}
+    assert client.operations.waiting == 0
+    await client.close()
+
+
+async def test_wait_without_events():
+    """Test waiters share one LXD wait request while the events stream is down."""
+    client = await started_client()
+    client.event_queue.put_nowait(None)
+    await sleep(0)
+    operation_id = await change_state(client.lxd, "instance-0", "start")
+    client.transport.finish(operation_id)
+
+    operations = await gather(*(client.operations.wait(operation_id, 5) for _ in range(10)))
+    assert {operation["status"] for operation in operations} == {"Success"}
+    assert client.operations.fetched == 1
+    await client.close()
+
+
+class ReadTimeoutTransport(StubTransport):
+    """Stub transport whose LXD waits time out when they are not shorter than `read_timeout`.
+
+    An operation wait finishes the operation after `finish_after` waits.
+    """
+
+    def __init__(self, read_timeout: float, finish_after: int | None = None) -> None:
+        """Create transport with one instance."""
+        super().__init__(instances=1)
+        self.read_timeout = read_timeout
+        self.finish_after = finish_after
+        self.waits: list[int] = []
+
+    async def request(self, method, path, data=None, **kwargs):
+        """Answer operation waits like LXD behind a client read timeout."""
+        url = urlsplit(path)
+        if url.path.endswith("/wait"):
+            timeout = int(dict(parse_qsl(url.query))["timeout"])
+            self.waits.append(timeout)
+            await sleep(0.01)
+            if timeout >= self.read_timeout:
+                raise ServerTimeoutError("Timeout on reading data from socket")
+            operation_id = url.path.split("/")[-2]
+            if len(self.waits) == self.finish_after:
+                self.finish(operation_id)
+        return await super().request(method, path, data, **kwargs)
+
+
+async def client_without_events(transport: StubTransport, read_timeout: float) -> LXDClient:
+    """Return started client without an events stream, so operations are waited for with LXD waits."""
+    client = LXDClient(replace(Config.from_env(), LXD_READ_TIMEOUT=read_timeout), transport=transport)
+    await client.start()
+    assert not client.events.connected
+    return client
+
+
+async def test_wait_shorter_than_read_timeout():
+    """Test long waits are split into LXD waits shorter than the read timeout."""
+    transport = ReadTimeoutTransport(read_timeout=3, finish_after=3)
+    client = await client_without_events(transport, read_timeout=3)
+    operation_id = await change_state(client.lxd, "instance-0", "start")
+    operation = await client.operations.wait(operation_id, 600)
+    assert operation["status"] == "Success"
+    assert transport.waits == [2, 2, 2]
+    await client.close()
+
+
+async def test_wait_read_timeout():
+    """Test a wait timing out on reading returns the operation still running."""
+    transport = ReadTimeoutTransport(read_timeout=1)
+    client = await client_without_events(transport, read_timeout=1)
+    operation_id = await change_state(client.lxd, "instance-0", "start")
+    operation = await client.operations.wait(operation_id, 0.05)
+    assert operation["status"] == "Running"
+    assert transport.waits
+    await client.close()
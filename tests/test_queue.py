@@ -0,0 +1,186 @@
+"""Test background job queue."""
+from asyncio import create_task, sleep
+from dataclasses import replace
+
+import pytest
+from sqlalchemy import select
+
+from lxdapi.core.config import Config
+from lxdapi.core.database import get_session_maker
+from lxdapi.jobs import PermanentJobError, create_server
+from lxdapi.models import JobModel, JobStatus, RateLimitSlotModel
+from lxdapi.worker import Worker
+
+from .stubs import StubLXDClient
+
+
+async def test_dequeue(database):
+    """Test jobs are dequeued by priority and locked for one worker."""
+    async with get_session_maker(database)() as db:
+        low = await JobModel.enqueue(db, "test", {}, priority=0)
+        high = await JobModel.enqueue(db, "test", {}, priority=10)
+        await JobModel.enqueue(db, "test", {}, delay=60)
+        await db.commit()
+
+        jobs = await JobModel.dequeue(db, "a", limit=10, lock_for=60)
+        assert [job.id for job in jobs] == [high.id, low.id]
+        assert all(job.status == JobStatus.RUNNING and job.attempts == 1 for job in jobs)
+        assert await JobModel.dequeue(db, "b", limit=10, lock_for=60) == []
+
+        # Lock of a dead worker expires
+        await JobModel.dequeue(db, "a", limit=10, lock_for=0)
+        assert await JobModel.dequeue(db, "a", limit=10, lock_for=0) == []
+        await db.commit()
+
+
+async def test_retry_and_dead_letter(database):
+    """Test failed jobs are retried with backoff and then marked dead."""
+    async with get_session_maker(database)() as db:
+        await JobModel.enqueue(db, "test", {}, max_attempts=2)
+        (job,) = await JobModel.dequeue(db, "a", limit=1, lock_for=60)
+        assert await job.fail(db, "error", backoff=0, max_backoff=0)
+        assert job.status == JobStatus.PENDING
+
+        (job,) = await JobModel.dequeue(db, "a", limit=1, lock_for=60)
+        assert await job.fail(db, "error", backoff=0, max_backoff=0)
+        assert job.status == JobStatus.DEAD
+        assert await JobModel.dequeue(db, "a", limit=1, lock_for=60) == []
+
+        await job.requeue(db)
+        assert [job.attempts for job in await JobModel.dequeue(db, "a", limit=1, lock_for=60)] == [1]
+        await db.commit()
+
+
+async def test_abandoned_last_attempt(database):
+    """Test a job whose worker died on the last attempt is marked dead instead of run again."""
+    async with get_session_maker(database)() as db:
+        job = await JobModel.enqueue(db, "test", {}, max_attempts=2)
+        await JobModel.dequeue(db, "a", limit=1, lock_for=0)
+        assert [job.attempts for job in await JobModel.dequeue(db, "b", limit=1, lock_for=0)] == [2]
+        assert await JobModel.dequeue(db, "c", limit=1, lock_for=0) == []
+        await db.refresh(job)
+        assert job.status == JobStatus.DEAD and job.locked_by is None
+        await db.commit()
+
+
+async def test_renew_lock(database):
+    """Test a running job keeps its lock."""
+    async with get_session_maker(database)() as db:
+        await JobModel.enqueue(db, "test", {})
+        (job,) = await JobModel.dequeue(db, "a", limit=1, lock_for=0)
+        assert await job.renew_lock(db, 60)
+        assert await JobModel.dequeue(db, "b", limit=1, lock_for=60) == []
+        await db.commit()
+
+
+async def test_lost_lock(database):
+    """Test a worker can't store result of a job taken over by another one."""
+    maker = get_session_maker(database)
+    async with maker() as db:
+        await JobModel.enqueue(db, "test", {})
+        (stale,) = await JobModel.dequeue(db, "a", limit=1, lock_for=0)
+        await db.commit()
+    async with maker() as db:
+        (job,) = await JobModel.dequeue(db, "b", limit=1, lock_for=60)
+        assert not await stale.complete(db)
+        assert await job.complete(db, "result")
+        await db.commit()
+
+
+async def test_release_slot(database):
+    """Test a job releases its rate limit slot once it is succeeded or dead."""
+    async with get_session_maker(database)() as db:
+        owners = [await RateLimitSlotModel.acquire(db, "user:1", 3, 60) for _ in range(3)]
+        for owner in owners:
+            await JobModel.enqueue(db, "test", {}, max_attempts=2, slot_key="user:1", slot_owner=owner)
+        succeeded, retried, abandoned = await JobModel.dequeue(db, "a", limit=3, lock_for=60)
+        assert await succeeded.complete(db)
+        assert await retried.fail(db, "error", backoff=0, max_backoff=0)
+        await abandoned.update(db, attempts=2, locked_until=abandoned.run_at)
+        await JobModel.dequeue(db, "b", limit=3, lock_for=60)
+        await db.commit()
+        held = (await db.scalars(select(RateLimitSlotModel.owner))).all()
+        assert held == [retried.slot_owner]
+
+
+async def test_worker_runs_queued(database):
+    """Test worker runs jobs with handlers and stores results."""
+
+    async def succeed(lxd_client, payload, attempt):
+        return payload["value"]
+
+    worker = Worker()
+    worker.config = replace(database, QUEUE_POLL_INTERVAL=0)
+    worker.lxd_client = StubLXDClient(database)
+    worker.handlers = {"succeed": succeed}
+    async with get_session_maker(database)() as db:
+        ok = await JobModel.enqueue(db, "succeed", {"value": 42})
+        unknown = await JobModel.enqueue(db, "unknown", {})
+        await db.commit()
+        jobs = await JobModel.dequeue(db, "a", limit=10, lock_for=60)
+        await db.commit()
+        for job in jobs:
+            await worker._run_queued(job)
+        db.expunge_all()
+        assert (await JobModel.get(db, ok.id)).result == 42
+        assert (await JobModel.get(db, unknown.id)).status == JobStatus.DEAD
+
+
+async def test_worker_renews_lock(database):
+    """Test worker renews locks of jobs running longer than the lock."""
+
+    async def slow(lxd_client, payload, attempt):
+        await sleep(0.3)
+
+    worker = Worker()
+    worker.config = replace(database, QUEUE_LOCK_TIMEOUT=0.15)
+    worker.lxd_client = StubLXDClient(database)
+    worker.handlers = {"slow": slow}
+    async with get_session_maker(database)() as db:
+        await JobModel.enqueue(db, "slow", {})
+        (job,) = await JobModel.dequeue(db, "a", limit=1, lock_for=0.15)
+        await db.commit()
+    running = create_task(worker._run_queued(job))
+    await sleep(0.2)
+    async with get_session_maker(database)() as db:
+        assert await JobModel.dequeue(db, "b", limit=1, lock_for=60) == []
+    await running
+
+
+async def test_create_server_idempotent():
+    """Test retried server creation succeeds for an existing or still created instance."""
+    lxd_client = StubLXDClient(Config.from_env(), instances=1)
+    await lxd_client.start()
+    lxd_client.config = replace(lxd_client.config, QUEUE_JOB_TIMEOUT=0.01)
+    assert await create_server(lxd_client, {"name": "instance-0", "source": "ubuntu"}, 2) == {"operation_id": None}
+
+    # First attempt timed out waiting for the operation
+    try:
+        await create_server(lxd_client, {"name": "web", "source": "ubuntu"}, 1)
+    except RuntimeError:
+        pass
+    (operation_id,) = lxd_client.transport.operations
+    lxd_client.config = replace(lxd_client.config, QUEUE_JOB_TIMEOUT=5)
+    retry = create_task(create_server(lxd_client, {"name": "web", "source": "ubuntu"}, 2))
+    await sleep(0)
+    lxd_client.event_queue.put_nowait(lxd_client.transport.finish(operation_id))
+    assert await retry == {"operation_id": operation_id}
+    assert lxd_client.transport.names.count("web") == 1
+    await lxd_client.close()
+
+
+async def test_create_server_existing(database):
+    """Test server creation is dead on the first attempt if the instance exists."""
+    worker = Worker()
+    worker.config = database
+    worker.lxd_client = StubLXDClient(database, instances=1)
+    await worker.lxd_client.start()
+    async with get_session_maker(database)() as db:
+        await JobModel.enqueue(db, "create_server", {"name": "instance-0", "source": "ubuntu"})
+        (job,) = await JobModel.dequeue(db, "a", limit=1, lock_for=60)
+        await db.commit()
+    with pytest.raises(PermanentJobError):
+        await create_server(worker.lxd_client, job.payload, 1)
+    await worker._run_queued(job)
+    assert job.status == JobStatus.DEAD and job.last_error == "Instance instance-0 already exists"
+    await worker.lxd_client.close()
@@ -0,0 +1,105 @@
+"""Test rate limiting."""
+from asyncio import Event, sleep
+
+import pytest
+
+from lxdapi.core.exceptions.auth import NotAuthenticatedException
+from lxdapi.core.exceptions.ratelimit import (
+    RateLimitExceededException,
+    TooManyOperationsException,
+)
+from lxdapi.core.ratelimit import (
+    DatabaseRateLimitBackend,
+    MemoryRateLimitBackend,
+    RateLimiter,
+)
+
+
+@pytest.fixture(params=["memory", "database"])
+def backend(request):
+    """Return each rate limit backend."""
+    if request.param == "memory":
+        return MemoryRateLimitBackend()
+    return DatabaseRateLimitBackend(request.getfixturevalue("database"))
+
+
+async def test_take(backend):
+    """Test tokens are taken up to the burst and refilled at the rate."""
+    assert [await backend.take("a", 20, 2) for _ in range(2)] == [0, 0]
+    wait = await backend.take("a", 20, 2)
+    assert 0 < wait <= 0.05
+    # Buckets are independent
+    assert await backend.take("b", 20, 2) == 0
+    await sleep(wait)
+    assert await backend.take("a", 20, 2) == 0
+
+
+async def test_acquire(backend):
+    """Test slots are held up to the limit until released."""
+    first = await backend.acquire("a", 2, 60)
+    second = await backend.acquire("a", 2, 60)
+    assert first is not None and second is not None
+    assert await backend.acquire("a", 2, 60) is None
+    assert await backend.acquire("b", 2, 60) is not None
+    await backend.release("a", first)
+    assert await backend.acquire("a", 2, 60) is not None
+
+
+async def test_acquire_expired(database):
+    """Test slots of failed workers are acquired after they expire."""
+    backend = DatabaseRateLimitBackend(database)
+    assert await backend.acquire("a", 1, 0.05) is not None
+    assert await backend.acquire("a", 1, 0.05) is None
+    await sleep(0.05)
+    assert await backend.acquire("a", 1, 0.05) is not None
+
+
+async def test_operation():
+    """Test operations are limited by rate and by slots of the user."""
+    limiter = RateLimiter(MemoryRateLimitBackend(), rate=0.1, burst=2, max_in_flight=1)
+    async with limiter.operation("user:1", "start"):
+        with pytest.raises(TooManyOperationsException):
+            async with limiter.operation("user:1", "stop"):
+                pass
+    async with limiter.operation("user:1", "stop"):
+        pass
+    # Every route has its own bucket
+    await limiter.check("user:1", "start")
+    with pytest.raises(RateLimitExceededException) as info:
+        await limiter.check("user:1", "start")
+    assert info.value.headers == {"Retry-After": "10"}
+    # Disabled limits
+    limiter = RateLimiter(MemoryRateLimitBackend(), rate=0, burst=1, max_in_flight=0)
+    for _ in range(3):
+        async with limiter.operation("user:1", "start"):
+            pass
+
+
+async def test_operation_hold():
+    """Test slots handed over to operations are held until they complete."""
+    limiter = RateLimiter(MemoryRateLimitBackend(), rate=0, burst=1, max_in_flight=1, slot_ttl=0.05)
+    done = Event()
+    async with limiter.operation("user:1", "start") as slot:
+        slot.hold_until(done.wait)
+    with pytest.raises(TooManyOperationsException):
+        async with limiter.operation("user:1", "start"):
+            pass
+    done.set()
+    await sleep(0.01)
+    async with limiter.operation("user:1", "start") as slot:
+        slot.hold_until(Event().wait)
+    # Slots of operations that never complete are released after the slot TTL
+    await sleep(0.1)
+    assert not limiter.tasks
+    async with limiter.operation("user:1", "start"):
+        pass
+
+
+def test_exception_chain():
+    """Test exception chains are built per exception class."""
+    assert RateLimitExceededException(1).exception_chain == [
+        "RateLimitExceededException",
+        "TooManyRequestsException",
+    ]
+    assert NotAuthenticatedException().exception_chain == ["NotAuthenticatedException", "UnauthorizedException"]
+    assert TooManyOperationsException().status_code == 429
@@ -0,0 +1,78 @@
+"""Test servers reconciliation."""
+from asyncio import sleep
+
+from sqlalchemy import select
+
+from lxdapi.core.database import get_session_maker
+from lxdapi.models import ServerModel
+from lxdapi.reconcile import Reconciler, parse_cpu, parse_size, server_values
+
+from .stubs import StubLXDClient, instance_document, lifecycle_event
+
+
+def test_server_values():
+    """Test instance document is converted to column values."""
+    assert parse_size("10GiB") == 10 * 2**30
+    assert parse_size("512MB") == 512 * 10**6
+    assert parse_size("50%") == 0
+    assert parse_cpu("0-3,6") == 5
+    assert server_values(instance_document("web", recursion=2)) == {
+        "cpu": 2,
+        "memory": 2048,
+        "disk": 10240,
+        "system": "x86_64",
+        "ip": "10.0.0.2",
+        "is_active": True,
+    }
+
+
+async def servers(db) -> dict[str, tuple[bool, bool, str]]:
+    """Return (is_active, is_deleted, ip) of server rows by name."""
+    rows = await db.execute(select(ServerModel.name, ServerModel.is_active, ServerModel.is_deleted, ServerModel.ip))
+    return {row.name: (row.is_active, row.is_deleted, row.ip) for row in rows}
+
+
+async def test_reconcile(database):
+    """Test full sweep and incremental sync write only the differences."""
+    client = StubLXDClient(database, instances=3)
+    await client.start()
+    while not client.events.connected:
+        await sleep(0)
+    reconciler = Reconciler(client, batch_size=2)
+    async with get_session_maker(database)() as db:
+        stats = await reconciler.sweep(db)
+        assert (stats.inserted, stats.updated, stats.deleted) == (3, 0, 0)
+        assert (await reconciler.sweep(db)).inserted == 0
+
+        # Changed outside of LXD events: fixed by the next sweep
+        await db.execute(ServerModel.__table__.update().where(ServerModel.name == "instance-0").values(ip=""))
+        assert (await reconciler.sweep(db)).updated == 1
+
+        client.transport.names.remove("instance-1")
+        client.transport.names.append("instance-3")
+        client.events.dispatch(lifecycle_event("instance-deleted", "instance-1"))
+        client.events.dispatch(lifecycle_event("instance-created", "instance-3"))
+        assert reconciler.dirty == {"instance-1", "instance-3"}
+        calls = client.transport.calls
+        stats = await reconciler.sync_dirty(db)
+        assert (stats.inserted, stats.updated, stats.deleted) == (1, 0, 1)
+        # Document and state of each dirty instance, no listing
+        assert client.transport.calls - calls == 4
+        assert await servers(db) == {
+            "instance-0": (True, False, "10.0.0.2"),
+            "instance-1": (False, True, "10.0.0.2"),
+            "instance-2": (True, False, "10.0.0.2"),
+            "instance-3": (True, False, "10.0.0.2"),
+        }
+        assert (await reconciler.sync_dirty(db)).inserted == 0
+
+        # Events stream is down: dirty instances are covered by the next sweep
+        client.event_queue.put_nowait(None)
+        await sleep(0)
+        calls = client.transport.calls
+        assert (await reconciler.sync_dirty(db)).inserted == 0
+        assert client.transport.calls == calls
+        reconciler.sweep_interval = 0
+        await reconciler.sync_dirty(db)
+        assert client.transport.calls == calls + 1
+    await client.close()
@@ -0,0 +1,50 @@
+"""Test single-flight call coalescing."""
+from asyncio import Event, create_task, gather, sleep
+
+import pytest
+
+from lxdapi.core.lxd import SingleFlight
+
+
+async def test_single_flight_coalesces():
+    """Test concurrent calls with the same key share one call."""
+    flight = SingleFlight()
+    release = Event()
+    calls = 0
+
+    async def call() -> list[int]:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return [calls]
+
+    tasks = [create_task(flight.do("key", call)) for _ in range(5)]
+    other = create_task(flight.do("other", call))
+    await sleep(0)
+    assert flight.in_flight == 2
+    release.set()
+    results = await gather(*tasks, other)
+    assert calls == 2
+    assert all(result is results[0] for result in results[:5])
+    assert (flight.issued, flight.coalesced, flight.in_flight) == (2, 4, 0)
+
+    # Completed calls are not cached
+    await flight.do("key", call)
+    assert calls == 3
+
+
+async def test_single_flight_errors():
+    """Test errors are shared and cancelled callers don't cancel the call."""
+    flight = SingleFlight()
+
+    async def fail() -> None:
+        await sleep(0.01)
+        raise ValueError()
+
+    first = create_task(flight.do("key", fail))
+    second = create_task(flight.do("key", fail))
+    await sleep(0)
+    first.cancel()
+    with pytest.raises(ValueError):
+        await second
+    assert flight.in_flight == 0
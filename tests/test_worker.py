@@ -1,8 +1,55 @@
 """Test worker."""
-from lxdapi.worker import Worker
+from asyncio import Event, create_task, sleep
 
+import pytest
 
-async def test_worker():
+from lxdapi.worker import Cron, Worker
+
+
+async def noop() -> None:
+    """Do nothing."""
+
+
+async def test_worker(monkeypatch):
     """Test worker."""
+    # There is no LXD to wait for
+    monkeypatch.setenv("LXD_CONNECT_TIMEOUT", "0.1")
     worker = Worker(debug=True)
     await worker.run()
+
+
+def test_cron_deadline():
+    """Test interval deadlines don't drift and skip missed runs."""
+    cron = Cron(noop, every=10)
+    assert cron.next_deadline(None, 100) == 110
+    assert cron.next_deadline(110, 112) == 120
+    assert cron.next_deadline(110, 135) == 140
+    with pytest.raises(ValueError):
+        Cron(noop)
+    with pytest.raises(ValueError):
+        Cron(noop, every=10, cron="* * * * *")
+
+
+async def test_worker_skips_running():
+    """Test a job is not started again while it is running."""
+    release = Event()
+    started = 0
+
+    async def job() -> None:
+        nonlocal started
+        started += 1
+        await release.wait()
+
+    worker = Worker()
+    cron = Cron(job, every=0.01)
+    worker.cron = [cron]
+    task = create_task(worker._run())
+    await sleep(0.05)
+    assert started == 1
+    assert cron.skipped > 0
+    assert len(cron.running) == 1
+    release.set()
+    await sleep(0.02)
+    assert started > 1
+    task.cancel()
+    await worker._cancel_running()
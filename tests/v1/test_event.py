@@ -0,0 +1,72 @@
+"""Test events endpoints."""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+from lxdapi.core.config import Config
+from lxdapi.routes.v1.event import stream_events
+
+from ..stubs import StubLXDClient, lifecycle_event
+from .test_server import client_with_stub, wait_ready
+
+
+def wait_subscribers(lxd_client, count: int) -> None:
+    """Wait until the events stream has `count` subscribers."""
+    for _ in range(100):
+        if lxd_client.events.subscribers == count:
+            return
+        sleep(0.01)
+
+
+def test_stream_events():
+    """Test events are streamed as Server-Sent Events."""
+    application, client = client_with_stub(instances=1)
+    with client:
+        wait_ready(application)
+        lxd_client = application.state.lxd_client
+        assert client.get("/api/v1/events", params={"type": "logging"}).status_code == 400
+
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(client.get, "/api/v1/events", params={"instance": "instance-0"})
+            wait_subscribers(lxd_client, 1)
+            client.portal.call(lxd_client.event_queue.put, lifecycle_event("instance-started", "other"))
+            client.portal.call(lxd_client.event_queue.put, lifecycle_event("instance-started", "instance-0"))
+            sleep(0.05)
+            # Closing the stream ends all downstream subscriptions
+            client.portal.call(lxd_client.events.close)
+            response = future.result(timeout=5)
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        event, data, _ = response.text.split("\n", 2)
+        assert event == "event: lifecycle"
+        assert json.loads(data.removeprefix("data: "))["metadata"]["source"] == "/1.0/instances/instance-0"
+
+
+def test_websocket_events():
+    """Test events are sent over WebSocket and subscription is released."""
+    application, client = client_with_stub(instances=1)
+    with client:
+        wait_ready(application)
+        lxd_client = application.state.lxd_client
+        with client.websocket_connect("/api/v1/events/ws?type=lifecycle") as websocket:
+            wait_subscribers(lxd_client, 1)
+            client.portal.call(lxd_client.event_queue.put, lifecycle_event("instance-started", "instance-0"))
+            assert websocket.receive_json()["metadata"]["action"] == "instance-started"
+        wait_subscribers(lxd_client, 0)
+        assert lxd_client.events.subscribers == 0
+
+
+async def test_stream_events_subscribes_in_body():
+    """Test the subscription is created only when the response body is iterated."""
+    lxd_client = StubLXDClient(Config.from_env(), instances=1)
+    await lxd_client.start()
+    response = await stream_events(lxd_client=lxd_client, type=None, instance=None)
+    # A response whose body is never sent holds no subscription
+    assert lxd_client.events.subscribers == 0
+    body = response.body_iterator
+    lxd_client.event_queue.put_nowait(lifecycle_event("instance-started", "instance-0"))
+    assert (await body.__anext__()).startswith("event: lifecycle")
+    assert lxd_client.events.subscribers == 1
+    await body.aclose()
+    assert lxd_client.events.subscribers == 0
+    await lxd_client.close()
@@ -0,0 +1,30 @@
+"""Test operation endpoints."""
+import json
+
+from .test_server import client_with_stub, wait_ready
+
+
+def test_get_operation():
+    """Test operation is returned and streamed until finished."""
+    application, client = client_with_stub(instances=1)
+    with client:
+        wait_ready(application)
+        operation_id = client.post("/api/v1/server/instance-0/start").json()
+
+        response = client.get(f"/api/v1/operations/{operation_id}")
+        assert response.status_code == 200
+        assert response.json()["status"] == "Running"
+        assert response.json()["class"] == "task"
+
+        lxd_client = application.state.lxd_client
+        client.portal.call(lxd_client.event_queue.put, lxd_client.transport.finish(operation_id))
+        response = client.get(f"/api/v1/operations/{operation_id}", params={"wait": 1})
+        assert response.json()["status"] == "Success"
+
+        response = client.get(f"/api/v1/operations/{operation_id}/events")
+        assert response.headers["content-type"].startswith("text/event-stream")
+        event, data, _ = response.text.split("\n", 2)
+        assert event == "event: operation"
+        assert json.loads(data.removeprefix("data: "))["status"] == "Success"
+
+        assert client.get("/api/v1/operations/missing").status_code == 404
@@ -1,8 +1,13 @@
 """Test ping endpoint."""
+from time import sleep
 
 from fastapi.testclient import TestClient
 
 from lxdapi import app
+from lxdapi.core.config import Config
+from lxdapi.core.lxd import LXDClient
+
+from ..stubs import StubTransport
 
 
 def test_ping():
@@ -11,3 +16,20 @@ def test_ping():
     response = client.get("/api/v1/ping/")
     assert response.status_code == 200
     assert response.text == '"ok"'
+
+
+def test_ready():
+    """Test readiness endpoint follows LXD client state."""
+    application = app()
+    assert TestClient(application).get("/api/v1/ping/ready").status_code == 503
+
+    application.state.lxd_client = LXDClient(Config.from_env(), transport=StubTransport())
+    with TestClient(application) as client:
+        for _ in range(100):
+            if application.state.lxd_client.is_ready:
+                break
+            sleep(0.01)
+        response = client.get("/api/v1/ping/ready")
+    assert response.status_code == 200
+    assert response.text == '"ok"'
+    assert not application.state.lxd_client.is_ready
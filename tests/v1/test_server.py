@@ -0,0 +1,255 @@
+"""Test server endpoints."""
+import json
+from asyncio import sleep as async_sleep
+from asyncio import wait
+from time import sleep
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from lxdapi import app
+from lxdapi.core.config import Config
+from lxdapi.core.database import get_session_maker
+from lxdapi.core.ratelimit import MemoryRateLimitBackend, RateLimiter
+from lxdapi.models import JobModel, RateLimitSlotModel
+from lxdapi.routes.v1.server import _hold_until_finished, bulk_action
+from lxdapi.schemas.server import BulkActionSchema
+
+from ..stubs import StubLXDClient
+
+
+def client_with_stub(instances: int = 3) -> tuple[FastAPI, TestClient]:
+    """Return application with stub LXD client and its test client."""
+    application = app()
+    application.state.lxd_client = StubLXDClient(Config.from_env(), instances=instances)
+    return application, TestClient(application)
+
+
+def wait_ready(application: FastAPI) -> None:
+    """Wait until the LXD client is started by the lifespan."""
+    for _ in range(100):
+        if application.state.lxd_client.is_ready:
+            return
+        sleep(0.01)
+
+
+def test_get_servers():
+    """Test server names listing."""
+    application, client = client_with_stub()
+    with client:
+        wait_ready(application)
+        response = client.get("/api/v1/server/")
+        assert response.status_code == 200
+        assert response.json() == ["instance-0", "instance-1", "instance-2"]
+
+
+def test_get_servers_pagination():
+    """Test servers are paginated with opaque cursors."""
+    application, client = client_with_stub(instances=5)
+    with client:
+        wait_ready(application)
+        first = client.get("/api/v1/server/", params={"limit": 3})
+        assert first.json() == ["instance-0", "instance-1", "instance-2"]
+        second = client.get("/api/v1/server/", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+        assert second.json() == ["instance-3", "instance-4"]
+        assert "X-Next-Cursor" not in second.headers
+        assert client.get("/api/v1/server/", params={"cursor": "!"}).status_code == 400
+
+
+def test_get_servers_fields():
+    """Test requested fields and filters."""
+    application, client = client_with_stub(instances=2)
+    with client:
+        wait_ready(application)
+        response = client.get("/api/v1/server/", params={"fields": "status,resources,state", "limit": 1})
+        assert response.json() == [
+            {
+                "name": "instance-0",
+                "status": "Running",
+                "resources": {"cpu": "2", "memory": "2GiB", "disk": "10GiB"},
+                "state": {
+                    "cpu_usage": 1000,
+                    "memory_usage": 2048,
+                    "disk_usage": {"root": 4096},
+                    "processes": 10,
+                    "addresses": ["10.0.0.2"],
+                },
+            }
+        ]
+        assert client.get("/api/v1/server/", params={"status": "stopped"}).json() == []
+        assert client.get("/api/v1/server/", params={"fields": "secret"}).status_code == 400
+
+
+def test_get_servers_ndjson():
+    """Test servers are streamed as NDJSON."""
+    application, client = client_with_stub(instances=2)
+    with client:
+        wait_ready(application)
+        response = client.get("/api/v1/server/", params={"fields": "type"}, headers={"Accept": "application/x-ndjson"})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.text.splitlines() == [
+            '{"name": "instance-0", "type": "virtual-machine"}',
+            '{"name": "instance-1", "type": "virtual-machine"}',
+        ]
+
+
+def test_bulk_action():
+    """Test bulk action returns operation or error for every server."""
+    application, client = client_with_stub(instances=2)
+    with client:
+        wait_ready(application)
+        response = client.post(
+            "/api/v1/server/bulk",
+            json={"action": "restart", "names": ["instance-0", "missing", "instance-1"]},
+        )
+        assert response.status_code == 200
+        results = response.json()
+        assert [result["name"] for result in results] == ["instance-0", "missing", "instance-1"]
+        assert results[0]["operation_id"] and results[2]["operation_id"]
+        assert results[1]["operation_id"] is None and results[1]["error"]
+
+
+def test_invalid_names():
+    """Test names which could change LXD request paths are rejected before reaching LXD."""
+    application, client = client_with_stub(instances=1)
+    with client:
+        wait_ready(application)
+        transport = application.state.lxd_client.transport
+        calls = transport.calls
+        response = client.post("/api/v1/server/bulk", json={"action": "delete", "names": ["../certificates/abc"]})
+        assert response.status_code == 422
+        for name in ("%2e%2e", "instance-0%3Fproject=other"):
+            assert client.delete(f"/api/v1/server/{name}").status_code == 422
+            assert client.post(f"/api/v1/server/{name}/start").status_code == 422
+        assert client.post("/api/v1/server/", params={"name": "a/../b"}).status_code == 422
+        assert transport.calls == calls
+        assert transport.names == ["instance-0"]
+
+
+def test_bulk_action_stream():
+    """Test bulk action results are streamed."""
+    application, client = client_with_stub(instances=3)
+    with client:
+        wait_ready(application)
+        response = client.post(
+            "/api/v1/server/bulk",
+            params={"stream": True},
+            json={"action": "delete", "names": ["instance-0", "instance-1", "instance-2"]},
+        )
+        assert response.headers["content-type"] == "application/x-ndjson"
+        names = sorted(json.loads(line)["name"] for line in response.text.splitlines())
+        assert names == ["instance-0", "instance-1", "instance-2"]
+        assert application.state.lxd_client.transport.names == []
+
+
+def test_create_server_background(database):
+    """Test server creation is queued as a background job."""
+    application, client = client_with_stub(instances=0)
+    with client:
+        response = client.post("/api/v1/server/", params={"name": "web", "background": True})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["kind"] == "create_server" and job["status"] == "pending"
+
+        assert client.get(f"/api/v1/jobs/{job['id']}").json()["id"] == job["id"]
+        assert client.post(f"/api/v1/jobs/{job['id']}/requeue").status_code == 409
+        assert client.get("/api/v1/jobs/1000").status_code == 404
+        # The job holds a slot of the client until it is done
+        assert application.state.rate_limiter.backend.slots == {"ip:testclient": 1}
+
+
+def test_create_server_background_shared_slot(database, monkeypatch):
+    """Test a queued job holds a slot of a shared backend without the API polling it."""
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", "database")
+    application, client = client_with_stub(instances=0)
+    with client:
+        job = client.post("/api/v1/server/", params={"name": "web", "background": True}).json()
+        assert not application.state.rate_limiter.tasks
+
+        async def slot_owners():
+            async with get_session_maker(database)() as db:
+                return (await db.scalars(select(RateLimitSlotModel.owner))).all(), await JobModel.get(db, job["id"])
+
+        (owner,), model = client.portal.call(slot_owners)
+        assert model.slot_key == "ip:testclient" and model.slot_owner == owner
+
+
+def test_rate_limit(monkeypatch):
+    """Test LXD-mutating requests of a client are rate limited per route."""
+    monkeypatch.setenv("RATE_LIMIT_RATE", "0.01")
+    monkeypatch.setenv("RATE_LIMIT_BURST", "2")
+    application, client = client_with_stub(instances=1)
+    with client:
+        wait_ready(application)
+        assert [client.post("/api/v1/server/instance-0/start").status_code for _ in range(2)] == [200, 200]
+        response = client.post("/api/v1/server/instance-0/start")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.json()["exception_chain"] == ["RateLimitExceededException", "TooManyRequestsException"]
+        assert client.post("/api/v1/server/instance-0/stop").status_code == 200
+
+
+def test_operation_quota(monkeypatch):
+    """Test slots of a client are held until its operations are finished, not until the response."""
+    monkeypatch.setenv("RATE_LIMIT_MAX_IN_FLIGHT", "1")
+    application, client = client_with_stub(instances=1)
+    with client:
+        wait_ready(application)
+        operation_id = client.post("/api/v1/server/instance-0/start").json()
+        response = client.post("/api/v1/server/instance-0/stop")
+        assert response.status_code == 429
+        assert response.json()["exception_chain"][0] == "TooManyOperationsException"
+
+        lxd_client = application.state.lxd_client
+        client.portal.call(lxd_client.event_queue.put, lxd_client.transport.finish(operation_id))
+        limiter = application.state.rate_limiter
+        for _ in range(100):
+            if not limiter.tasks:
+                break
+            sleep(0.01)
+        assert client.post("/api/v1/server/instance-0/stop").status_code == 200
+
+
+async def test_hold_until_finished():
+    """Test a failed wait doesn't release the slot while other operations are running."""
+    lxd_client = StubLXDClient(Config.from_env(), instances=1)
+    await lxd_client.start()
+    lxd_client.transport.operation("start", "instance-0")
+    limiter = RateLimiter(MemoryRateLimitBackend(), rate=0, burst=1, max_in_flight=1)
+    async with limiter.operation("user:1", "bulk_action") as slot:
+        _hold_until_finished(slot, lxd_client, ["pruned", "operation-0"])
+    await async_sleep(0.01)
+    assert limiter.backend.slots == {"user:1": 1}
+
+    lxd_client.event_queue.put_nowait(lxd_client.transport.finish("operation-0"))
+    await wait(limiter.tasks)
+    assert limiter.backend.slots == {}
+    await lxd_client.close()
+
+
+async def test_bulk_action_stream_disconnect():
+    """Test the slot is handed over to started operations when the client disconnects mid-stream."""
+    lxd_client = StubLXDClient(Config.from_env(), instances=3)
+    await lxd_client.start()
+    limiter = RateLimiter(MemoryRateLimitBackend(), rate=0, burst=1, max_in_flight=1)
+    async with limiter.operation("user:1", "bulk_action") as slot:
+        response = await bulk_action(
+            lxd_client=lxd_client,
+            lxd=lxd_client.lxd,
+            config=lxd_client.config,
+            slot=slot,
+            body=BulkActionSchema(action="stop", names=["instance-0", "instance-1", "instance-2"]),
+            stream=True,
+        )
+        results = response.body_iterator
+        await results.__anext__()
+        await results.aclose()
+    await async_sleep(0.01)
+    assert limiter.backend.slots == {"user:1": 1}
+
+    for operation_id in list(lxd_client.transport.operations):
+        lxd_client.event_queue.put_nowait(lxd_client.transport.finish(operation_id))
+    await wait(limiter.tasks)
+    assert limiter.backend.slots == {}
+    await lxd_client.close()
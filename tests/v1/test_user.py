@@ -0,0 +1,53 @@
+"""Test user endpoints."""
+from fastapi.testclient import TestClient
+
+from lxdapi import app
+from lxdapi.core.config import Config
+from lxdapi.core.database import dispose_engines, get_session_maker
+from lxdapi.core.security import principals
+from lxdapi.models import UserModel
+from lxdapi.utils.auth import encode, timegm_delta
+
+from ..stubs import StubLXDClient
+
+
+def client() -> TestClient:
+    """Return test client of application with stub LXD client."""
+    application = app()
+    application.state.lxd_client = StubLXDClient(Config.from_env())
+    return TestClient(application)
+
+
+async def test_get_me(database):
+    """Test the authenticated user is resolved from the token and cached."""
+    async with get_session_maker(database)() as db:
+        user = await UserModel.create(db, email="a@example.com", permission_groups=["user", "admin"])
+        await db.commit()
+    await dispose_engines()
+    token = encode(database, {"sub": str(user.id), "exp": timegm_delta(minutes=5)})
+
+    with client() as test_client:
+        response = test_client.get("/api/v1/user/me", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.json() == {
+            "id": user.id,
+            "email": "a@example.com",
+            "is_admin": False,
+            "permission_groups": ["admin", "user"],
+        }
+        assert principals.get(str(user.id)).email == "a@example.com"
+
+        assert test_client.get("/api/v1/user/me").status_code == 401
+        assert test_client.get("/api/v1/user/me", headers={"Authorization": "Bearer invalid"}).status_code == 422
+        unknown = encode(database, {"sub": "1000"})
+        assert test_client.get("/api/v1/user/me", headers={"Authorization": f"Bearer {unknown}"}).status_code == 401
+    await dispose_engines()
+
+    async with get_session_maker(database)() as db:
+        await (await UserModel.get(db, user.id)).update(db, is_banned=True)
+        await db.commit()
+    await dispose_engines()
+    # Update invalidates the cached principal
+    assert principals.get(str(user.id)) is None
+    with client() as test_client:
+        assert test_client.get("/api/v1/user/me", headers={"Authorization": f"Bearer {token}"}).status_code == 403